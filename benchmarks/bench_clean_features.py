@@ -0,0 +1,79 @@
+# Benchmark: row-wise .apply text/media features vs the vectorized engine in data_cleaning.
+# Run from project root: python benchmarks/bench_clean_features.py --rows 500000
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import data_cleaning
+
+VOCAB = [
+    'we', 'our', 'team', 'today', 'new', 'AI', 'founders', 'future', 'growth', 'I', 'my',
+    'leadership', 'hiring', 'product', 'launch', 'data', 'insight', 'café', 'naïve',
+    '“quoted”', '#growth', '#AI', '#', '🚀', '👇', 'well-being', '?', 'C#',
+    '✅', '❤️', '❤', '👍🏽', '👩‍💻', '🇫🇷', '1️⃣', '©', '→', '@Acme', 'me@example.com',
+]
+SEPARATORS = [' '] * 20 + ['  ', '\t', ' \n ', '\xa0', ' ']
+
+def make_frame(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    texts = []
+    for n_words in rng.integers(0, 250, size=n_rows):
+        words = rng.choice(VOCAB, size=n_words)
+        seps = rng.choice(SEPARATORS, size=n_words)
+        texts.append(''.join(w + s for w, s in zip(words, seps)))
+    texts = pd.Series(texts, dtype=object)
+    texts[rng.random(n_rows) < 0.02] = np.nan
+
+    media = rng.random(n_rows)
+    return pd.DataFrame({
+        'post_text': texts,
+        'video_duration': np.where(media < 0.15, rng.integers(0, 900000, size=n_rows), np.nan),
+        'doc_pages': np.where((media >= 0.15) & (media < 0.3), rng.integers(0, 30, size=n_rows), np.nan),
+        'poll_question': np.where(media > 0.95, 'Which one?', None),
+    })
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def row_wise(df):
+    return pd.DataFrame({
+        'word_count': df['post_text'].apply(data_cleaning.count_words),
+        'has_emoji': df['post_text'].apply(data_cleaning.has_emoji).astype(int),
+        'has_hashtag': df['post_text'].apply(data_cleaning.has_hashtag).astype(int),
+        'emoji_count': df['post_text'].apply(data_cleaning.count_emojis),
+        'hashtag_count': df['post_text'].apply(data_cleaning.count_hashtags),
+        'mention_count': df['post_text'].apply(data_cleaning.count_mentions),
+        'media_type': df.apply(data_cleaning.infer_media_type, axis=1),
+    })
+
+def vectorized(df):
+    out = data_cleaning.extract_text_features(df['post_text'])
+    out['media_type'] = data_cleaning.infer_media_types(df)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows} synthetic posts...")
+    df = make_frame(args.rows)
+
+    expected, t_rows = timed(lambda: row_wise(df))
+    actual, t_vec = timed(lambda: vectorized(df))
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    print("Outputs identical: yes")
+    print(f"Row-wise .apply: {t_rows:.2f}s ({args.rows / t_rows:,.0f} rows/sec)")
+    print(f"Vectorized:      {t_vec:.2f}s ({args.rows / t_vec:,.0f} rows/sec)")
+    print(f"Speedup:         {t_rows / t_vec:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# End-to-end pipeline benchmark on synthetic exports of increasing size.
+# For every size a fresh working directory gets a synthetic export (benchmarks/synthetic_data.py),
+# then every pipeline stage runs in its own subprocess so wall time, CPU time and peak memory
+# are measured per stage. Results are written as JSON; pass --compare with an earlier results
+# file to flag stages that got slower or hungrier.
+# Run from project root: python benchmarks/bench_pipeline.py --sizes 10k 100k 1M [--compare benchmarks/results/<old>.json]
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+import synthetic_data
+
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+DATA_DIRS = ['raw', 'intermediate', 'features', 'models', 'visualizations']
+REGRESSION_THRESHOLD = 1.2  # flag stages 20% slower / larger than the baseline
+NOISE_FLOOR = {'wall_sec': 1.0, 'peak_rss_mb': 50.0}  # ignore differences smaller than this
+
+def parse_size(text):
+    # "10k" -> 10000, "1M" -> 1000000
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+def _peak_rss_mb(who):
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_stage_child(module_name, func_name):
+    # Runs inside the per-stage subprocess; the last stdout line is the JSON measurement
+    import importlib
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    getattr(importlib.import_module(module_name), func_name)()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    print(json.dumps({
+        'wall_sec': round(wall, 3),
+        'cpu_sec': round(cpu + children.ru_utime + children.ru_stime, 3),
+        'peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+        'worker_peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }))
+
+def run_stage(stage, workdir, log_path):
+    cmd = [sys.executable, os.path.abspath(__file__), '--run-stage', stage['module'], stage['func']]
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.run(cmd, cwd=workdir, stdout=subprocess.PIPE, stderr=log, text=True)
+        log.write(proc.stdout)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {'status': 'failed'}
+    try:
+        return {'status': 'ok', **json.loads(lines[-1])}
+    except json.JSONDecodeError:
+        return {'status': 'failed'}
+
+def bench_size(n_posts, stages, workdir, seed):
+    import pipeline
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    for name in DATA_DIRS:
+        os.makedirs(os.path.join(workdir, 'data', name))
+
+    start = time.perf_counter()
+    synthetic_data.write_export(os.path.join(workdir, pipeline.RAW_JSON), n_posts, seed)
+    print(f"\n{n_posts} posts: generated export in {time.perf_counter() - start:.1f}s")
+
+    records = []
+    for stage in pipeline.STAGES:
+        if stages and stage['name'] not in stages:
+            continue
+        log_path = os.path.join(workdir, f"{stage['name']}.log")
+        result = run_stage(stage, workdir, log_path)
+        record = {'posts': n_posts, 'stage': stage['name'], **result}
+        if result['status'] == 'ok':
+            record['posts_per_sec'] = round(n_posts / result['wall_sec'], 1) if result['wall_sec'] > 0 else None
+            print(f"  {stage['name']:<10} {result['wall_sec']:>9.2f}s wall {result['cpu_sec']:>9.2f}s cpu "
+                  f"{result['peak_rss_mb']:>9.1f} MB peak")
+        else:
+            print(f"  {stage['name']:<10} FAILED (see {log_path})")
+        records.append(record)
+        if result['status'] != 'ok':
+            break  # later stages depend on this one's outputs
+    return records
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=BENCH_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['posts'], r['stage']): r for r in json.load(f)['runs'] if r['status'] == 'ok'}
+    print(f"\n--- Compared with {baseline_path} ---")
+    regressions = 0
+    for run in results['runs']:
+        old = baseline.get((run['posts'], run['stage']))
+        if run['status'] != 'ok' or not old:
+            continue
+        for metric in ('wall_sec', 'peak_rss_mb'):
+            ratio = run[metric] / old[metric] if old[metric] else float('inf')
+            flag = ''
+            if ratio > REGRESSION_THRESHOLD and run[metric] - old[metric] > NOISE_FLOOR[metric]:
+                flag = '  <-- REGRESSION'
+                regressions += 1
+            print(f"  {run['posts']:>9} {run['stage']:<10} {metric:<12} {old[metric]:>9} -> {run[metric]:>9} ({ratio:.2f}x){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--sizes", nargs='+', default=['10k', '100k'], help="Post counts, e.g. 10k 100k 1M 10M")
+    parser.add_argument("--stages", nargs='+', help="Only these pipeline stages (later ones need earlier outputs)")
+    parser.add_argument("--workdir", default=None, help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--keep-data", action='store_true', help="Keep the generated data after the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Results JSON (default: benchmarks/results/pipeline_<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--run-stage", nargs=2, metavar=('MODULE', 'FUNC'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage_child(*args.run_stage)
+        return
+
+    root = args.workdir or tempfile.mkdtemp(prefix='linkedin_bench_')
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'storage_format': os.environ.get('LINKEDIN_STORAGE_FORMAT', 'csv'),
+        'runs': [],
+    }
+    workdirs = []
+    try:
+        for size in args.sizes:
+            n_posts = parse_size(size)
+            workdirs.append(os.path.join(root, f"posts_{n_posts}"))
+            results['runs'] += bench_size(n_posts, args.stages, workdirs[-1], args.seed)
+    finally:
+        if not args.keep_data:
+            # Only remove what this run created
+            for workdir in workdirs:
+                shutil.rmtree(workdir, ignore_errors=True)
+            if not args.workdir:
+                shutil.rmtree(root, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        print(f"{regressions} regression(s) above {REGRESSION_THRESHOLD:.1f}x")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
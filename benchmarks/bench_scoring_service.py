@@ -0,0 +1,123 @@
+# Latency benchmark for src/scoring_service.py over localhost HTTP.
+# Starts the service in a subprocess and sends single-draft requests from keep-alive client
+# threads at a fixed open-loop rate. Latency is measured from each request's scheduled send
+# time, so a stalled server shows up as queueing delay instead of a lower request rate.
+# Needs a trained model (python src/models.py).
+# Run from project root: python benchmarks/bench_scoring_service.py --rate 300 --duration 20
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.join(BENCH_DIR, '..', 'src', 'scoring_service.py')
+sys.path.insert(0, BENCH_DIR)
+import synthetic_data
+
+DRAFT_FIELDS = ['text', 'linkedinVideo', 'document', 'poll', 'postedAtISO']
+
+def make_drafts(n, seed=42):
+    # Synthetic posts without their engagement counts, the way a draft arrives
+    rng = random.Random(seed)
+    authors = [None] * max(1, n // synthetic_data.POSTS_PER_AUTHOR)
+    posts = (synthetic_data.make_post(rng, idx, authors) for idx in range(n))
+    return [{k: post[k] for k in DRAFT_FIELDS if k in post} for post in posts]
+
+def start_service(args):
+    cmd = [sys.executable, SERVICE, '--port', '0', '--model', args.model,
+           '--max-batch', str(args.max_batch), '--max-wait-ms', str(args.max_wait_ms)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if 'listening on http://' not in line:
+        proc.kill()
+        raise RuntimeError(f"Scoring service did not start: {line.strip()}")
+    host, port = line.rsplit('http://', 1)[1].strip().rsplit(':', 1)
+    return proc, host, int(port)
+
+def request(conn, method, path, body=None):
+    conn.request(method, path, body=body, headers={'Content-Type': 'application/json'} if body else {})
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path} -> {response.status}: {payload}")
+    return payload
+
+def client(host, port, schedule, bodies, latencies, errors):
+    conn = http.client.HTTPConnection(host, port)
+    while True:
+        try:
+            idx, send_at = schedule.pop()
+        except IndexError:
+            break
+        delay = send_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            request(conn, 'POST', '/score', bodies[idx % len(bodies)])
+            latencies.append(time.perf_counter() - send_at)
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the draft scoring service.")
+    parser.add_argument("--model", default=os.path.join("data", "models", "lgbm_model.pkl"))
+    parser.add_argument("--rate", type=float, default=300, help="Requests per second (one draft each)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load")
+    parser.add_argument("--connections", type=int, default=32, help="Concurrent keep-alive client connections")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    bodies = [json.dumps(draft).encode('utf-8') for draft in make_drafts(2000)]
+    proc, host, port = start_service(args)
+    try:
+        warmup = http.client.HTTPConnection(host, port)
+        for body in bodies[:50]:
+            request(warmup, 'POST', '/score', body)
+        stats_before = request(warmup, 'GET', '/stats')
+
+        n = int(args.rate * args.duration)
+        start = time.perf_counter() + 0.1
+        # Popped from the end, so reversed: earliest send time first
+        schedule = [(i, start + i / args.rate) for i in range(n)][::-1]
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(host, port, schedule, bodies, latencies, errors))
+                   for _ in range(args.connections)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        stats = request(warmup, 'GET', '/stats')
+        warmup.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    ms = np.array(latencies) * 1000
+    batches = stats['batches'] - stats_before['batches']
+    posts = stats['posts'] - stats_before['posts']
+    print(f"{len(latencies)} requests in {elapsed:.1f}s ({len(latencies) / elapsed:,.0f} req/s, target {args.rate:,.0f}), "
+          f"{len(errors)} errors")
+    if len(ms):
+        print(f"Latency ms: p50 {np.percentile(ms, 50):.2f}  p95 {np.percentile(ms, 95):.2f}  "
+              f"p99 {np.percentile(ms, 99):.2f}  max {ms.max():.2f}")
+    if batches:
+        print(f"Micro-batching: {batches} predict calls, {posts / batches:.1f} posts per call on average, "
+              f"largest {stats['largest_batch']}")
+    if errors:
+        print(f"First error: {errors[0]}")
+
+if __name__ == "__main__":
+    main()
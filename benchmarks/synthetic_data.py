@@ -0,0 +1,161 @@
+# Synthetic LinkedIn export generator for scaling tests and benchmarks.
+# Posts use the same nested schema the scraper produces (everything pre_clean_data.FIELDS_TO_KEEP
+# reads: numLikes, linkedinVideo.videoPlayMetadata.duration, document.totalPageCount,
+# poll.question/results, resharedPost.text, ...) and are streamed to disk one at a time,
+# so 10M-post exports need no more memory than 10k-post ones. Output is deterministic per seed.
+# Run from project root: python benchmarks/synthetic_data.py --posts 100000 [--output data/raw/synthetic_linkedin.json] [--force]
+# Never writes over an existing file (such as the real export) without --force.
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_OUTPUT = os.path.join('data', 'raw', 'synthetic_linkedin.json')
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+DATE_RANGE_DAYS = 730
+POSTS_PER_AUTHOR = 50
+
+HOOKS = [
+    "I made a mistake this week.", "We just hit a milestone.", "Hot take:", "Here's what nobody tells you about {topic}.",
+    "Today we launched something new.", "My biggest lesson from {topic}:", "Stop doing this in {topic}.",
+    "3 things I learned about {topic}", "Our team shipped {topic} in 30 days.", "Unpopular opinion about {topic}.",
+    "I was wrong about {topic}.", "What's the one thing you'd change about {topic}?",
+]
+TOPICS = [
+    "hiring", "leadership", "product launches", "AI", "fundraising", "remote work", "sales", "customer success",
+    "data science", "marketing", "B2B growth", "founder burnout", "pricing", "onboarding", "career growth",
+]
+BODY = [
+    "We tried everything and nothing worked until we talked to our customers.",
+    "It took me 10 years to understand this.", "The data says otherwise.",
+    "Most teams get this backwards.", "Here is the framework we use now.",
+    "Our new approach cut onboarding time in half.", "I still think about that conversation today.",
+    "Consistency beats intensity.", "Hiring is the most important thing a founder does.",
+    "You don't need more tools, you need fewer meetings.", "Feedback is a gift, even when it hurts.",
+    "Nobody talks about the boring parts.", "The best product teams obsess over the problem, not the solution.",
+    "We made a lot of mistakes along the way.", "Growth is a team sport.",
+    "Our customers told us exactly what to build.", "Small experiments compound.",
+    "I'm grateful for everyone who helped us get here.",
+]
+CLOSERS = [
+    "What do you think?", "Agree or disagree?", "Would love to hear your experience.", "Link in the comments.",
+    "Repost if this resonated.", "Follow for more.", "Thoughts?", "",
+]
+HASHTAGS = ["#leadership", "#startups", "#AI", "#hiring", "#growth", "#productmanagement", "#sales", "#careers"]
+EMOJIS = ["🚀", "👇", "💡", "🔥", "✅", "🙌", "📈", "👉"]
+MENTIONS = ["@Jane Doe", "@Acme Corp", "@John Smith", "@Blazel"]
+POLL_QUESTIONS = ["Which one would you pick?", "How does your team handle this?", "What matters most in a new role?"]
+
+def make_text(rng):
+    # Hook, a few body sentences (with line breaks), optional call to action, hashtags, emojis and mentions
+    topic = rng.choice(TOPICS)
+    parts = [rng.choice(HOOKS).format(topic=topic)]
+    for _ in range(rng.randint(1, 12)):
+        parts.append(rng.choice(BODY))
+        if rng.random() < 0.3:
+            parts.append("\n\n")
+    if rng.random() < 0.3:
+        parts.insert(rng.randint(1, len(parts)), rng.choice(EMOJIS))
+    if rng.random() < 0.15:
+        parts.append(rng.choice(MENTIONS))
+    parts.append(rng.choice(CLOSERS))
+    if rng.random() < 0.4:
+        parts.append(' '.join(rng.sample(HASHTAGS, rng.randint(1, 4))))
+    return ' '.join(p for p in parts if p)
+
+def make_author(author):
+    # Author-level properties are derived from the author id, so they are stable across posts
+    author_rng = random.Random(author)
+    followers = int(math.exp(author_rng.uniform(math.log(200), math.log(500000))))
+    return followers, author_rng.random() < 0.7
+
+def make_post(rng, idx, authors):
+    author = rng.randrange(len(authors))
+    if authors[author] is None:
+        authors[author] = make_author(author)
+    followers, reports_followers = authors[author]
+
+    posted = START_DATE + timedelta(milliseconds=rng.randrange(DATE_RANGE_DAYS * 86400 * 1000))
+    text = make_text(rng) if rng.random() > 0.02 else None
+
+    # Engagement scales with audience size, with a mild lift for media, questions and weekday mornings
+    media = rng.random()
+    lift = 1.0
+    if media < 0.15:
+        lift *= 1.3
+    elif media < 0.25:
+        lift *= 1.5
+    if text and '?' in text:
+        lift *= 1.2
+    if posted.weekday() < 5 and 7 <= posted.hour <= 10:
+        lift *= 1.25
+    likes = int(followers * 0.01 * lift * rng.lognormvariate(0, 1))
+
+    post = {
+        "url": f"https://www.linkedin.com/posts/synthetic-{idx}",
+        "text": text,
+        "numLikes": likes,
+        "numComments": int(likes * rng.uniform(0, 0.2)),
+        "numShares": int(likes * rng.uniform(0, 0.05)),
+        "authorName": f"Author {author}",
+        "postedAtISO": posted.strftime('%Y-%m-%dT%H:%M:%S.') + f"{posted.microsecond // 1000:03d}Z",
+        "isActivity": rng.random() < 0.05,
+    }
+    if reports_followers:
+        post["authorFollowersCount"] = followers
+    # Like the real export, a few posts leave out a count altogether
+    if rng.random() < 0.02:
+        del post[rng.choice(["numComments", "numShares"])]
+
+    if media < 0.15:
+        post["linkedinVideo"] = {"videoPlayMetadata": {"duration": rng.randint(5000, 900000)}}
+    elif media < 0.25:
+        post["document"] = {"totalPageCount": rng.randint(1, 30)}
+    elif media < 0.30:
+        post["poll"] = {"question": rng.choice(POLL_QUESTIONS),
+                        "results": {"uniqueVotersCount": int(likes * rng.uniform(1, 5))}}
+    elif media < 0.40:
+        post["resharedPost"] = {"text": make_text(rng)}
+    return post
+
+def iter_synthetic_posts(n_posts, seed=42):
+    rng = random.Random(seed)
+    authors = [None] * max(1, n_posts // POSTS_PER_AUTHOR)
+    for idx in range(n_posts):
+        yield make_post(rng, idx, authors)
+
+def write_export(path, n_posts, seed=42, fmt='json'):
+    # fmt 'json' writes a top-level array like the scraper export; 'jsonl' one post per line
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'json':
+            f.write('[')
+        for idx, post in enumerate(iter_synthetic_posts(n_posts, seed)):
+            if fmt == 'json':
+                f.write((',\n' if idx else '\n') + json.dumps(post))
+            else:
+                f.write(json.dumps(post) + '\n')
+        if fmt == 'json':
+            f.write('\n]\n')
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic LinkedIn export.")
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=['json', 'jsonl'], default='json')
+    parser.add_argument("--force", action='store_true', help="Overwrite --output if it already exists")
+    args = parser.parse_args()
+    if os.path.exists(args.output) and not args.force:
+        parser.error(f"{args.output} already exists; pass --force to overwrite it")
+
+    start = time.perf_counter()
+    write_export(args.output, args.posts, args.seed, args.format)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.posts} synthetic posts to {args.output} in {elapsed:.2f}s "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB)")
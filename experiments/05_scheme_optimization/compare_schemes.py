@@ -1,25 +1,99 @@
 import pandas as pd
 import os
+import argparse
 import numpy as np
 import scoring_v2
+# Run from project root: python -m src compare [--grid-max 50]
 
-def compare_scoring_schemes():
-    # 1. Provide a way to run the scoring update first
-    print("Updating scores with new schemes...")
-    scoring_v2.calculate_scores()
-    
-    # 2. Load the newly saved data
-    input_path = os.path.join("experiments", "05_scheme_optimization", "scored_data_v2.csv")
-    if not os.path.exists(input_path):
-        print(f"File not found: {input_path}")
+# All schemes are scored as one (posts x schemes) matrix straight from clean_data, and
+# Pearson, Spearman and top-k precision are computed for every column at once.
+# Schemes come from the scoring_v2 registry plus the reference schemes below; more can be
+# added as weight vectors or DataFrame.eval expressions, or generated with grid_schemes().
+
+REFERENCE_SCHEMES = {
+    'Scheme_A': (1, 3, 5),
+    'Scheme_C': '(likes_total * 1 + comments * 3 + shares * 7) / followers',
+    'Scheme_Baseline': (1, 1, 1),
+}
+
+def grid_schemes(max_weight, step=1):
+    # Candidate schemes with likes fixed at 1, e.g. for interactive sweeps over hundreds of schemes
+    weights = np.arange(0, max_weight + step / 2, step)
+    return {f"Scheme_L1_C{wc:g}_S{ws:g}": (1, wc, ws) for wc in weights for ws in weights}
+
+def score_matrix(df, schemes):
+    # Weight-vector schemes are a single matrix product; expressions are evaluated one by one
+    names = list(schemes)
+    scores = np.empty((len(df), len(names)))
+    weight_idx = [i for i, n in enumerate(names) if not isinstance(schemes[n], str)]
+    if weight_idx:
+        W = np.array([schemes[names[i]] for i in weight_idx], dtype=np.float64)
+        scores[:, weight_idx] = df[scoring_v2.WEIGHT_COLUMNS].to_numpy(dtype=np.float64) @ W.T
+    for i, name in enumerate(names):
+        if isinstance(schemes[name], str):
+            scores[:, i] = scoring_v2.score_scheme(df, schemes[name]).to_numpy(dtype=np.float64)
+    scores[~np.isfinite(scores)] = np.nan
+    return names, scores
+
+def masked_pearson(scores, target):
+    # Column-wise Pearson with pairwise NaN deletion (same as Series.corr) for every scheme at once
+    valid = ~np.isnan(scores) & ~np.isnan(target)[:, None]
+    n = valid.sum(axis=0)
+    x = np.where(valid, scores, 0.0)
+    y = np.where(valid, target[:, None], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xc = np.where(valid, x - x.sum(axis=0) / n, 0.0)
+        yc = np.where(valid, y - y.sum(axis=0) / n, 0.0)
+        r = (xc * yc).sum(axis=0) / np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum(axis=0))
+    r[n < 2] = np.nan
+    return r
+
+def spearman(scores, target):
+    # Average ranks per column (NaNs stay NaN). The target is re-ranked once per distinct
+    # NaN pattern, so schemes with missing values match Series.corr(method='spearman').
+    ranks = pd.DataFrame(scores).rank(method='average').to_numpy()
+    out = np.empty(scores.shape[1])
+    patterns = {}
+    for j in range(scores.shape[1]):
+        patterns.setdefault(np.isnan(scores[:, j]).tobytes(), []).append(j)
+    for key, cols in patterns.items():
+        missing = np.frombuffer(key, dtype=bool)
+        target_rank = pd.Series(np.where(missing, np.nan, target)).rank(method='average').to_numpy()
+        out[cols] = masked_pearson(ranks[:, cols], target_rank)
+    return out
+
+def precision_at_k(scores, labels, k):
+    # Share of true top-20% posts among each scheme's k highest scores (NaN scores rank last)
+    ranked = np.where(np.isnan(scores), -np.inf, scores)
+    top = np.argpartition(-ranked, k - 1, axis=0)[:k]
+    return labels[top].mean(axis=0)
+
+def evaluate_schemes(df, schemes, target_metric, top_frac=0.2):
+    names, scores = score_matrix(df, schemes)
+    target = df[target_metric].to_numpy(dtype=np.float64)
+    labels = df['is_top_20'].to_numpy(dtype=np.float64)
+    k = max(1, int(np.ceil(top_frac * len(df))))
+    return pd.DataFrame({
+        'Scheme': names,
+        'Corr_Continuous': masked_pearson(scores, target),
+        'Corr_Top20_Binary': masked_pearson(scores, labels),
+        'Spearman_Continuous': spearman(scores, target),
+        'Precision_Top20': precision_at_k(scores, labels, k),
+    })
+
+def compare_scoring_schemes(schemes=None):
+    # 1. Load clean data and score every scheme in memory (no intermediate CSV)
+    df = scoring_v2.load_clean_data()
+    if df is None:
         return
+    df = scoring_v2.preprocess(df)
+    if schemes is None:
+        schemes = {**scoring_v2.SCHEMES, **REFERENCE_SCHEMES}
 
-    df = pd.read_csv(input_path)
-    
-    # 3. Define Target (Matching src/models.py logic)
+    # 2. Define Target (Matching src/models.py logic)
     valid_er_count = df['ER_followers'].count()
     total_count = len(df)
-    
+
     if valid_er_count < total_count * 0.1:
         print(f"WARNING: Too few valid ER_followers ({valid_er_count}/{total_count}). "
               "Falling back to raw 'engagements' for target definition.")
@@ -30,70 +104,51 @@ def compare_scoring_schemes():
     else:
         target_metric = 'ER_followers'
         validation_df = df.dropna(subset=['ER_followers']).copy()
-        
+
     threshold = validation_df[target_metric].quantile(0.8)
     validation_df['is_top_20'] = (validation_df[target_metric] >= threshold).astype(int)
-    
+
     print(f"\nTarget Definition: Top 20% by {target_metric} (Threshold: {threshold:.4f})")
     print(f"Sample size for correlation: {len(validation_df)}")
 
-    # 4. Identify all schemes
-    # Look for columns starting with 'Scheme_'
-    scheme_cols = [c for c in df.columns if c.startswith('Scheme_') and not c.startswith('Scheme_C_')] 
-    # Note: Scheme_C is in there, but just filter generally
-    
-    predictions = {}
-    
-    print(f"\nComparing {len(scheme_cols)} schemes...")
-    
-    results = []
-    
-    for scheme in scheme_cols:
-        # Correlation with Continuous Target defined above
-        # Check if scheme column exists in validation_df (it should)
-        if scheme not in validation_df.columns:
-            continue
-            
-        corr_continuous = validation_df[scheme].corr(validation_df[target_metric])
-        
-        # Correlation with Binary Target (Point Biserial)
-        corr_binary = validation_df[scheme].corr(validation_df['is_top_20'])
-        
-        results.append({
-            'Scheme': scheme,
-            'Corr_Continuous': corr_continuous,
-            'Corr_Top20_Binary': corr_binary
-        })
-        
-    # 5. Create DataFrame and Sort
-    results_df = pd.DataFrame(results)
-    
-    # Sort by Binary Correlation (Primary Goal)
+    # 3. Evaluate all schemes in one vectorized pass
+    print(f"\nComparing {len(schemes)} schemes...")
+    results_df = evaluate_schemes(validation_df, schemes, target_metric)
+
+    # 4. Sort by Binary Correlation (Primary Goal)
     results_df = results_df.sort_values('Corr_Top20_Binary', ascending=False).reset_index(drop=True)
-    
+
     print("\n--- Scheme Comparison Results (Ranked by Top 20% Correlation) ---")
-    print(results_df) # Print all
-    
+    print(results_df.head(50).to_string())
+
     # Comparison Summary
     best_scheme = results_df.iloc[0]
-    # Check if Baseline and C exist before trying to print them (Schemes might have changed in v2)
-    # But C is still there in scoring_v2.py
-    
+
     print("\n--- Summary ---")
     print(f"Best Scheme: {best_scheme['Scheme']} (Corr: {best_scheme['Corr_Top20_Binary']:.4f})")
-    
+
     if 'Scheme_C' in results_df['Scheme'].values:
         original_c = results_df[results_df['Scheme'] == 'Scheme_C'].iloc[0]
         print(f"Original Best (C): {original_c['Corr_Top20_Binary']:.4f}")
-        
+
     if 'Scheme_Baseline' in results_df['Scheme'].values:
         baseline_scheme = results_df[results_df['Scheme'] == 'Scheme_Baseline'].iloc[0]
         print(f"Baseline (1x1x1): {baseline_scheme['Corr_Top20_Binary']:.4f}")
-    
+
     # Save results
     results_path = os.path.join("experiments", "05_scheme_optimization", "scheme_comparison_results.csv")
     results_df.to_csv(results_path, index=False)
     print(f"\nFull results saved to {results_path}")
+    return results_df
 
 if __name__ == "__main__":
-    compare_scoring_schemes()
+    parser = argparse.ArgumentParser(description="Compare engagement scoring schemes against the top-20% target.")
+    parser.add_argument("--grid-max", type=float, default=None,
+                        help="Also compare every (1, c, s) scheme with c, s in 0..GRID_MAX")
+    parser.add_argument("--grid-step", type=float, default=1)
+    args = parser.parse_args()
+
+    schemes = {**scoring_v2.SCHEMES, **REFERENCE_SCHEMES}
+    if args.grid_max is not None:
+        schemes.update(grid_schemes(args.grid_max, args.grid_step))
+    compare_scoring_schemes(schemes)
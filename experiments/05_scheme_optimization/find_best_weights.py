@@ -1,98 +1,145 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import scoring_v2
+# Run from project root: python -m src weights [--step 0.5]
 
-def find_best_weights():
+# Vectorized weight search.
+# For score = X @ w with X = [likes, comments, shares], the Pearson correlation with the target y is
+#   corr(w) = (w . cov(X, y)) / sqrt(w' cov(X) w) / std(y)
+# so after one pass over the data (3x3 covariance + 3-vector) any number of weight vectors
+# can be evaluated with a few matrix products, independent of the number of posts.
+
+FEATURES = ['likes_total', 'comments', 'shares']
+SURFACE_PATH = os.path.join("experiments", "05_scheme_optimization", "weight_surface.csv")
+
+def sufficient_stats(X, y):
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    Xc = X - X.mean(axis=0)
+    yc = y - y.mean()
+    return {
+        'cov_xx': Xc.T @ Xc,       # 3x3
+        'cov_xy': Xc.T @ yc,       # 3
+        'var_y': float(yc @ yc),
+        'n': len(y),
+    }
+
+def correlations(weights, stats, block_size=1_000_000):
+    # weights: (m, 3) array of (likes, comments, shares) weights -> (m,) Pearson correlations.
+    # Evaluated in blocks so memory stays bounded for very large candidate sets.
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    out = np.empty(len(weights))
+    for start in range(0, len(weights), block_size):
+        W = weights[start:start + block_size]
+        num = W @ stats['cov_xy']
+        var_s = np.einsum('ij,jk,ik->i', W, stats['cov_xx'], W)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = num / np.sqrt(var_s * stats['var_y'])
+        # Constant scores (zero variance) have no defined correlation, like np.corrcoef
+        r[var_s <= 0] = np.nan
+        out[start:start + block_size] = r
+    return out
+
+def grid_surface(stats, comment_weights, share_weights, likes_weight=1.0):
+    # Full correlation surface over a (comments x shares) grid with likes fixed
+    wc, ws = np.meshgrid(comment_weights, share_weights, indexing='ij')
+    W = np.column_stack([np.full(wc.size, likes_weight), wc.ravel(), ws.ravel()])
+    return correlations(W, stats).reshape(wc.shape)
+
+def optimize_weights(stats, nonnegative=True):
+    # Continuous maximum of the point-biserial correlation, likes weight fixed at 1.
+    # Unconstrained, corr is maximised by w ~ inv(cov_xx) @ cov_xy (the least-squares direction).
+    w = np.linalg.lstsq(stats['cov_xx'], stats['cov_xy'], rcond=None)[0]
+    if w[0] > 0:
+        w = w / w[0]
+        if not nonnegative or (w >= 0).all():
+            return w, float(correlations(w, stats)[0])
+
+    # Otherwise solve the bounded problem numerically
+    from scipy.optimize import minimize
+    bounds = [(0, None), (0, None)] if nonnegative else [(None, None), (None, None)]
+    x0 = np.clip(w[1:], 0, None) if w[0] > 0 else np.ones(2)
+
+    def neg_corr(x):
+        r = correlations(np.concatenate(([1.0], x)), stats)[0]
+        return 1.0 if np.isnan(r) else -r
+
+    res = minimize(neg_corr, x0, method='L-BFGS-B', bounds=bounds)
+    w = np.concatenate(([1.0], res.x))
+    return w, float(correlations(w, stats)[0])
+
+def find_best_weights(max_weight=200, step=5, save_surface=True):
     # 1. Load Data
-    input_path = os.path.join("data", "intermediate", "clean_data.csv")
-    if not os.path.exists(input_path):
-        print(f"File not found: {input_path}")
+    df = scoring_v2.load_clean_data()
+    if df is None:
         return
 
-    df = pd.read_csv(input_path)
-    
     # 2. Preprocess
     # Fill NaNs
     df['likes_total'] = pd.to_numeric(df['likes_total'], errors='coerce').fillna(0)
     df['comments'] = pd.to_numeric(df['comments'], errors='coerce').fillna(0)
     df['shares'] = pd.to_numeric(df['shares'], errors='coerce').fillna(0)
     df['engagements'] = pd.to_numeric(df['engagements'], errors='coerce').fillna(0)
-    
+
     # 3. Define Target (Raw Engagements, Top 20%)
     target_metric = 'engagements'
     threshold = df[target_metric].quantile(0.8)
     df['is_top_20'] = (df[target_metric] >= threshold).astype(int)
-    
+
     print(f"Target: Top 20% of {target_metric} (Threshold: {threshold})")
     print(f"Data shape: {df.shape}")
-    
+
     # 4. Grid Search
     # Weights for Likes fixed at 1.
-    # varies Comments and Shares from 0 to 100.
-    
-    best_corr = -1
-    best_weights = (1, 1, 1) # L, C, S
-    
-    # Vectors for fast calculation
-    L = df['likes_total'].values
-    C = df['comments'].values
-    S = df['shares'].values
-    Y = df['is_top_20'].values
-    
-    print("Starting Grid Search (Weights 0-200)...")
-    
-    results = []
-    
-    # Using steps of 5 for speed/coverage, then we can refine if needed
-    # User said "much higher weights", so let's go up to 200.
-    weight_range = range(0, 201, 5) 
-    
-    total_combinations = len(weight_range) * len(weight_range)
-    count = 0
-    
-    for wc in weight_range:
-        for ws in weight_range:
-            # Calculate Score
-            # Avoid all zeros
-            if wc == 0 and ws == 0:
-                continue
-                
-            score = L * 1 + C * wc + S * ws
-            
-            # Correlation
-            # We can use np.corrcoef but it returns a matrix. 
-            # Or just pd.Series.corr which is slower but convenient.
-            # Using numpy for speed:
-            # Pearson correlation
-            
-            non_zero_score_mask = score != 0 # Optional: handled by correlation? 
-            # Actually standard pearson handles it fine unless std is 0.
-            
-            # Fast binary correlation (Point Biserial is just Pearson with one binary var)
-            corr = np.corrcoef(score, Y)[0, 1]
-            
-            if np.isnan(corr):
-                continue
-                
-            if corr > best_corr:
-                best_corr = corr
-                best_weights = (1, wc, ws)
-            
-            # Store some data for distribution analysis
-            if count % 500 == 0:
-                pass # print(f"Scanned {count}/{total_combinations}...")
-            count += 1
-            
+    # varies Comments and Shares from 0 to max_weight, all combinations in one batched pass.
+    stats = sufficient_stats(df[FEATURES].values, df['is_top_20'].values)
+
+    weight_range = np.arange(0, max_weight + step / 2, step)
+    print(f"Starting Grid Search (Weights 0-{max_weight}, step {step}: {len(weight_range) ** 2} combinations)...")
+    surface = grid_surface(stats, weight_range, weight_range)
+    # Avoid all zeros (likes only), as in the original search
+    surface[0, 0] = np.nan
+
+    best_idx = np.unravel_index(np.nanargmax(surface), surface.shape)
+    best_corr = surface[best_idx]
+    best_weights = (1, weight_range[best_idx[0]], weight_range[best_idx[1]]) # L, C, S
+
     print("\n--- Optimization Results ---")
     print(f"Best Correlation: {best_corr:.5f}")
-    print(f"Best Weights: Likes=1, Comments={best_weights[1]}, Shares={best_weights[2]}")
-    
-    # Refined Search around the best?
-    # If best is at the edge (e.g. 200), we might need to go higher.
-    # If best is (1, 85, 20), we could check 80-90.
-    # For now, this coarse grain is likely enough to answer "what is the best scheme".
-    
-    print(f"\nWinning Formula: 1 * Likes + {best_weights[1]} * Comments + {best_weights[2]} * Shares")
+    print(f"Best Weights: Likes=1, Comments={best_weights[1]:g}, Shares={best_weights[2]:g}")
+
+    # Continuous refinement (no grid resolution limit)
+    opt_weights, opt_corr = optimize_weights(stats)
+    print(f"\nContinuous optimum: Likes=1, Comments={opt_weights[1]:.3f}, Shares={opt_weights[2]:.3f} "
+          f"(Corr: {opt_corr:.5f})")
+
+    print(f"\nWinning Formula: 1 * Likes + {best_weights[1]:g} * Comments + {best_weights[2]:g} * Shares")
+
+    if save_surface:
+        wc, ws = np.meshgrid(weight_range, weight_range, indexing='ij')
+        pd.DataFrame({
+            'likes_weight': 1,
+            'comments_weight': wc.ravel(),
+            'shares_weight': ws.ravel(),
+            'corr_top20': surface.ravel(),
+        }).to_csv(SURFACE_PATH, index=False)
+        print(f"Correlation surface saved to {SURFACE_PATH}")
+
+    return {
+        'surface': surface,
+        'weight_range': weight_range,
+        'best_weights': best_weights,
+        'best_corr': best_corr,
+        'optimized_weights': tuple(opt_weights),
+        'optimized_corr': opt_corr,
+    }
 
 if __name__ == "__main__":
-    find_best_weights()
+    parser = argparse.ArgumentParser(description="Search scoring weights that best separate the top 20% of posts.")
+    parser.add_argument("--max-weight", type=float, default=200)
+    parser.add_argument("--step", type=float, default=5, help="Grid step; fine steps (e.g. 0.1) are cheap")
+    parser.add_argument("--no-surface", action='store_true', help="Don't write the full correlation surface CSV")
+    args = parser.parse_args()
+    find_best_weights(args.max_weight, args.step, not args.no_surface)
@@ -1,14 +1,13 @@
 import pandas as pd
-import os
 import numpy as np
+import argparse
+import scoring_v2
+# Run from project root: python -m src correlation
 
 def analyze():
-    input_path = os.path.join("data", "intermediate", "clean_data.csv")
-    if not os.path.exists(input_path):
-        print(f"File not found: {input_path}")
+    df = scoring_v2.load_clean_data()
+    if df is None:
         return
-
-    df = pd.read_csv(input_path)
     
     # Preprocessing (same as scoring_functions.py)
     df['followers'] = pd.to_numeric(df['followers'], errors='coerce')
@@ -44,4 +43,6 @@ def analyze():
     print(valid_er[schemes + ['is_top_20']].corr()['is_top_20'])
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlation of each scheme with the top-20% target.")
+    parser.parse_args()
     analyze()
@@ -1,21 +1,32 @@
 import pandas as pd
 import os
+import argparse
 import numpy as np
+# Table I/O (and the compact dtype schema applied on load) shared with src/, which the project
+# CLI puts on the path. Run from project root: python -m src score-v2
+import storage
 
-def calculate_scores():
-    # Note: Path adjusted for experiment folder (going up 2 levels)
-    # Actually, scripts usually run from root. We will assume execution from root for simplicity or handle paths.
-    input_path = os.path.join("data", "intermediate", "clean_data.csv")
-    output_path = os.path.join("experiments", "05_scheme_optimization", "scored_data_v2.csv")
-    
-    if not os.path.exists(input_path):
-        print(f"File not found: {input_path}")
-        return
-        
-    print(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
-    
-    # Preprocessing
+CLEAN_DATA = os.path.join("data", "intermediate", "clean_data.csv")
+
+# Scheme registry: (likes, comments, shares) weights, or an expression evaluated with DataFrame.eval
+SCHEMES = {
+    # --- ABSOLUTE BEST SCHEME (Grid Search Result) ---
+    # Optimized Weights: Likes=1, Comments=15, Shares=0
+    'Scheme_Optimized': (1, 15, 0),
+    # Also include the other strong contenders for reference
+    'Scheme_Discussion': (1, 15, 5),
+    'Scheme_B': (1, 5, 3),
+}
+
+WEIGHT_COLUMNS = ['likes_total', 'comments', 'shares']
+
+def score_scheme(df, spec):
+    if isinstance(spec, str):
+        return df.eval(spec)
+    likes_w, comments_w, shares_w = spec
+    return df['likes_total'] * likes_w + df['comments'] * comments_w + df['shares'] * shares_w
+
+def preprocess(df):
     df['followers'] = pd.to_numeric(df['followers'], errors='coerce')
     df['engagements'] = pd.to_numeric(df['engagements'], errors='coerce').fillna(0)
     df['likes_total'] = pd.to_numeric(df['likes_total'], errors='coerce').fillna(0)
@@ -24,14 +35,30 @@ def calculate_scores():
     
     # Calculate ER (Needed for target definition logic in compare_schemes)
     df['ER_followers'] = df['engagements'] / df['followers']
+    return df
+
+def load_clean_data():
+    # clean_data with the schema dtypes, or None when the clean stage has not run yet
+    if not storage.table_exists(CLEAN_DATA):
+        print(f"File not found: {CLEAN_DATA}")
+        return None
+    print(f"Loading data from {CLEAN_DATA}...")
+    return storage.read_table(CLEAN_DATA)
+
+def calculate_scores():
+    # Note: Path adjusted for experiment folder (going up 2 levels)
+    # Actually, scripts usually run from root. We will assume execution from root for simplicity or handle paths.
+    output_path = os.path.join("experiments", "05_scheme_optimization", "scored_data_v2.csv")
     
-    # --- ABSOLUTE BEST SCHEME (Grid Search Result) ---
-    # Optimized Weights: Likes=1, Comments=15, Shares=0
-    df['Scheme_Optimized'] = df['likes_total'] * 1 + df['comments'] * 15 + df['shares'] * 0
+    df = load_clean_data()
+    if df is None:
+        return
     
-    # Also include the other strong contenders for reference
-    df['Scheme_Discussion'] = df['likes_total'] * 1 + df['comments'] * 15 + df['shares'] * 5
-    df['Scheme_B'] = df['likes_total'] * 1 + df['comments'] * 5 + df['shares'] * 3
+    # Preprocessing
+    df = preprocess(df)
+    
+    for name, spec in SCHEMES.items():
+        df[name] = score_scheme(df, spec)
     
     # Save
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -39,4 +66,6 @@ def calculate_scores():
     print(f"Scored data saved to {output_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score clean_data with the experimental schemes.")
+    parser.parse_args()
     calculate_scores()
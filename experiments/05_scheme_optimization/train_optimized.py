@@ -1,48 +1,57 @@
 import pandas as pd
 import numpy as np
-import lightgbm as lgb
 import os
-import joblib
-from sklearn.metrics import classification_report, roc_auc_score
+import argparse
 # Import the isolated scoring function
 import scoring_v2
 
+# Shared feature store and SHAP cache from src/, which the project CLI puts on the path.
+# Run from project root: python -m src train-optimized
+import feature_store
+import shap_cache
+
+EXPERIMENT_DIR = os.path.join("experiments", "05_scheme_optimization")
+TARGET_SCHEME = 'Scheme_Optimized'
+
+def scheme_target(df):
+    # Top 20% by the scheme's score, with scoring_v2's preprocessing
+    df = scoring_v2.preprocess(df)
+    scores = scoring_v2.score_scheme(df, scoring_v2.SCHEMES[TARGET_SCHEME])
+    threshold = scores.quantile(0.8)
+    out = pd.DataFrame({f'is_top20_{TARGET_SCHEME}': (scores >= threshold).astype(int)})
+    out.attrs = {'target_metric': TARGET_SCHEME, 'threshold': float(threshold)}
+    return out
+
+# Stored next to the shared features; only this column is computed when it is missing or the weights change
+TARGET_DEFINITION = {
+    'name': f'is_top20_{TARGET_SCHEME}', 'role': 'target',
+    'inputs': ['followers', 'engagements', 'likes_total', 'comments', 'shares'],
+    'func': scheme_target, 'params': {'weights': scoring_v2.SCHEMES[TARGET_SCHEME]},
+}
+
 def train_model():
-    print("Step 1: Updating scores via scoring_v2...")
-    scoring_v2.calculate_scores()
-    
-    input_path = os.path.join("experiments", "05_scheme_optimization", "scored_data_v2.csv")
-    if not os.path.exists(input_path):
-        print(f"Data not found: {input_path}")
-        return
-        
-    print(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
+    import lightgbm as lgb
+    import joblib
+    from sklearn.metrics import classification_report, roc_auc_score
+
+    print(f"Loading features from {feature_store.STORE_DIR}...")
+    manifest = feature_store.build_store(extra=[TARGET_DEFINITION])
     
     # Define Target: Top 20% by Scheme_Optimized
     # The user asked to "train a new model on the new optimized scheme".
     # This implies using Scheme_Optimized as the ground truth for "High Performance".
-    
-    target_metric = 'Scheme_Optimized'
-    threshold = df[target_metric].quantile(0.8)
-    df['is_high_performing'] = (df[target_metric] >= threshold).astype(int)
-    
-    print(f"Target: Top 20% by {target_metric} (Threshold: {threshold:.2f})")
+    target_col = TARGET_DEFINITION['name']
+    target = feature_store.info(target_col, manifest)
+    print(f"Target: Top 20% by {target['target_metric']} (Threshold: {target['threshold']:.2f})")
     
     # Features (Same as original model)
-    feature_cols = [
-        'weekday', 'hour', 'word_count', 'has_emoji', 'has_hashtag',
-        'video_duration', 'doc_pages'
-    ]
-    media_cols = [c for c in df.columns if c.startswith('media_type_')]
-    feature_cols.extend(media_cols)
+    feature_cols = feature_store.feature_columns(manifest)
+    df = feature_store.load(feature_cols + [target_col, 'post_date'], manifest=manifest)
     
-    X = df[feature_cols].fillna(0)
-    y = df['is_high_performing']
-    
-    # Time Split
-    df['post_date'] = pd.to_datetime(df['post_date'], format='mixed')
-    df = df.sort_values('post_date')
+    # Time Split (sorted before taking X/y, so the test set is the most recent 20%)
+    df = df.sort_values('post_date', kind='mergesort')
+    X = df[feature_cols]
+    y = df[target_col]
     
     split_idx = int(len(df) * 0.8)
     X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
@@ -64,8 +73,7 @@ def train_model():
     print(f"ROC AUC: {roc_auc_score(y_test, y_prob):.4f}")
     
     # Save Model
-    model_dir = os.path.dirname(input_path)
-    model_path = os.path.join(model_dir, "model_optimized.pkl")
+    model_path = os.path.join(EXPERIMENT_DIR, "model_optimized.pkl")
     joblib.dump(clf, model_path)
     print(f"Optimized Model saved to {model_path}")
 
@@ -74,21 +82,19 @@ def train_model():
     import matplotlib.pyplot as plt
 
     print("Computing SHAP values...")
-    explainer = shap.TreeExplainer(clf)
-    shap_values = explainer.shap_values(X_test)
-    
-    # Handle SHAP output format (lightgbm binary returns list or array depending on version)
-    if isinstance(shap_values, list):
-        shap_values = shap_values[1] # Positive class
+    # Reused from the cache next to the model when these rows were already explained
+    shap_values = shap_cache.shap_values(clf, X_test, model_path)
         
     # Summary Plot
     plt.figure()
     shap.summary_plot(shap_values, X_test, show=False)
     
-    shap_plot_path = os.path.join(model_dir, "shap_summary_optimized.png")
+    shap_plot_path = os.path.join(EXPERIMENT_DIR, "shap_summary_optimized.png")
     plt.savefig(shap_plot_path, bbox_inches='tight')
     plt.close()
     print(f"SHAP summary plot saved to {shap_plot_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the classifier on the Scheme_Optimized target.")
+    parser.parse_args()
     train_model()
@@ -0,0 +1,78 @@
+# Single entry point for every stage and experiment: python -m src <command> [options]
+# Run from the project root (data paths are relative to it). Each command runs the matching
+# script exactly as `python src/<script>.py` would, with the same options. Nothing is imported
+# up front and the stage modules load lightgbm, shap, sklearn and matplotlib only inside the
+# functions that use them, so --help and light commands start quickly.
+#
+# python -m src --help
+# python -m src clean --chunksize 200000
+# python -m src train --tuned
+# python -m src compare --grid-max 50
+
+import os
+import runpy
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SRC_DIR)
+SCHEME_EXPERIMENT_DIR = os.path.join(PROJECT_DIR, "experiments", "05_scheme_optimization")
+
+# command: (module, directory, summary)
+COMMANDS = {
+    # Pipeline stages, in run order
+    'pre-clean': ('pre_clean_data', SRC_DIR, "Convert the scraper JSON export(s) to CSV"),
+    'ingest': ('ingest_data', SRC_DIR, "Load and verify the pre-cleaned CSV"),
+    'clean': ('data_cleaning', SRC_DIR, "Clean posts and extract content features"),
+    'score': ('scoring_functions', SRC_DIR, "Engagement scores and the model_ready table"),
+    'features': ('feature_store', SRC_DIR, "Build or update the feature store"),
+    'nlp': ('feature_engineering', SRC_DIR, "Linguistic patterns and keyword analysis"),
+    'train': ('models', SRC_DIR, "Train the classifier and compute SHAP values"),
+    'viz': ('visualize_analysis', SRC_DIR, "SHAP dependence and binning plots"),
+    'pipeline': ('pipeline', SRC_DIR, "Run every stage that is out of date"),
+    'incremental': ('incremental', SRC_DIR, "Clean and score only new or changed posts"),
+    # Model tools
+    'tune': ('tuning', SRC_DIR, "Hyperparameter search with time-series CV"),
+    'backtest': ('backtest', SRC_DIR, "Walk-forward backtest"),
+    'export': ('tree_export', SRC_DIR, "Export the model for the NumPy-only runtime"),
+    'serve': ('scoring_service', SRC_DIR, "Draft scoring service (HTTP, Unix socket or --posts file)"),
+    'slots': ('posting_time', SRC_DIR, "Rank the 168 weekday x hour posting slots for drafts"),
+    # Scheme optimization experiment
+    'weights': ('find_best_weights', SCHEME_EXPERIMENT_DIR, "Search scoring weights for the top-20% target"),
+    'compare': ('compare_schemes', SCHEME_EXPERIMENT_DIR, "Compare scoring schemes against the top-20% target"),
+    'score-v2': ('scoring_v2', SCHEME_EXPERIMENT_DIR, "Score clean_data with the experimental schemes"),
+    'correlation': ('reproduce_correlation', SCHEME_EXPERIMENT_DIR, "Correlation of each scheme with the target"),
+    'train-optimized': ('train_optimized', SCHEME_EXPERIMENT_DIR, "Train on the Scheme_Optimized target"),
+}
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: python -m src <command> [options]", "",
+             "Run `python -m src <command> --help` for a command's options.", "", "commands:"]
+    lines += [f"  {name:<{width}}  {summary}" for name, (_, _, summary) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command = argv[0]
+    if command not in COMMANDS:
+        print(f"Unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module, directory, _ = COMMANDS[command]
+    # src/ is always importable (experiments use storage, feature_store, ...); the command's own
+    # directory goes first so its sibling imports (e.g. scoring_v2) resolve
+    for path in (SRC_DIR, directory):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+    sys.argv = [module] + argv[1:]  # run_module replaces argv[0] with the script path
+    # Runs the module as __main__, so its argparse block handles the options; its worker
+    # processes (spawn or fork) re-import it by name
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# Walk-forward backtest of the engagement classifier.
+# Posts are sorted by post_date and cut at calendar boundaries (monthly by default). For every
+# cut the model is trained on the posts before it (all of them, or only the last
+# --train-periods windows) and evaluated on each of the next --horizons windows, so the results
+# show both how well the model does one window ahead and how quickly it degrades as it ages.
+# Cuts are trained in parallel processes.
+# Run from project root: python src/backtest.py [--freq MS] [--horizons 3] [--tuned]
+
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import feature_store
+import tuning
+
+RESULTS_PATH = os.path.join("data", "models", "backtest_results.csv")
+
+def precision_at_top(y_true, y_prob, frac=0.2):
+    # Share of truly high-performing posts among the model's top `frac` of predictions
+    k = max(1, math.ceil(frac * len(y_true)))
+    top = np.argsort(-y_prob, kind='stable')[:k]
+    return float(y_true[top].mean())
+
+def window_bounds(dates, freq):
+    # Row offsets of every calendar boundary inside the (sorted) date range
+    edges = pd.date_range(dates.iloc[0].normalize(), dates.iloc[-1], freq=freq)
+    edges = edges[edges > dates.iloc[0]]
+    positions = np.searchsorted(dates.to_numpy(), edges.to_numpy(), side='left')
+    return list(edges), [0] + [int(p) for p in positions] + [len(dates)]
+
+# --- Worker ---
+
+_data = {}
+
+def _init_worker(X, y, params):
+    _data.update(X=X, y=y, params=params)
+
+def run_cut(task):
+    # Train on rows [train_start, train_end), evaluate on each (window_start, start, end) test window
+    import lightgbm as lgb
+    from sklearn.metrics import roc_auc_score
+    cut_date, train_start, train_end, windows = task
+    X, y = _data['X'], _data['y']
+    clf = lgb.LGBMClassifier(random_state=42, verbose=-1, n_jobs=1, **_data['params'])
+    clf.fit(X.iloc[train_start:train_end], y[train_start:train_end])
+
+    rows = []
+    for horizon, (window_start, start, end) in enumerate(windows, start=1):
+        y_test = y[start:end]
+        y_prob = clf.predict_proba(X.iloc[start:end])[:, 1]
+        rows.append({
+            'train_end': cut_date,
+            'test_start': window_start,
+            'horizon': horizon,
+            'train_rows': train_end - train_start,
+            'test_rows': end - start,
+            'test_positive_rate': float(y_test.mean()),
+            # AUC is undefined when a window has only one class
+            'roc_auc': float(roc_auc_score(y_test, y_prob)) if len(np.unique(y_test)) > 1 else np.nan,
+            'precision_top20': precision_at_top(y_test, y_prob),
+        })
+    return rows
+
+# --- Backtest ---
+
+def run_backtest(freq='MS', horizons=3, train_periods=None, min_train_rows=200, min_test_rows=20,
+                 tuned=False, workers=None):
+    print(f"Loading features from {feature_store.STORE_DIR}...")
+    manifest = feature_store.build_store()
+    feature_cols = feature_store.feature_columns(manifest)
+    df = feature_store.load(feature_cols + ['is_high_performing', 'post_date'], manifest=manifest)
+    df = df.dropna(subset=['post_date']).sort_values('post_date', kind='mergesort').reset_index(drop=True)
+    X, y = df[feature_cols], df['is_high_performing'].to_numpy()
+
+    params = {}
+    if tuned:
+        with open(tuning.BEST_PARAMS_FILE, 'r', encoding='utf-8') as f:
+            params = json.load(f)['params']
+        print(f"Using tuned parameters from {tuning.BEST_PARAMS_FILE}")
+
+    # bounds[i] is the first row on/after edge i-1; window i spans rows bounds[i]..bounds[i+1]
+    edges, bounds = window_bounds(df['post_date'], freq)
+    tasks = []
+    for cut in range(1, len(bounds) - 1):
+        train_start = 0 if train_periods is None else bounds[max(0, cut - train_periods)]
+        train_end = bounds[cut]
+        windows = [(edges[w - 1], bounds[w], bounds[w + 1])
+                   for w in range(cut, min(cut + horizons, len(bounds) - 1))
+                   if bounds[w + 1] - bounds[w] >= min_test_rows]
+        if train_end - train_start >= min_train_rows and windows:
+            tasks.append((edges[cut - 1], train_start, train_end, windows))
+    if not tasks:
+        print(f"No backtest windows with at least {min_train_rows} training posts; try a finer --freq.")
+        return None
+    print(f"Walk-forward backtest: {len(tasks)} training cuts (freq {freq}, up to {horizons} windows ahead)")
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    # spawn, not fork: LightGBM's OpenMP runtime is not fork-safe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(X, y, params)) as pool:
+        results = pd.DataFrame([row for rows in pool.map(run_cut, tasks) for row in rows])
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    results.to_csv(RESULTS_PATH, index=False)
+
+    print("\n--- Next-window performance per training cut ---")
+    print(results[results['horizon'] == 1].drop(columns=['horizon', 'test_start']).to_string(index=False))
+    print("\n--- Degradation by model age (windows since training) ---")
+    summary = results.groupby('horizon')[['roc_auc', 'precision_top20']].agg(['mean', 'std', 'count'])
+    print(summary.to_string())
+    print(f"\nBacktest results saved to {RESULTS_PATH}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the engagement classifier.")
+    parser.add_argument("--freq", default='MS', help="Window length as a pandas frequency (W, MS, QS, ...)")
+    parser.add_argument("--horizons", type=int, default=3, help="Windows evaluated after each training cut")
+    parser.add_argument("--train-periods", type=int, default=None,
+                        help="Train on only the last N windows (default: expanding, all history)")
+    parser.add_argument("--min-train-rows", type=int, default=200)
+    parser.add_argument("--min-test-rows", type=int, default=20)
+    parser.add_argument("--tuned", action='store_true', help="Use the parameters saved by src/tuning.py")
+    parser.add_argument("--workers", type=int, default=None, help="Training processes (default: all cores)")
+    args = parser.parse_args()
+    run_backtest(args.freq, args.horizons, args.train_periods, args.min_train_rows, args.min_test_rows,
+                 args.tuned, args.workers)
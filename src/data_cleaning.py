@@ -2,6 +2,10 @@ import pandas as pd
 import os
 import re
 import numpy as np
+import argparse
+import storage
+import instrumentation
+import emoji_data
 
 def clean_text(text):
     if pd.isna(text):
@@ -12,12 +16,19 @@ def count_words(text):
     return len(clean_text(text).split())
 
 def has_emoji(text):
-    # Basic emoji detection (this is a simplified regex, might need a library for full coverage but standard for quick check)
-    # Using a range that covers many emojis
-    return bool(re.search(r'[^\x00-\x7F]', clean_text(text)))
+    return bool(_EMOJI.search(clean_text(text)))
 
 def has_hashtag(text):
-    return bool(re.search(r'#\w+', clean_text(text)))
+    return bool(_HASHTAG.search(clean_text(text)))
+
+def count_emojis(text):
+    return len(_EMOJI.findall(clean_text(text)))
+
+def count_hashtags(text):
+    return len(_HASHTAG.findall(clean_text(text)))
+
+def count_mentions(text):
+    return len(_MENTION.findall(clean_text(text)))
 
 def infer_media_type(row):
     # Priority: Video > Document > Poll > Text (Image/Carousel hard to distinguish without specific cols)
@@ -30,13 +41,242 @@ def infer_media_type(row):
     # Default to Text (which includes Images/Carousels if not distinguishable)
     return 'Text'
 
-def clean_data():
-    input_path = os.path.join("data", "intermediate", "raw_linkedin_data.csv")
-    output_path = os.path.join("data", "intermediate", "clean_data.csv")
+# --- Vectorized feature engine ---
+# Column-level equivalents of the functions above. Outputs are identical to running
+# count_words / has_emoji / count_emojis / has_hashtag / count_hashtags / count_mentions /
+# infer_media_type row by row.
+TEXT_BATCH_SIZE = 5000
+
+# str.split() whitespace as UTF-8: ASCII 9-13 and 28-32, plus a few multi-byte sequences
+# (NBSP, em space, ...) packed into ints for a single isin check
+_MULTIBYTE_SPACE = [ch.encode('utf-8') for ch in '\x85\xa0\u1680\u2028\u2029\u202f\u205f\u3000' + ''.join(map(chr, range(0x2000, 0x200b)))]
+_SPACE_2BYTE = np.array([int.from_bytes(b, 'big') for b in _MULTIBYTE_SPACE if len(b) == 2])
+_SPACE_3BYTE = np.array([int.from_bytes(b, 'big') for b in _MULTIBYTE_SPACE if len(b) == 3])
+
+# Emoji classes of every code point, one lookup table over all of Unicode (1.1 MB)
+_EMOJI_CHAR, _TEXT_CHAR, _REGIONAL, _EXTEND, _SKIN_TONE, _KEYCAP, _VS16, _ZWJ = 1, 2, 4, 8, 16, 32, 64, 128
+_CLASS = np.zeros(0x110000, dtype=np.uint8)
+for _bit, _ranges in ((_EMOJI_CHAR, emoji_data.EMOJI_PRESENTATION + emoji_data.SUPPLEMENTARY),
+                      (_TEXT_CHAR, emoji_data.TEXT_PRESENTATION),
+                      (_REGIONAL, [emoji_data.REGIONAL_INDICATORS]),
+                      (_SKIN_TONE, [emoji_data.SKIN_TONES]),
+                      (_EXTEND, [emoji_data.TAGS, (emoji_data.VS16, emoji_data.VS16), (emoji_data.KEYCAP, emoji_data.KEYCAP)])):
+    for _first, _last in _ranges:
+        _CLASS[_first:_last + 1] |= _bit
+_CLASS[emoji_data.KEYCAP] |= _KEYCAP
+_CLASS[emoji_data.VS16] |= _VS16
+_CLASS[emoji_data.ZWJ] = _ZWJ
+_KEYCAP_BASE_BYTES = np.frombuffer(emoji_data.KEYCAP_BASES.encode('ascii'), dtype=np.uint8)
+
+def _char_class(ranges):
+    return ''.join(re.escape(chr(first)) + ('-' + re.escape(chr(last)) if last > first else '') for first, last in ranges)
+
+# Row-wise reference: an emoji is a base (presentation emoji, text-style emoji followed by
+# U+FE0F or a skin tone, keycap or flag) plus its modifiers, and ZWJ sequences count once
+_EMOJI_BASE = (rf"(?:[{_char_class([emoji_data.REGIONAL_INDICATORS])}]{{2}}"
+               rf"|[{re.escape(emoji_data.KEYCAP_BASES)}]\ufe0f?\u20e3"
+               rf"|[{_char_class(emoji_data.TEXT_PRESENTATION)}](?=[\ufe0f{_char_class([emoji_data.SKIN_TONES])}])"
+               rf"|[{_char_class(emoji_data.EMOJI_PRESENTATION + emoji_data.SUPPLEMENTARY)}])")
+_EMOJI_EXTEND = rf"[\ufe0f\u20e3{_char_class([emoji_data.TAGS, emoji_data.SKIN_TONES])}]*"
+_EMOJI = re.compile(rf"{_EMOJI_BASE}{_EMOJI_EXTEND}(?:\u200d{_EMOJI_BASE}{_EMOJI_EXTEND})*")
+_HASHTAG = re.compile(r'#\w+')
+_MENTION = re.compile(r'(?<!\w)@\w+')
+
+def _to_text_list(texts):
+    # Same normalisation as clean_text, without a Python call per row
+    values = np.asarray(texts, dtype=object).copy()
+    values[pd.isna(values)] = ''
+    return list(map(str, values))
+
+def _is_word(codes):
+    # re's \w: str.isalnum() or underscore, looked up once per distinct code point
+    unique, inverse = np.unique(codes, return_inverse=True)
+    word = np.fromiter((chr(c).isalnum() or c == 95 for c in unique.tolist()), dtype=bool, count=len(unique))
+    return word[inverse]
+
+# The batch is one UTF-8 buffer and code points are only decoded where a feature needs them.
+# Per lead byte: how far to shift the 4-byte payload right and which bits to keep.
+_LEAD_LENGTH = np.select([np.arange(256) < 0xC0, np.arange(256) < 0xE0, np.arange(256) < 0xF0], [1, 2, 3], 4)
+_LEAD_SHIFT = (6 * (4 - _LEAD_LENGTH)).astype(np.uint32)
+_LEAD_MASK = ((1 << np.array([0, 7, 11, 16, 21])[_LEAD_LENGTH]) - 1).astype(np.uint32)
+
+def _code_at(data, pos):
+    # Code point of the UTF-8 sequence starting at each byte offset
+    b0 = data[pos]
+    payload = (b0.astype(np.uint32) << 18 | (data[pos + 1] & 0x3F).astype(np.uint32) << 12
+               | (data[pos + 2] & 0x3F).astype(np.uint32) << 6 | (data[pos + 3] & 0x3F))
+    return (payload >> _LEAD_SHIFT[b0]) & _LEAD_MASK[b0]
+
+def _prev_start(data, pos):
+    # Byte offset of the code point before each one (skips back over continuation bytes)
+    pos = pos - 1
+    continuation = np.flatnonzero((data[pos] & 0xC0) == 0x80)
+    while len(continuation):
+        pos[continuation] -= 1
+        continuation = continuation[(data[pos[continuation]] & 0xC0) == 0x80]
+    return pos
+
+def _next_start(data, pos):
+    b0 = data[pos]
+    return pos + 1 + (b0 >= 0xC0) + (b0 >= 0xE0) + (b0 >= 0xF0)
+
+def _utf8_space_mask(data, lead):
+    space = (np.subtract(data, 9, dtype=np.uint8) <= 4) | (np.subtract(data, 28, dtype=np.uint8) <= 4)
+
+    # Multi-byte whitespace only starts with lead bytes 0xC2-0xE3, so only those few spots are checked
+    lead = lead[data[lead] <= 0xE3]
+    if len(lead):
+        b0 = data[lead].astype(np.int64)
+        b1 = data[lead + 1].astype(np.int64)
+        b2 = data[lead + 2].astype(np.int64)
+        two = lead[np.isin((b0 << 8) | b1, _SPACE_2BYTE)]
+        three = lead[np.isin((b0 << 16) | (b1 << 8) | b2, _SPACE_3BYTE)]
+        space[two] = space[two + 1] = True
+        space[three] = space[three + 1] = space[three + 2] = True
+    return space
+
+def _emoji_starts(data, lead):
+    # Byte offsets where an emoji starts; mirrors _EMOJI on the whole batch at once.
+    # Emoji code points are all outside ASCII, so only the lead bytes are decoded and classified
+    # (keycaps are found from their U+20E3).
+    cls = np.zeros(len(data), dtype=np.uint8)
+    cls[lead] = _CLASS[_code_at(data, lead)]
+    candidates = lead[(cls[lead] & (_EMOJI_CHAR | _TEXT_CHAR | _REGIONAL | _KEYCAP)) != 0]
+    c = cls[candidates]
+
+    text_style = ((c & _TEXT_CHAR) != 0) & ((cls[_next_start(data, candidates)] & (_VS16 | _SKIN_TONE)) != 0)
+    bases = candidates[((c & _EMOJI_CHAR) != 0) | text_style]
+
+    # Keycaps: a digit, # or * (and an optional U+FE0F) before U+20E3
+    keycaps = _prev_start(data, candidates[(c & _KEYCAP) != 0])
+    vs16 = (cls[keycaps] & _VS16) != 0
+    keycaps[vs16] = _prev_start(data, keycaps[vs16])
+    keycaps = keycaps[np.isin(data[keycaps], _KEYCAP_BASE_BYTES)]
+
+    # Regional indicators (4 bytes each) pair up from the start of each run: 1st+2nd, 3rd+4th, ...
+    regional = candidates[(c & _REGIONAL) != 0]
+    run_start = np.r_[True, np.diff(regional) != 4]
+    run_offset = np.arange(len(regional)) - np.maximum.accumulate(np.where(run_start, np.arange(len(regional)), 0))
+    flags = regional[(run_offset % 2 == 0) & np.r_[~run_start[1:], False]]
+
+    starts = np.sort(np.concatenate((bases, keycaps, flags)))
+    # Code points that belong to an emoji: every start and the second half of each flag
+    members = np.sort(np.concatenate((starts, flags + 4)))
+
+    def part_of_emoji(pos):
+        # Walks back over U+FE0F / keycap / tags to the code point they attach to
+        pos = pos.copy()
+        extend = np.flatnonzero(cls[pos] & _EXTEND)
+        while len(extend):
+            pos[extend] = _prev_start(data, pos[extend])
+            extend = extend[(cls[pos[extend]] & _EXTEND) != 0]
+        found = np.minimum(np.searchsorted(members, pos), len(members) - 1)
+        return members[found] == pos
+
+    # Skin tones extend the emoji before them; after a ZWJ an emoji joins the one before
+    tone = (cls[starts] & _SKIN_TONE) != 0
+    before = _prev_start(data, starts)
+    joined = (cls[before] & _ZWJ) != 0
+    attached = np.zeros(len(starts), dtype=bool)
+    attached[tone] = part_of_emoji(before[tone])
+    attached[joined] |= part_of_emoji(_prev_start(data, before[joined]))
+    return starts[~attached]
+
+def _text_stats_batch(texts):
+    # One pass over the UTF-8 bytes of the whole batch. Each text is prefixed with a space, so
+    # words, hashtags, mentions and emoji sequences never straddle two rows.
+    if not texts:
+        return {name: np.zeros(0, dtype=np.int64) for name in ('word_count', 'emoji_count', 'hashtag_count', 'mention_count')}
+    encoded = [t.encode('utf-8', 'surrogatepass') for t in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)) + 1
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    data = np.frombuffer(b' ' + b' '.join(encoded) + b'    ', dtype=np.uint8)
+
+    lead = np.flatnonzero(data >= 0xC2)  # first byte of every non-ASCII code point
+
+    # Words: a word starts at every non-space byte that follows a space byte
+    space = _utf8_space_mask(data, lead)
+    word_starts = np.flatnonzero(space[:-1] > space[1:]) + 1
+
+    # Hashtags: '#' followed by a word character; mentions also need no word character before '@'
+    sigils = np.flatnonzero((data == 35) | (data == 64))
+    tagged = _is_word(_code_at(data, sigils + 1))
+    hashes = sigils[tagged & (data[sigils] == 35)]
+    ats = sigils[tagged & (data[sigils] == 64)]
+    ats = ats[~_is_word(_code_at(data, _prev_start(data, ats)))]
+
+    def per_row(positions):
+        return np.diff(np.searchsorted(positions, bounds))
+
+    return {
+        'word_count': per_row(word_starts),
+        'emoji_count': per_row(_emoji_starts(data, lead)),
+        'hashtag_count': per_row(hashes),
+        'mention_count': per_row(ats),
+    }
+
+def text_feature_arrays(texts):
+    # extract_text_features for a list of strings, as NumPy arrays (no pandas overhead for small batches)
+    stats = {name: np.empty(len(texts), dtype=np.int64) for name in ('word_count', 'emoji_count', 'hashtag_count', 'mention_count')}
+    for start in range(0, len(texts), TEXT_BATCH_SIZE):
+        stop = min(start + TEXT_BATCH_SIZE, len(texts))
+        for name, values in _text_stats_batch(texts[start:stop]).items():
+            stats[name][start:stop] = values
+    stats['has_emoji'] = (stats['emoji_count'] > 0).astype(int)
+    stats['has_hashtag'] = (stats['hashtag_count'] > 0).astype(int)
+    return stats
+
+def extract_text_features(texts):
+    # Word, emoji, hashtag and mention counts for a whole column, processed in bounded batches
+    texts = pd.Series(texts)
+    stats = text_feature_arrays(_to_text_list(texts))
+    return pd.DataFrame({name: stats[name] for name in
+                         ('word_count', 'has_emoji', 'has_hashtag', 'emoji_count', 'hashtag_count', 'mention_count')},
+                        index=texts.index)
+
+def _positive_mask(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    values = df[col]
+    return (values.notna() & (values > 0)).to_numpy(dtype=bool)
+
+def infer_media_types(df):
+    # Same priority as infer_media_type: Video > Document > Poll > Text
+    is_poll = df['poll_question'].notna().to_numpy(dtype=bool) if 'poll_question' in df.columns else np.zeros(len(df), dtype=bool)
+    media = np.select(
+        [_positive_mask(df, 'video_duration'), _positive_mask(df, 'doc_pages'), is_poll],
+        ['Video', 'Document', 'Poll'],
+        default='Text'
+    )
+    return pd.Series(media.astype(object), index=df.index)
+
+def add_media_dummies(df, media_types=None):
+    # media_types: every inferred type in the full dataset. Chunked runs pass it so each batch
+    # gets the same one-hot columns, in the same order, as the in-memory run.
     
-    print(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
+    # One-hot encoding for media_type
+    # Requested: text, image, video, carousel, document.
+    # We have: Video, Document, Poll, Text.
+    # We will map Poll to Text or keep it? User requested specific one-hots.
+    # Let's keep what we found and maybe add placeholders if strictly needed, but better to reflect reality.
+    # I will one-hot encode the inferred types.
+    if media_types is None:
+        media_dummies = pd.get_dummies(df['media_type'], prefix='media_type')
+    else:
+        media = pd.Series(pd.Categorical(df['media_type'], categories=sorted(media_types)), index=df.index, name='media_type')
+        media_dummies = pd.get_dummies(media, prefix='media_type')
+    df = pd.concat([df, media_dummies], axis=1)
+    
+    # Ensure all requested columns exist even if 0 (for consistency if model expects them)
+    expected_types = ['Text', 'Image', 'Video', 'Carousel', 'Document']
+    for m_type in expected_types:
+        col_name = f'media_type_{m_type}'
+        if col_name not in df.columns:
+            df[col_name] = 0
     
+    return df
+
+def clean_frame(df, media_types=None):
     # 1. Normalize Reactions
     # User confirmed: likes_total = likes
     df['likes_total'] = df['likes']
@@ -56,34 +296,68 @@ def clean_data():
     df['hour'] = df['post_date'].dt.hour
     
     # Text features
-    df['word_count'] = df['post_text'].apply(count_words)
-    df['has_emoji'] = df['post_text'].apply(has_emoji).astype(int)
-    df['has_hashtag'] = df['post_text'].apply(has_hashtag).astype(int)
+    text_features = extract_text_features(df['post_text'])
+    df['word_count'] = text_features['word_count']
+    df['has_emoji'] = text_features['has_emoji']
+    df['has_hashtag'] = text_features['has_hashtag']
+    df['emoji_count'] = text_features['emoji_count']
+    df['hashtag_count'] = text_features['hashtag_count']
+    df['mention_count'] = text_features['mention_count']
     
     # 4. Media Type
-    df['media_type'] = df.apply(infer_media_type, axis=1)
+    df['media_type'] = infer_media_types(df)
     
-    # One-hot encoding for media_type
-    # Requested: text, image, video, carousel, document.
-    # We have: Video, Document, Poll, Text.
-    # We will map Poll to Text or keep it? User requested specific one-hots.
-    # Let's keep what we found and maybe add placeholders if strictly needed, but better to reflect reality.
-    # I will one-hot encode the inferred types.
-    media_dummies = pd.get_dummies(df['media_type'], prefix='media_type')
-    df = pd.concat([df, media_dummies], axis=1)
+    return add_media_dummies(df, media_types)
+
+def clean_data_chunked(input_path, output_path, chunksize):
+    # Pass 1: which media types occur anywhere, so every batch one-hot encodes alike. On a CSV the
+    # same read collects the column dtypes for pass 2 (storage.TableScan)
+    media_cols = [c for c in ('video_duration', 'doc_pages', 'poll_question') if c in storage.table_columns(input_path)]
+    media_types = set()
+    with instrumentation.step('media_types'):
+        scan = storage.TableScan(input_path, chunksize, columns=media_cols)
+        for chunk in scan:
+            media_types.update(infer_media_types(chunk).unique())
     
-    # Ensure all requested columns exist even if 0 (for consistency if model expects them)
-    expected_types = ['Text', 'Image', 'Video', 'Carousel', 'Document']
-    for m_type in expected_types:
-        col_name = f'media_type_{m_type}'
-        if col_name not in df.columns:
-            df[col_name] = 0
+    # Pass 2: clean each batch and append it
+    with instrumentation.step('clean_chunks'), storage.TableWriter(output_path) as writer:
+        for i, chunk in enumerate(storage.iter_table(input_path, chunksize, dtypes=scan.dtypes)):
+            writer.append(clean_frame(chunk, media_types))
+            print(f"  chunk {i + 1}: {writer.rows} rows cleaned")
+        instrumentation.rows(rows_in=writer.rows, rows_out=writer.rows)
+    instrumentation.rows(rows_in=writer.rows, rows_out=writer.rows)
+    return writer.saved_path
+
+@instrumentation.instrumented('clean')
+def clean_data(chunksize=None):
+    input_path = os.path.join("data", "intermediate", "raw_linkedin_data.csv")
+    output_path = os.path.join("data", "intermediate", "clean_data.csv")
+    
+    if chunksize:
+        print(f"Cleaning {input_path} in chunks of {chunksize} rows...")
+        saved_path = clean_data_chunked(input_path, output_path, chunksize)
+        print(f"Cleaned data saved to {saved_path}")
+        return
+    
+    print(f"Loading data from {input_path}...")
+    with instrumentation.step('read'):
+        df = storage.read_table(input_path)
+        instrumentation.rows(rows_out=len(df))
+    with instrumentation.step('transform'):
+        df = clean_frame(df)
+        instrumentation.rows(rows_in=len(df), rows_out=len(df))
             
     # 5. Save
-    df.to_csv(output_path, index=False)
-    print(f"Cleaned data saved to {output_path}")
+    with instrumentation.step('write'):
+        saved_path = storage.write_table(df, output_path)
+        instrumentation.rows(rows_in=len(df))
+    instrumentation.rows(rows_in=len(df), rows_out=len(df))
+    print(f"Cleaned data saved to {saved_path}")
     print("Columns:", df.columns.tolist())
     print(df[['media_type', 'engagements', 'weekday', 'hour']].head())
 
 if __name__ == "__main__":
-    clean_data()
+    parser = argparse.ArgumentParser(description="Clean raw LinkedIn data and extract features.")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream fixed-size row batches instead of loading the whole table")
+    args = parser.parse_args()
+    clean_data(args.chunksize)
@@ -1,58 +1,205 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 import os
 import re
+import argparse
+import storage
+import feature_store
+import instrumentation
 
-def analyze_nlp():
+# Linguistic patterns, matched against the lowercased post text.
+# Each pattern is compiled once and run over a whole batch of posts.
+PATTERNS = {
+    'is_question': r'\?',
+    'first_person': r'\b(?:i|me|my)\b',
+    'collective': r'\b(?:we|us|our)\b',
+    'urgency': r'\b(?:today|now|new)\b',
+}
+PATTERN_CHUNK_SIZE = 50000
+
+def _scan_patterns(args):
+    texts, pattern_items = args
+    lowered = [text.lower() for text in texts]
+    hits = np.empty((len(lowered), len(pattern_items)), dtype=np.uint8)
+    for col, (_, pattern) in enumerate(pattern_items):
+        search = re.compile(pattern).search
+        hits[:, col] = np.fromiter((search(text) is not None for text in lowered), dtype=bool, count=len(lowered))
+    return hits
+
+def extract_patterns(texts, patterns=None, n_jobs=None):
+    # Returns (names, uint8 matrix of pattern hits, one row per post).
+    # n_jobs > 1 spreads chunks of text across a process pool.
+    pattern_items = list((patterns or PATTERNS).items())
+    names = [name for name, _ in pattern_items]
+    # Same text normalisation as before: str() of the raw value (NaN -> 'nan')
+    texts = list(map(str, np.asarray(texts, dtype=object)))
+
+    chunks = [(texts[i:i + PATTERN_CHUNK_SIZE], pattern_items) for i in range(0, len(texts), PATTERN_CHUNK_SIZE)]
+    if n_jobs and n_jobs > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_scan_patterns, chunks))
+    else:
+        parts = [_scan_patterns(chunk) for chunk in chunks]
+    hits = np.vstack(parts) if parts else np.zeros((0, len(names)), dtype=np.uint8)
+    return names, hits
+
+def pattern_frame(texts, patterns=None, n_jobs=None):
+    names, hits = extract_patterns(texts, patterns, n_jobs)
+    frame = pd.DataFrame(hits, columns=names, index=getattr(texts, 'index', None))
+    if 'is_question' in frame.columns:
+        # Simplified: anything that isn't a question
+        frame.insert(frame.columns.get_loc('is_question') + 1, 'is_statement', 1 - frame['is_question'])
+    return frame
+
+# Streaming keyword association: per-class document counts over a hashed n-gram space,
+# so memory is fixed by HASH_FEATURES rather than by corpus or vocabulary size.
+KEYWORD_BATCH_SIZE = 20000
+HASH_FEATURES = 2 ** 20
+
+class KeywordAssociation:
+    def __init__(self, ngram_max=2, n_features=HASH_FEATURES, stop_words='english'):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.feature_extraction import FeatureHasher
+        self.n_features = n_features
+        self.analyzer = HashingVectorizer(stop_words=stop_words, ngram_range=(1, ngram_max)).build_analyzer()
+        self.hasher = FeatureHasher(n_features=n_features, input_type='string', alternate_sign=False)
+        self.high_docs = np.zeros(n_features, dtype=np.int64)
+        self.total_docs = np.zeros(n_features, dtype=np.int64)
+        self.n_high = 0
+        self.n_docs = 0
+        # One representative term per bucket, plus whether a different term hashed there too
+        self.terms = np.full(n_features, None, dtype=object)
+        self.collided = np.zeros(n_features, dtype=bool)
+
+    def update(self, texts, is_high):
+        is_high = np.asarray(is_high, dtype=bool)
+        docs = [self.analyzer(t) if isinstance(t, str) else [] for t in texts]
+        self.n_high += int(is_high.sum())
+        self.n_docs += len(docs)
+
+        # Hash each distinct term of the batch once
+        unique_terms = list({term for doc in docs for term in doc})
+        if not unique_terms:
+            return
+        buckets = self.hasher.transform([[term] for term in unique_terms]).indices
+        bucket_of = dict(zip(unique_terms, buckets.tolist()))
+
+        # Document frequency per bucket (a term counts once per post)
+        token_buckets = np.fromiter((bucket_of[term] for doc in docs for term in doc), dtype=np.int64)
+        rows = np.repeat(np.arange(len(docs), dtype=np.int64), [len(doc) for doc in docs])
+        pairs = np.unique(rows * self.n_features + token_buckets)
+        doc_rows, doc_buckets = pairs // self.n_features, pairs % self.n_features
+        self.total_docs += np.bincount(doc_buckets, minlength=self.n_features)
+        self.high_docs += np.bincount(doc_buckets[is_high[doc_rows]], minlength=self.n_features)
+
+        # Remember which term each bucket holds
+        terms = np.array(unique_terms, dtype=object)
+        # Distinct terms of this batch sharing a bucket collide, whether or not it was already taken
+        shared, counts = np.unique(buckets, return_counts=True)
+        self.collided[shared[counts > 1]] = True
+        known = self.terms[buckets]
+        new = known == None  # noqa: E711 (elementwise on an object array)
+        self.terms[buckets[new]] = terms[new]
+        self.collided[buckets[~new & (known != terms)]] = True
+
+    def table(self, min_df=5, alpha=0.5):
+        # 2x2 table per term: a/c = posts with the term that are high/low performing, b/d = posts without it
+        keep = np.flatnonzero(self.total_docs >= min_df)
+        a = self.high_docs[keep].astype(np.float64)
+        c = self.total_docs[keep] - a
+        b = self.n_high - a
+        d = (self.n_docs - self.n_high) - c
+        n = float(self.n_docs)
+
+        # Smoothed log-odds ratio and its z-score
+        log_odds = np.log((a + alpha) / (b + alpha)) - np.log((c + alpha) / (d + alpha))
+        z_score = log_odds / np.sqrt(1 / (a + alpha) + 1 / (b + alpha) + 1 / (c + alpha) + 1 / (d + alpha))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chi2 = n * (a * d - b * c) ** 2 / ((a + b) * (c + d) * (a + c) * (b + d))
+            lift = (a / (a + c)) / (self.n_high / n)
+
+        return pd.DataFrame({
+            'keyword': self.terms[keep],
+            'high_docs': a.astype(np.int64),
+            'low_docs': c.astype(np.int64),
+            'lift': lift,
+            'log_odds': log_odds,
+            'z_score': z_score,
+            'chi2': chi2,
+            'hash_collision': self.collided[keep],
+        }).sort_values('z_score', ascending=False).reset_index(drop=True)
+
+@instrumentation.instrumented('nlp')
+def analyze_nlp(patterns=None, n_jobs=None, keywords='tfidf', chunksize=KEYWORD_BATCH_SIZE, ngram_max=2, min_df=5):
+    # keywords='stream' never holds the whole corpus in memory: post text is read in batches
+    # of `chunksize` rows for both the linguistic patterns and the keyword association.
     input_path = os.path.join("data", "features", "model_ready.csv")
     output_dir = os.path.join("data", "features")
+    if keywords not in ('tfidf', 'stream'):
+        raise ValueError(f"Unknown keyword mode: {keywords}")
     
     print(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
-    
-    # Re-define target (same logic as models.py to ensure consistency)
-    # We need to know which posts are "High Performing" to correlate
-    df['ER_followers'] = pd.to_numeric(df['ER_followers'], errors='coerce')
-    valid_er_count = df['ER_followers'].count()
-    
-    if valid_er_count < len(df) * 0.1:
-        target_metric = 'engagements'
-        df[target_metric] = pd.to_numeric(df[target_metric], errors='coerce').fillna(0)
-    else:
-        target_metric = 'ER_followers'
-        df[target_metric] = df[target_metric].fillna(0)
-        
-    threshold = df[target_metric].quantile(0.8)
-    df['is_high_performing'] = (df[target_metric] >= threshold).astype(int)
+    # Same "High Performing" target as models.py, from the feature store (rows in model_ready order)
+    manifest = feature_store.build_store()
+    with instrumentation.step('load'):
+        df = feature_store.load(['is_high_performing'], manifest=manifest)
+        if keywords != 'stream':
+            df = pd.concat([df, storage.read_table(input_path, columns=['post_text'])], axis=1)
+        instrumentation.rows(rows_out=len(df))
+    instrumentation.rows(rows_in=len(df))
     
+    target_metric = feature_store.info('is_high_performing', manifest)['target_metric']
     print(f"Target Metric for NLP: {target_metric}")
     
     # 1. Linguistic Patterns
-    def check_patterns(text):
-        text = str(text).lower()
-        return pd.Series({
-            'is_question': 1 if '?' in text else 0,
-            'is_statement': 0 if '?' in text else 1, # Simplified
-            'first_person': 1 if re.search(r'\b(i|me|my)\b', text) else 0,
-            'collective': 1 if re.search(r'\b(we|us|our)\b', text) else 0
-        })
-        
-    patterns = df['post_text'].apply(check_patterns)
-    df = pd.concat([df, patterns], axis=1)
+    if keywords == 'stream':
+        association = KeywordAssociation(ngram_max)
+        is_high = df['is_high_performing'].to_numpy() == 1
+        pattern_parts = []
+        offset = 0
+        with instrumentation.step('patterns_and_keywords'):
+            for chunk in storage.iter_table(input_path, chunksize, columns=['post_text'], dtypes={'post_text': object}):
+                texts = chunk['post_text']
+                pattern_parts.append(pattern_frame(texts, patterns, n_jobs))
+                association.update(texts, is_high[offset:offset + len(texts)])
+                offset += len(texts)
+            instrumentation.rows(rows_in=offset)
+        pattern_df = pd.concat(pattern_parts, ignore_index=True).set_axis(df.index)
+    else:
+        with instrumentation.step('patterns'):
+            pattern_df = pattern_frame(df['post_text'], patterns, n_jobs)
+            instrumentation.rows(rows_in=len(df))
+    df = pd.concat([df, pattern_df], axis=1)
     
     # Correlate patterns with high performance
-    correlations = patterns.apply(lambda x: x.corr(df['is_high_performing']))
+    correlations = pattern_df.apply(lambda x: x.corr(df['is_high_performing']))
     print("\nLinguistic Pattern Correlations with High Performance:")
     print(correlations.sort_values(ascending=False))
     
     # Save correlations
     correlations.to_csv(os.path.join(output_dir, "nlp_correlations.csv"))
     
-    # 2. TF-IDF Analysis
+    # 2. Keyword Association
+    if keywords == 'stream':
+        print(f"\nStreaming keyword association over {association.n_docs} posts (1-{ngram_max} grams)...")
+        keyword_df = association.table(min_df)
+        keyword_df.to_csv(os.path.join(output_dir, "keyword_association.csv"), index=False)
+        print(f"{len(keyword_df)} terms with at least {min_df} posts saved to keyword_association.csv")
+        
+        print("\nTop 20 Keywords associated with High Performance (log-odds z-score):")
+        print(keyword_df.head(20)[['keyword', 'high_docs', 'low_docs', 'lift', 'log_odds', 'z_score', 'chi2']].to_string(index=False))
+        top_keywords = list(zip(keyword_df['keyword'].head(20), keyword_df['log_odds'].head(20)))
+        pd.DataFrame(top_keywords, columns=['keyword', 'score']).to_csv(os.path.join(output_dir, "top_keywords.csv"), index=False)
+        return
+    
+    # TF-IDF Analysis (in memory, top 100 terms)
     print("\nRunning TF-IDF Analysis...")
-    tfidf = TfidfVectorizer(stop_words='english', max_features=100)
-    tfidf_matrix = tfidf.fit_transform(df['post_text'].fillna(''))
+    with instrumentation.step('tfidf'):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        tfidf = TfidfVectorizer(stop_words='english', max_features=100)
+        tfidf_matrix = tfidf.fit_transform(df['post_text'].fillna(''))
+        instrumentation.rows(rows_in=len(df))
     feature_names = tfidf.get_feature_names_out()
     
     # Average TF-IDF score for High vs Low performing
@@ -77,4 +224,19 @@ def analyze_nlp():
     pd.DataFrame(top_keywords, columns=['keyword', 'score']).to_csv(os.path.join(output_dir, "top_keywords.csv"), index=False)
 
 if __name__ == "__main__":
-    analyze_nlp()
+    parser = argparse.ArgumentParser(description="Correlate linguistic patterns and keywords with high performance.")
+    parser.add_argument("--pattern", action='append', default=[], metavar="NAME=REGEX",
+                        help="Extra pattern to test (matched against lowercased text); repeatable")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for pattern matching")
+    parser.add_argument("--keywords", choices=['tfidf', 'stream'], default='tfidf',
+                        help="tfidf: in-memory top-100 TF-IDF; stream: batched log-odds/chi-square over all n-grams")
+    parser.add_argument("--chunksize", type=int, default=KEYWORD_BATCH_SIZE, help="Posts per batch in stream mode")
+    parser.add_argument("--ngram-max", type=int, default=2)
+    parser.add_argument("--min-df", type=int, default=5, help="Minimum posts containing a term (stream mode)")
+    args = parser.parse_args()
+
+    patterns = dict(PATTERNS)
+    for spec in args.pattern:
+        name, _, regex = spec.partition('=')
+        patterns[name] = regex
+    analyze_nlp(patterns, args.jobs, args.keywords, args.chunksize, args.ngram_max, args.min_df)
@@ -0,0 +1,206 @@
+# Feature store: the model feature matrix and targets, computed once from model_ready and kept
+# as a columnar table (data/features/feature_store.cols/) in model_ready row order, keyed by post_url.
+#
+# Every column comes from a definition in DEFINITIONS (name, role, source columns, function).
+# The manifest records a hash of each definition and of the source table, so build_store()
+# recomputes only what changed: a new or edited definition costs reading its source columns
+# and writing its own columns, while a new model_ready rebuilds the whole store.
+# Consumers read typed, projected slices with load(); experiments can pass extra definitions.
+# Run from project root: python src/feature_store.py [--force]
+
+import pandas as pd
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import storage
+
+SOURCE_TABLE = os.path.join("data", "features", "model_ready.csv")
+STORE_DIR = os.path.join("data", "features", "feature_store.cols")
+MANIFEST_FILE = os.path.join(STORE_DIR, "_features.json")
+STORE_VERSION = 2  # 2: columns stored with the compact schema.py dtypes
+KEY = 'post_url'
+
+# Content features only (exclude outcome metrics like likes, comments, shares, schemes)
+CONTENT_FEATURES = [
+    'weekday', 'hour', 'word_count', 'has_emoji', 'has_hashtag',
+    'video_duration', 'doc_pages'
+]
+
+# --- Definitions ---
+
+def as_is(df):
+    return df
+
+def fill_zero(df):
+    return df.fillna(0)
+
+def numeric_fill_zero(df):
+    return df.apply(pd.to_numeric, errors='coerce').fillna(0)
+
+def keep_missing(df):
+    # Unfilled copies for descriptive stats, where a missing video length must stay missing
+    return df.add_suffix('_raw')
+
+def media_type_columns(source_columns):
+    return [c for c in source_columns if c.startswith('media_type_')]
+
+def high_performing_target(df):
+    # Top 20% of ER_followers, or of raw engagements when too few posts have a follower count
+    er = pd.to_numeric(df['ER_followers'], errors='coerce')
+    valid_er_count = int(er.count())
+    if valid_er_count < len(df) * 0.1: # If less than 10% have valid ER
+        target_metric = 'engagements'
+        values = pd.to_numeric(df['engagements'], errors='coerce').fillna(0)
+    else:
+        target_metric = 'ER_followers'
+        values = er.fillna(0)
+
+    threshold = values.quantile(0.8)
+    out = pd.DataFrame({'is_high_performing': (values >= threshold).astype(int)})
+    out.attrs = {'target_metric': target_metric, 'threshold': float(threshold), 'valid_er_count': valid_er_count}
+    return out
+
+# role: 'feature' columns form the model matrix; 'target', 'raw' and 'meta' are served alongside it.
+# inputs: source columns, or a function of the source column list.
+DEFINITIONS = [
+    {'name': 'post_date', 'role': 'meta', 'inputs': ['post_date'], 'func': as_is},
+] + [
+    {'name': col, 'role': 'feature', 'inputs': [col], 'func': fill_zero} for col in CONTENT_FEATURES
+] + [
+    {'name': 'media_type', 'role': 'feature', 'inputs': media_type_columns, 'func': fill_zero},
+    {'name': 'unfilled', 'role': 'raw', 'inputs': ['video_duration', 'doc_pages'], 'func': keep_missing},
+    {'name': 'engagements', 'role': 'target', 'inputs': ['engagements'], 'func': numeric_fill_zero},
+    {'name': 'is_high_performing', 'role': 'target', 'inputs': ['ER_followers', 'engagements'],
+     'func': high_performing_target},
+]
+
+# --- Manifest ---
+
+def _source_fingerprint():
+    # Cheap identity of the current source table (storage swaps in a new file/directory on write)
+    path = storage.resolve_table(SOURCE_TABLE)
+    stat_path = os.path.join(path, storage.SCHEMA_FILE) if os.path.isdir(path) else path
+    st = os.stat(stat_path)
+    return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+
+def _resolve_inputs(definition, source_columns):
+    inputs = definition['inputs']
+    return inputs(source_columns) if callable(inputs) else list(inputs)
+
+def _definition_hash(definition, inputs):
+    h = hashlib.sha256()
+    h.update(definition['name'].encode('utf-8'))
+    h.update(json.dumps(inputs).encode('utf-8'))
+    h.update(inspect.getsource(definition['func']).encode('utf-8'))
+    h.update(json.dumps(definition.get('params'), sort_keys=True, default=str).encode('utf-8'))
+    return h.hexdigest()
+
+def read_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    return manifest if manifest.get('version') == STORE_VERSION else None
+
+def _write_manifest(manifest):
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, MANIFEST_FILE)
+
+# --- Build ---
+
+def _compute(definitions, source_columns, with_key=False):
+    inputs = {d['name']: _resolve_inputs(d, source_columns) for d in definitions}
+    needed = list(dict.fromkeys(c for cols in inputs.values() for c in cols))
+    if with_key:
+        needed = [KEY] + [c for c in needed if c != KEY]
+    source = storage.read_table(SOURCE_TABLE, columns=needed,
+                                parse_dates=['post_date'] if 'post_date' in needed else None)
+
+    frames = [source[[KEY]]] if with_key else []
+    entries = {}
+    for d in definitions:
+        out = d['func'](source[inputs[d['name']]].copy())
+        frames.append(out)
+        entries[d['name']] = {'role': d['role'], 'hash': _definition_hash(d, inputs[d['name']]),
+                              'columns': list(out.columns), 'info': dict(out.attrs)}
+    return pd.concat(frames, axis=1), entries
+
+def build_store(extra=None, force=False):
+    # extra: additional definitions (e.g. an experiment's own target); kept in the store afterwards
+    definitions = DEFINITIONS + list(extra or [])
+    source_fp = _source_fingerprint()
+    source_columns = storage.table_columns(SOURCE_TABLE)
+    manifest = read_manifest()
+
+    if force or manifest is None or manifest['source'] != source_fp:
+        print(f"Building feature store from {SOURCE_TABLE} ({len(definitions)} definitions)...")
+        frame, entries = _compute(definitions, source_columns, with_key=True)
+        storage.write_columnar(frame, STORE_DIR)
+        manifest = {'version': STORE_VERSION, 'source': source_fp, 'key': KEY,
+                    'n_rows': len(frame), 'definitions': entries}
+        _write_manifest(manifest)
+        print(f"Feature store saved to {STORE_DIR} ({len(frame)} rows, {frame.shape[1] - 1} columns)")
+        return manifest
+
+    stale = [d for d in definitions
+             if d['name'] not in manifest['definitions']
+             or manifest['definitions'][d['name']]['hash'] != _definition_hash(d, _resolve_inputs(d, source_columns))]
+    if stale:
+        print(f"Updating feature store: {', '.join(d['name'] for d in stale)}")
+        frame, entries = _compute(stale, source_columns)
+        previous = [c for d in stale if d['name'] in manifest['definitions']
+                    for c in manifest['definitions'][d['name']]['columns']]
+        storage.update_columnar(frame, STORE_DIR, drop=[c for c in previous if c not in frame.columns])
+        manifest['definitions'].update(entries)
+        _write_manifest(manifest)
+    return manifest
+
+def rebuild_store():
+    # Pipeline stage entry point: the runner has already decided the store is out of date
+    return build_store(force=True)
+
+# --- Serving ---
+
+def role_columns(role, manifest=None, extra=None):
+    # Columns of the given role from DEFINITIONS (plus extra), so other experiments' additions
+    # never leak into a consumer's feature matrix
+    manifest = manifest or build_store(extra)
+    entries = manifest['definitions']
+    return [c for d in DEFINITIONS + list(extra or []) if d['role'] == role for c in entries[d['name']]['columns']]
+
+def feature_columns(manifest=None, extra=None):
+    # Model feature matrix columns, in definition order (content features, then media types)
+    return role_columns('feature', manifest, extra)
+
+def info(name, manifest=None):
+    # Metadata recorded when a definition was computed (e.g. target metric and threshold)
+    manifest = manifest or build_store()
+    return manifest['definitions'][name]['info']
+
+def load(cols=None, extra=None, post_urls=None, key=False, manifest=None):
+    # Typed, column-projected slice of the store, in model_ready row order. The store is brought
+    # up to date first unless the caller passes the manifest it just got from build_store().
+    # post_urls restricts the slice to those posts; key=True includes the post_url column.
+    if manifest is None:
+        build_store(extra)
+    wanted = None
+    if cols is not None:
+        wanted = list(dict.fromkeys(([KEY] if key or post_urls is not None else []) + list(cols)))
+    df = storage.read_columnar(STORE_DIR, wanted)
+    if post_urls is not None:
+        df = df[df[KEY].isin(list(post_urls))]
+    if not key and KEY in df.columns and KEY not in (cols or []):
+        df = df.drop(columns=[KEY])
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the shared feature store.")
+    parser.add_argument("--force", action='store_true', help="Recompute every column")
+    args = parser.parse_args()
+    manifest = build_store(force=args.force)
+    for name, entry in manifest['definitions'].items():
+        print(f"  {name:<20} {entry['role']:<8} {', '.join(entry['columns'])}")
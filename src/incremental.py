@@ -0,0 +1,141 @@
+# Incremental append mode: clean and score only posts that are new or changed since the last run,
+# keyed on post_url, and merge them into the existing clean_data / model_ready tables.
+# Posts without a URL are keyed on author, post_date and text, which a re-scrape does not change;
+# the hash of all raw fields (counts included) only decides whether a known post changed.
+#
+# The merged tables are always written in the columnar format (storage.py), whatever
+# LINKEDIN_STORAGE_FORMAT says: post_date is stored as datetime64 there, so the next run loads
+# the old rows without re-parsing dates. Appending rows still rewrites every column.
+# Global dependencies are refreshed without re-parsing old rows:
+#   - media_type_* one-hots are rebuilt from the stored media_type column
+#   - hours_since_publish / decay_factor / decayed_* are recomputed for every row against the new max_date
+#   - the top-20% threshold is derived from the full model_ready column at train time, so nothing is cached
+# Run from project root after pre_clean_data / ingest_data: python src/incremental.py
+
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import storage
+import data_cleaning
+import scoring_functions
+
+RAW_TABLE = os.path.join("data", "intermediate", "raw_linkedin_data.csv")
+CLEAN_TABLE = os.path.join("data", "intermediate", "clean_data.csv")
+MODEL_READY = os.path.join("data", "features", "model_ready.csv")
+# post_key -> hash of the raw row it was built from
+INDEX_TABLE = os.path.join("data", "intermediate", "post_index.csv")
+
+# Fields that identify a post without a URL across re-scrapes
+STABLE_FIELDS = ['author', 'post_date', 'post_text']
+
+def post_keys(df):
+    # post_url, or "hash:<hash of STABLE_FIELDS>" for posts without one
+    stable = pd.DataFrame({
+        'author': df['author'].astype(object).where(df['author'].notna(), '').astype(str),
+        'post_date': pd.to_datetime(df['post_date'], format='mixed', utc=True).dt.strftime('%Y-%m-%dT%H:%M:%S.%f').fillna(''),
+        'post_text': df['post_text'].astype(object).where(df['post_text'].notna(), '').astype(str),
+    })
+    keys = df['post_url'].astype(object).copy()
+    missing = keys.isna().to_numpy()
+    if missing.any():
+        hashes = pd.util.hash_pandas_object(stable[missing], index=False).to_numpy()
+        keys[missing] = [f"hash:{h}" for h in hashes]
+    return keys.astype(str)
+
+def raw_row_keys(raw):
+    # Hash of every raw field, normalised so CSV dtype inference (5 vs 5.0, bool vs object) doesn't matter
+    normalized = {}
+    for col in raw.columns:
+        s = raw[col]
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            normalized[col] = s.astype('float64')
+        else:
+            normalized[col] = s.astype(object).where(s.notna(), '').astype(str)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy()
+    return post_keys(raw), hashes
+
+# Hashes are uint64; stored as int64 so a CSV round-trip keeps them exact
+def _hash_to_stored(hashes):
+    return np.asarray(hashes, dtype=np.uint64).view(np.int64)
+
+def _stored_to_hash(values):
+    return np.asarray(values, dtype=np.int64).view(np.uint64)
+
+def _write_index(keys, hashes):
+    storage.write_table(pd.DataFrame({'post_key': keys, 'row_hash': _hash_to_stored(hashes)}), INDEX_TABLE)
+
+def _media_dummy_columns(df):
+    return [c for c in df.columns if c.startswith('media_type_')]
+
+def update_incremental():
+    print(f"Loading {RAW_TABLE}...")
+    raw = storage.read_table(RAW_TABLE)
+    keys, hashes = raw_row_keys(raw)
+
+    if not all(storage.table_exists(p) for p in (CLEAN_TABLE, MODEL_READY, INDEX_TABLE)):
+        print("No previous incremental state found; running a full clean and score.")
+        data_cleaning.clean_data()
+        scoring_functions.calculate_scores()
+        _write_index(keys.to_numpy(), hashes)
+        return
+
+    # 1. Find new or changed posts (last occurrence of a duplicated post wins)
+    keep = ~keys.duplicated(keep='last').to_numpy()
+    raw, keys, hashes = raw[keep], keys[keep], hashes[keep]
+
+    index = storage.read_table(INDEX_TABLE).drop_duplicates('post_key', keep='last')
+    known_keys = pd.Index(index['post_key'].astype(str))
+    known_hashes = _stored_to_hash(index['row_hash'])
+    pos = known_keys.get_indexer(keys)
+    is_known = pos >= 0
+    changed = ~is_known | (known_hashes[np.where(is_known, pos, 0)] != hashes)
+    # Rows to replace in the merged tables: every changed key, so a post the index missed
+    # (e.g. keyed differently by an older version) is replaced rather than duplicated
+    superseded = set(keys[changed])
+
+    n_new = int((changed & ~is_known).sum())
+    print(f"New posts: {n_new}, updated: {int((changed & is_known).sum())}, unchanged: {int((~changed).sum())}")
+    if not changed.any():
+        print("Nothing to do.")
+        return
+
+    # 2. Clean only the changed rows and merge into the clean table
+    new_clean = data_cleaning.clean_frame(raw[changed].copy())
+    old_clean = storage.read_table(CLEAN_TABLE, parse_dates=['post_date'])
+    keep_old = ~post_keys(old_clean).isin(superseded).to_numpy()
+
+    new_clean = new_clean.drop(columns=_media_dummy_columns(new_clean))
+    clean = pd.concat([old_clean[keep_old].drop(columns=_media_dummy_columns(old_clean)), new_clean], ignore_index=True)
+    clean = data_cleaning.add_media_dummies(clean)
+    storage.write_table(clean, CLEAN_TABLE, fmt='columnar')
+    print(f"Clean table now has {len(clean)} rows")
+
+    # 3. Score only the new rows, then refresh the max_date-dependent columns for everyone
+    max_date = clean['post_date'].max()
+    old_model = storage.read_table(MODEL_READY, parse_dates=['post_date'])
+    score_cols = [c for c in old_model.columns if c not in old_clean.columns]
+    new_scored = scoring_functions.score_frame(clean.iloc[len(clean) - len(new_clean):].copy(), max_date)
+
+    keep_old_model = ~post_keys(old_model).isin(superseded).to_numpy()
+    model = pd.concat([
+        old_model[keep_old_model].drop(columns=_media_dummy_columns(old_model)),
+        new_scored.drop(columns=_media_dummy_columns(new_scored)),
+    ], ignore_index=True)
+    model = data_cleaning.add_media_dummies(model)
+    model = model[list(clean.columns) + score_cols]
+    scoring_functions.apply_time_decay(model, max_date)
+    storage.write_table(model, MODEL_READY, fmt='columnar')
+    print(f"Model ready table now has {len(model)} rows (reference time {max_date})")
+
+    # 4. Record what has been processed
+    index = pd.concat([
+        pd.DataFrame({'post_key': known_keys, 'row_hash': known_hashes}),
+        pd.DataFrame({'post_key': keys[changed].to_numpy(), 'row_hash': hashes[changed]}),
+    ], ignore_index=True).drop_duplicates('post_key', keep='last')
+    _write_index(index['post_key'].to_numpy(), index['row_hash'].to_numpy())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean and score only new or changed posts.")
+    parser.parse_args()
+    update_incremental()
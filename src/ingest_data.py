@@ -1,10 +1,13 @@
 import pandas as pd
 import os
+import argparse
+import storage
+import schema
 
 def load_and_verify_data(filepath):
     print(f"Loading data from {filepath}...")
     try:
-        df = pd.read_csv(filepath)
+        df = schema.enforce(pd.read_csv(filepath))
         print("Data loaded successfully.")
         print(f"Shape: {df.shape}")
         print("Columns:")
@@ -16,7 +19,7 @@ def load_and_verify_data(filepath):
         print(f"Error loading data: {e}")
         return None
 
-if __name__ == "__main__":
+def ingest():
     input_path = os.path.join("data", "intermediate", "linkedin_data_cleaned.csv")
     df = load_and_verify_data(input_path)
     
@@ -32,5 +35,10 @@ if __name__ == "__main__":
         # I will save it as 'raw_linkedin_data.csv' to be safe and clear.
         
         output_path = os.path.join("data", "intermediate", "raw_linkedin_data.csv")
-        df.to_csv(output_path, index=False)
-        print(f"\nSaved raw data to {output_path}")
+        saved_path = storage.write_table(df, output_path)
+        print(f"\nSaved raw data to {saved_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the pre-cleaned CSV, verify it and save raw_linkedin_data.")
+    parser.parse_args()
+    ingest()
@@ -0,0 +1,191 @@
+# Per-stage metrics and opt-in profiling for the src stages.
+# A stage entry point is wrapped with @instrumented('clean'); inside it, `with step('read'):`
+# times a sub-step and rows(rows_in=..., rows_out=...) records row counts for the innermost open
+# stage/step. Every stage and step records wall time, CPU time (including worker processes),
+# peak RSS and rows/sec. Each finished stage writes data/metrics/<run_id>/<stage>.json; the
+# pipeline runner gives all its stages one run id.
+# Profiling is opt in: LINKEDIN_PROFILE=train (comma-separated stage names, or "all") runs the
+# stage under cProfile and saves <stage>.prof next to its metrics.
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+
+METRICS_DIR = os.path.join('data', 'metrics')
+RUN_ID_ENV = 'LINKEDIN_RUN_ID'
+PROFILE_ENV = 'LINKEDIN_PROFILE'
+
+_open = []  # stack of records for the stage/steps currently running in this process
+
+# --- Memory ---
+
+def _status_mb(field):
+    # VmRSS / VmHWM from /proc (Linux); None elsewhere
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _reset_peak():
+    # Linux lets a process reset its RSS high-water mark, so each step gets its own peak.
+    # Elsewhere the peak is the process lifetime maximum.
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    peak = _status_mb('VmHWM')
+    if peak is None:
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return peak
+
+def _cpu_seconds():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+# --- Records ---
+
+def _start(name):
+    if _open:
+        # Fold the parent's peak so far into its record before the step resets the high-water mark
+        _open[-1]['peak_rss_mb'] = max(_open[-1]['peak_rss_mb'], peak_rss_mb())
+    _reset_peak()
+    record = {'name': name, 'wall_sec': time.perf_counter(), 'cpu_sec': _cpu_seconds(),
+              'peak_rss_mb': peak_rss_mb(), 'rows_in': None, 'rows_out': None, 'steps': []}
+    _open.append(record)
+    return record
+
+def _finish(record, status):
+    _open.pop()
+    record['status'] = status
+    record['wall_sec'] = round(time.perf_counter() - record['wall_sec'], 4)
+    record['cpu_sec'] = round(_cpu_seconds() - record['cpu_sec'], 4)
+    record['peak_rss_mb'] = round(max(record['peak_rss_mb'], peak_rss_mb()), 1)
+    rows = record['rows_in'] if record['rows_in'] is not None else record['rows_out']
+    record['rows_per_sec'] = round(rows / record['wall_sec'], 1) if rows and record['wall_sec'] > 0 else None
+    if not record['steps']:
+        del record['steps']
+    if _open:
+        _open[-1]['peak_rss_mb'] = max(_open[-1]['peak_rss_mb'], record['peak_rss_mb'])
+        _open[-1]['steps'].append(record)
+    return record
+
+def rows(rows_in=None, rows_out=None):
+    # Row counts for the innermost open stage/step (no-op outside an instrumented stage)
+    if _open:
+        if rows_in is not None:
+            _open[-1]['rows_in'] = int(rows_in)
+        if rows_out is not None:
+            _open[-1]['rows_out'] = int(rows_out)
+
+class step:
+    # with step('read'): ...
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.record = _start(self.name) if _open else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.record is not None:
+            _finish(self.record, 'failed' if exc_type else 'ok')
+        return False
+
+# --- Stages ---
+
+def new_run_id():
+    # Kept in the environment so every stage of one run (and its worker processes) shares it
+    os.environ[RUN_ID_ENV] = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return os.environ[RUN_ID_ENV]
+
+def run_id():
+    return os.environ.get(RUN_ID_ENV) or new_run_id()
+
+def run_dir(rid=None):
+    return os.path.join(METRICS_DIR, rid or run_id())
+
+def profiling(stage_name):
+    selected = {s.strip() for s in os.environ.get(PROFILE_ENV, '').split(',') if s.strip()}
+    return 'all' in selected or stage_name in selected
+
+def _write_metrics(record, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{record['stage']}.json")
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=1)
+    os.replace(tmp, path)
+    return path
+
+def _print_summary(record, indent=''):
+    rate = f", {record['rows_per_sec']:,.0f} rows/sec" if record.get('rows_per_sec') else ''
+    print(f"{indent}{record['name']}: {record['wall_sec']:.2f}s wall, {record['cpu_sec']:.2f}s cpu, "
+          f"{record['peak_rss_mb']:.0f} MB peak{rate}")
+    for child in record.get('steps', []):
+        _print_summary(child, indent + '  ')
+
+def instrumented(stage_name):
+    # Decorator for stage entry points
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _open:
+                # Called from inside another stage: just a step of that one
+                with step(stage_name):
+                    return func(*args, **kwargs)
+
+            rid = run_id()
+            out_dir = run_dir(rid)
+            profiler = cProfile.Profile() if profiling(stage_name) else None
+            started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+            record = _start(stage_name)
+            status = 'failed'
+            try:
+                if profiler:
+                    result = profiler.runcall(func, *args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
+                status = 'ok'
+                return result
+            finally:
+                _finish(record, status)
+                record = {'run_id': rid, 'stage': stage_name, 'started_at': started_at, **record}
+                if profiler:
+                    os.makedirs(out_dir, exist_ok=True)
+                    record['profile'] = os.path.join(out_dir, f"{stage_name}.prof")
+                    profiler.dump_stats(record['profile'])
+                path = _write_metrics(record, out_dir)
+
+                print(f"\n--- Stage metrics ({path}) ---")
+                _print_summary(record)
+                if profiler:
+                    print(f"\n--- Profile: top functions by cumulative time ({record['profile']}) ---")
+                    pstats.Stats(record['profile']).sort_stats('cumulative').print_stats(20)
+        return wrapper
+    return decorate
+
+def load_run(rid):
+    # Stage metrics of one run, keyed by stage name
+    out_dir = run_dir(rid)
+    if not os.path.isdir(out_dir):
+        return {}
+    metrics = {}
+    for name in sorted(os.listdir(out_dir)):
+        if name.endswith('.json') and name != 'run.json':
+            with open(os.path.join(out_dir, name), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            metrics[record['stage']] = record
+    return metrics
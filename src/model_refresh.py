@@ -0,0 +1,206 @@
+# Incremental model refresh: continue boosting the saved LightGBM model on newly appended posts
+# instead of retraining on the full history after every scrape.
+# Every full training run saves a snapshot next to the model ("lgbm_model.pkl" ->
+# "lgbm_model.snapshot.npz"): hashes of the post_urls it was fit on, per-feature reference
+# histograms, the target threshold and test AUC, the parameters and when it ran. An update
+# (train --update) then:
+#   - retrains from scratch when there is no snapshot, the feature columns, their definitions
+#     (feature store definitions and the cleaning/scoring code, see feature_fingerprint) or the
+#     parameters changed, or the last full retrain is older than --retrain-days (the schedule)
+#   - keeps the model when fewer than --min-new-posts posts were added
+#   - retrains from scratch when the new posts drifted: a feature's PSI above --psi-threshold,
+#     the top-20% threshold moved by more than THRESHOLD_SHIFT, or the saved model's ROC AUC on
+#     the new posts fell more than AUC_DROP below its test AUC
+#   - otherwise fits --refresh-rounds more trees on the new posts only (LightGBM init_model)
+#     and adds them to the posts the snapshot covers
+# Drift is measured against the last full retrain, so small shifts add up to a retrain.
+
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import time
+import tree_export
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RETRAIN_DAYS = 7.0
+MIN_NEW_POSTS = 100
+REFRESH_ROUNDS = 20
+PSI_THRESHOLD = 0.2
+THRESHOLD_SHIFT = 0.10  # relative change of the top-20% threshold
+AUC_DROP = 0.05
+PSI_BINS = 10
+PSI_FLOOR = 1e-4  # empty bins would make PSI infinite
+# Code that computes the feature values before the feature store: editing it changes the values
+# of posts the model already covers
+FEATURE_CODE = ['data_cleaning.py', 'emoji_data.py', 'scoring_functions.py']
+
+def snapshot_path(model_path):
+    return os.path.splitext(model_path)[0] + ".snapshot.npz"
+
+def post_keys(post_urls):
+    return pd.util.hash_array(pd.Series(post_urls).astype(str).to_numpy(dtype=object))
+
+def feature_fingerprint(manifest, columns):
+    # Hash of how the given feature store columns are computed: the definitions that produce them
+    # (manifest hashes) and FEATURE_CODE. The source table is left out, since it changes with
+    # every scrape.
+    h = hashlib.sha256()
+    for name, entry in sorted(manifest['definitions'].items()):
+        if set(entry['columns']) & set(columns):
+            h.update(name.encode('utf-8'))
+            h.update(entry['hash'].encode('ascii'))
+    for name in FEATURE_CODE:
+        with open(os.path.join(SRC_DIR, name), 'rb') as f:
+            h.update(name.encode('utf-8'))
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+# --- Drift ---
+
+def reference_profile(X):
+    # Per feature: quantile bin edges and the share of rows in each bin
+    profile = {}
+    for col in X.columns:
+        values = X[col].to_numpy(dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, PSI_BINS + 1)[1:-1])) if len(values) else np.array([])
+        profile[col] = {'edges': edges.tolist(), 'shares': _bin_shares(values, edges).tolist()}
+    return profile
+
+def _bin_shares(values, edges):
+    counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+    return counts / max(1, len(values))
+
+def psi(reference, values):
+    # Population stability index of values against one feature's reference histogram
+    expected = np.clip(np.asarray(reference['shares']), PSI_FLOOR, None)
+    actual = np.clip(_bin_shares(np.asarray(values, dtype=np.float64), np.asarray(reference['edges'])), PSI_FLOOR, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def drift_reasons(meta, clf, X_new, y_new, target_threshold, psi_threshold=PSI_THRESHOLD):
+    from sklearn.metrics import roc_auc_score
+
+    reasons = []
+    for col, reference in meta['profile'].items():
+        value = psi(reference, X_new[col])
+        if value > psi_threshold:
+            reasons.append(f"{col} PSI {value:.3g} > {psi_threshold:g}")
+
+    old_threshold = meta['target_threshold']
+    if old_threshold and abs(target_threshold - old_threshold) / abs(old_threshold) > THRESHOLD_SHIFT:
+        reasons.append(f"target threshold moved from {old_threshold:.4g} to {target_threshold:.4g}")
+
+    # The saved model has not seen these posts, so this is an honest out-of-sample check
+    auc = roc_auc_score(y_new, clf.predict_proba(X_new)[:, 1])
+    baseline = 'unknown' if meta['test_auc'] is None else f"{meta['test_auc']:.4f}"
+    print(f"Saved model on the new posts: ROC AUC {auc:.4f} (test AUC at last full retrain: {baseline})")
+    if meta['test_auc'] is not None and auc < meta['test_auc'] - AUC_DROP:
+        reasons.append(f"ROC AUC on new posts {auc:.4f} is more than {AUC_DROP} below {meta['test_auc']:.4f}")
+    return reasons
+
+# --- Snapshot ---
+
+def _save(model_path, keys, meta):
+    path = snapshot_path(model_path)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, keys=np.asarray(keys, dtype=np.uint64), meta=np.array(json.dumps(meta)))
+    os.replace(tmp, path)
+    return path
+
+def load_snapshot(model_path):
+    # (covered post keys, metadata) of the last training run, or None
+    path = snapshot_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return data['keys'], json.loads(str(data['meta']))
+
+def record_full_training(model_path, post_urls, X_train, params, target_threshold, test_auc, feature_fp=None):
+    # Called after a full training run has saved its model; feature_fp from feature_fingerprint
+    now = time.time()
+    meta = {
+        'mode': 'full',
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+        'full_trained_at': now,
+        'refreshes': 0,
+        'rows': int(len(post_urls)),
+        'features': list(X_train.columns),
+        'feature_fingerprint': feature_fp,
+        'params': params,
+        'target_threshold': float(target_threshold),
+        'test_auc': None if test_auc is None else float(test_auc),
+        'profile': reference_profile(X_train),
+    }
+    path = _save(model_path, np.unique(post_keys(post_urls)), meta)
+    print(f"Training snapshot saved to {path}")
+    return path
+
+# --- Update ---
+
+def update_model(model_path, df, feature_cols, target_col, target_threshold, params, full_train,
+                 retrain_days=RETRAIN_DAYS, min_new_posts=MIN_NEW_POSTS, refresh_rounds=REFRESH_ROUNDS,
+                 psi_threshold=PSI_THRESHOLD, feature_fp=None):
+    # df: feature store slice with post_url, post_date, feature_cols and target_col.
+    # feature_fp: feature_fingerprint of the store the slice came from.
+    # full_train() runs the caller's full training (which records a new snapshot).
+    # Returns 'full', 'update' or 'skip'.
+    import joblib
+    import lightgbm as lgb
+
+    snapshot = load_snapshot(model_path) if os.path.exists(model_path) else None
+    reason = None
+    if snapshot is None:
+        reason = f"no training snapshot for {model_path}"
+    else:
+        keys, meta = snapshot
+        age_days = (time.time() - meta['full_trained_at']) / 86400
+        if meta['features'] != list(feature_cols):
+            reason = "feature columns changed"
+        elif meta.get('feature_fingerprint') != feature_fp:
+            reason = "feature definitions or the code computing them changed"
+        elif meta['params'] != params:
+            reason = "training parameters changed"
+        elif age_days >= retrain_days:
+            reason = f"last full retrain was {age_days:.1f} days ago (scheduled every {retrain_days:g})"
+    if reason:
+        print(f"Full retrain: {reason}")
+        full_train()
+        return 'full'
+
+    # Posts added since the last full retrain or refresh, oldest first
+    new = df[~np.isin(post_keys(df['post_url']), keys)].sort_values('post_date', kind='mergesort')
+    print(f"{len(new)} new posts since the last training run ({meta['mode']}, {meta['trained_at']}; "
+          f"{meta['refreshes']} refreshes since the full retrain)")
+    y_new = new[target_col].to_numpy()
+    if len(new) < min_new_posts:
+        print(f"Fewer than {min_new_posts} new posts; keeping {model_path}")
+        return 'skip'
+    if len(np.unique(y_new)) < 2:
+        print(f"New posts are all one class; keeping {model_path} until more arrive")
+        return 'skip'
+
+    X_new = new[feature_cols]
+    clf = joblib.load(model_path)
+    reasons = drift_reasons(meta, clf, X_new, y_new, target_threshold, psi_threshold)
+    if reasons:
+        print("Full retrain: drift since the last full retrain")
+        for r in reasons:
+            print(f"  - {r}")
+        full_train()
+        return 'full'
+
+    print(f"Continuing training: {refresh_rounds} more trees on {len(new)} new posts "
+          f"(model has {clf.booster_.num_trees()})")
+    refreshed = lgb.LGBMClassifier(random_state=42, verbose=-1, **{**params, 'n_estimators': refresh_rounds})
+    refreshed.fit(X_new, y_new, init_model=clf.booster_)
+
+    joblib.dump(refreshed, model_path)
+    tree_export.export_model(refreshed, tree_export.export_path(model_path))
+    print(f"Refreshed model ({refreshed.booster_.num_trees()} trees) saved to {model_path}")
+
+    meta.update(mode='update', trained_at=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                refreshes=meta['refreshes'] + 1, rows=meta['rows'] + len(new))
+    _save(model_path, np.union1d(keys, post_keys(new['post_url'])), meta)
+    return 'update'
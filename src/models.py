@@ -1,65 +1,68 @@
 import pandas as pd
 import numpy as np
-import lightgbm as lgb
-import shap
 import os
-import matplotlib.pyplot as plt
-from sklearn.metrics import classification_report, accuracy_score, roc_auc_score
-import joblib
+import feature_store
+import shap_cache
+import tuning
+import tree_export
+import model_refresh
+import instrumentation
+import json
+import argparse
 
-def train_model():
-    input_path = os.path.join("data", "features", "model_ready.csv")
+MODEL_PATH = os.path.join("data", "models", "lgbm_model.pkl")
+
+def load_params(tuned=False):
+    # LightGBM defaults, or the parameters found by tuning.py
+    if not tuned:
+        return {}
+    with open(tuning.BEST_PARAMS_FILE, 'r', encoding='utf-8') as f:
+        params = json.load(f)['params']
+    print(f"Using tuned parameters from {tuning.BEST_PARAMS_FILE}: {params}")
+    return params
+
+@instrumentation.instrumented('train')
+def train_model(tuned=False):
+    # Training libraries are imported here, not at module level, so importing this module
+    # (or running `python -m src train --help`) stays fast
+    import lightgbm as lgb
+    import shap
+    import joblib
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import classification_report, roc_auc_score
+
+    # tuned: use the parameters found by tuning.py instead of the LightGBM defaults
     model_dir = os.path.join("data", "models")
     os.makedirs(model_dir, exist_ok=True)
     
-    print(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
+    print(f"Loading features from {feature_store.STORE_DIR}...")
+    manifest = feature_store.build_store()
     
     # 1. Define Target
-    # Top 20% of ER_followers
-    # Handle NaNs in ER_followers just in case
-    df['ER_followers'] = pd.to_numeric(df['ER_followers'], errors='coerce')
-    
-    valid_er_count = df['ER_followers'].count()
-    print(f"Valid ER_followers count: {valid_er_count}")
-    
-    if valid_er_count < len(df) * 0.1: # If less than 10% have valid ER
+    # Top 20% of ER_followers (computed once in the feature store)
+    target = feature_store.info('is_high_performing', manifest)
+    print(f"Valid ER_followers count: {target['valid_er_count']}")
+    if target['target_metric'] == 'engagements':
         print("WARNING: Too few valid ER_followers. Falling back to raw 'engagements' for target definition.")
-        target_metric = 'engagements'
-        df[target_metric] = pd.to_numeric(df[target_metric], errors='coerce').fillna(0)
-    else:
-        target_metric = 'ER_followers'
-        df[target_metric] = df[target_metric].fillna(0)
-        
-    threshold = df[target_metric].quantile(0.8)
-    df['is_high_performing'] = (df[target_metric] >= threshold).astype(int)
-    
-    print(f"Target Metric: {target_metric}")
-    print(f"High performance threshold: {threshold}")
-    print(f"Class balance:\n{df['is_high_performing'].value_counts(normalize=True)}")
     
     # 2. Define Features
-    # Content features only (exclude outcome metrics like likes, comments, shares, schemes)
-    feature_cols = [
-        'weekday', 'hour', 'word_count', 'has_emoji', 'has_hashtag',
-        'video_duration', 'doc_pages'
-    ]
-    
-    # Add media_type columns
-    media_cols = [c for c in df.columns if c.startswith('media_type_')]
-    feature_cols.extend(media_cols)
-    
-    # Fill NaNs in features
-    df[feature_cols] = df[feature_cols].fillna(0)
+    # Content features plus media_type columns, NaNs already filled
+    feature_cols = feature_store.feature_columns(manifest)
+    with instrumentation.step('load'):
+        df = feature_store.load(feature_cols + ['is_high_performing', 'post_date'], key=True, manifest=manifest)
+        instrumentation.rows(rows_out=len(df))
+    instrumentation.rows(rows_in=len(df))
+    
+    print(f"Target Metric: {target['target_metric']}")
+    print(f"High performance threshold: {target['threshold']}")
+    print(f"Class balance:\n{df['is_high_performing'].value_counts(normalize=True)}")
     
+    # 3. Time-based Split
+    # Sort by post_date before taking X/y, so the split trains on the past and tests on the future
+    df = df.sort_values('post_date', kind='mergesort')
     X = df[feature_cols]
     y = df['is_high_performing']
     
-    # 3. Time-based Split
-    # Sort by post_date
-    df['post_date'] = pd.to_datetime(df['post_date'], format='mixed')
-    df = df.sort_values('post_date')
-    
     split_idx = int(len(df) * 0.8)
     X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
     y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
@@ -67,42 +70,55 @@ def train_model():
     print(f"Train size: {len(X_train)}, Test size: {len(X_test)}")
     
     # 4. Train LightGBM
+    params = load_params(tuned)
     print("Training LightGBM model...")
-    clf = lgb.LGBMClassifier(random_state=42, verbose=-1)
-    clf.fit(X_train, y_train)
+    with instrumentation.step('fit'):
+        clf = lgb.LGBMClassifier(random_state=42, verbose=-1, **params)
+        clf.fit(X_train, y_train)
+        instrumentation.rows(rows_in=len(X_train))
     
     # 5. Evaluate
-    y_pred = clf.predict(X_test)
-    y_prob = clf.predict_proba(X_test)[:, 1]
+    with instrumentation.step('predict'):
+        y_pred = clf.predict(X_test)
+        y_prob = clf.predict_proba(X_test)[:, 1]
+        instrumentation.rows(rows_in=len(X_test))
     
     print("\nModel Evaluation:")
     print(classification_report(y_test, y_pred))
-    print(f"ROC AUC: {roc_auc_score(y_test, y_prob):.4f}")
+    test_auc = roc_auc_score(y_test, y_prob)
+    print(f"ROC AUC: {test_auc:.4f}")
     
     # Save model
-    model_path = os.path.join(model_dir, "lgbm_model.pkl")
+    model_path = MODEL_PATH
     joblib.dump(clf, model_path)
     print(f"Model saved to {model_path}")
+    # Array copy for tree_runtime: scoring jobs load it without the training stack
+    export_path = tree_export.export_model(clf, tree_export.export_path(model_path))
+    print(f"NumPy runtime model saved to {export_path}")
+    # What `train --update` compares new posts against. Only the training posts count as covered,
+    # so the held-out newest 20% are boosted on by the next update
+    model_refresh.record_full_training(model_path, df['post_url'].iloc[:split_idx], X_train, params,
+                                       target['threshold'], test_auc,
+                                       model_refresh.feature_fingerprint(manifest, feature_cols + ['is_high_performing']))
     
     # 6. SHAP Values
     print("Computing SHAP values...")
-    explainer = shap.TreeExplainer(clf)
-    shap_values = explainer.shap_values(X_test)
-    
-    # Handle SHAP output format (lightgbm binary returns list or array depending on version)
-    if isinstance(shap_values, list):
-        shap_values = shap_values[1] # Positive class
+    # Reused from the cache next to the model when these rows were already explained
+    with instrumentation.step('shap'):
+        shap_values = shap_cache.shap_values(clf, X_test, model_path)
+        instrumentation.rows(rows_in=len(X_test))
         
     # Summary Plot
-    plt.figure()
-    shap.summary_plot(shap_values, X_test, show=False)
-    
-    # Save to visualizations directory
-    viz_dir = os.path.join("data", "visualizations")
-    os.makedirs(viz_dir, exist_ok=True)
-    shap_plot_path = os.path.join(viz_dir, "shap_summary.png")
-    
-    plt.savefig(shap_plot_path, bbox_inches='tight')
+    with instrumentation.step('summary_plot'):
+        plt.figure()
+        shap.summary_plot(shap_values, X_test, show=False)
+        
+        # Save to visualizations directory
+        viz_dir = os.path.join("data", "visualizations")
+        os.makedirs(viz_dir, exist_ok=True)
+        shap_plot_path = os.path.join(viz_dir, "shap_summary.png")
+        
+        plt.savefig(shap_plot_path, bbox_inches='tight')
     print(f"SHAP summary plot saved to {shap_plot_path}")
     
     # Save feature importance to CSV for report
@@ -117,5 +133,37 @@ def train_model():
     print("\nTop 5 Features:")
     print(feature_importance.head())
 
+@instrumentation.instrumented('train')
+def update_model(tuned=False, retrain_days=model_refresh.RETRAIN_DAYS, min_new_posts=model_refresh.MIN_NEW_POSTS,
+                 refresh_rounds=model_refresh.REFRESH_ROUNDS, psi_threshold=model_refresh.PSI_THRESHOLD):
+    # Continue boosting the saved model on new posts; falls back to train_model on schedule or drift
+    print(f"Loading features from {feature_store.STORE_DIR}...")
+    manifest = feature_store.build_store()
+    feature_cols = feature_store.feature_columns(manifest)
+    with instrumentation.step('load'):
+        df = feature_store.load(feature_cols + ['is_high_performing', 'post_date'], key=True, manifest=manifest)
+    instrumentation.rows(rows_in=len(df))
+    target = feature_store.info('is_high_performing', manifest)
+    return model_refresh.update_model(MODEL_PATH, df, feature_cols, 'is_high_performing', target['threshold'],
+                                      load_params(tuned), lambda: train_model(tuned),
+                                      retrain_days, min_new_posts, refresh_rounds, psi_threshold,
+                                      model_refresh.feature_fingerprint(manifest, feature_cols + ['is_high_performing']))
+
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the engagement classifier and compute SHAP values.")
+    parser.add_argument("--tuned", action='store_true', help=f"Use the parameters saved by src/tuning.py ({tuning.BEST_PARAMS_FILE})")
+    parser.add_argument("--update", action='store_true',
+                        help="Continue training the saved model on new posts; retrain fully only on schedule or drift")
+    parser.add_argument("--retrain-days", type=float, default=model_refresh.RETRAIN_DAYS,
+                        help="With --update: retrain from scratch when the last full retrain is older than this")
+    parser.add_argument("--min-new-posts", type=int, default=model_refresh.MIN_NEW_POSTS,
+                        help="With --update: keep the model when fewer posts were added")
+    parser.add_argument("--refresh-rounds", type=int, default=model_refresh.REFRESH_ROUNDS,
+                        help="With --update: trees added per refresh")
+    parser.add_argument("--psi-threshold", type=float, default=model_refresh.PSI_THRESHOLD,
+                        help="With --update: feature drift (PSI) that forces a full retrain")
+    args = parser.parse_args()
+    if args.update:
+        update_model(args.tuned, args.retrain_days, args.min_new_posts, args.refresh_rounds, args.psi_threshold)
+    else:
+        train_model(args.tuned)
@@ -0,0 +1,304 @@
+# Runs the src stages as one DAG, skipping stages whose outputs are still valid.
+# A stage is valid when the content hash of its inputs and code matches the last successful run
+# and every output still exists. Independent stages (e.g. NLP analysis alongside training)
+# run concurrently in a process pool. Training goes through models.update_model, so a new scrape
+# adds trees to the saved model and a full retrain only happens on schedule or drift
+# (see model_refresh.py). --force runs a stage's force_func instead, so it retrains from scratch.
+# Run from project root: python src/pipeline.py [--force] [--only clean score] [--dry-run]
+
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import storage
+import feature_store
+import instrumentation
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join('data', '.pipeline_state.json')
+
+RAW_JSON = os.path.join('data', 'raw', 'blazel_dataset_linkedin.json')
+PRE_CLEANED = os.path.join('data', 'intermediate', 'linkedin_data_cleaned.csv')
+RAW_TABLE = os.path.join('data', 'intermediate', 'raw_linkedin_data.csv')
+CLEAN_TABLE = os.path.join('data', 'intermediate', 'clean_data.csv')
+MODEL_READY = os.path.join('data', 'features', 'model_ready.csv')
+FEATURE_STORE = feature_store.MANIFEST_FILE
+MODEL_FILE = os.path.join('data', 'models', 'lgbm_model.pkl')
+RUNTIME_MODEL_FILE = os.path.join('data', 'models', 'lgbm_model.npz')
+MODEL_SNAPSHOT_FILE = os.path.join('data', 'models', 'lgbm_model.snapshot.npz')
+VIZ_DIR = os.path.join('data', 'visualizations')
+
+# Paths written through storage.write_table (CSV or columnar directory)
+TABLES = {RAW_TABLE, CLEAN_TABLE, MODEL_READY}
+# Code behind every table read or write: storage applies schema.py's dtypes on load
+STORAGE_CODE = ['storage.py', 'schema.py']
+
+def _viz_outputs():
+    # visualize_analysis writes one dependence and one binning plot per target feature.
+    # TARGET_FEATURES is read from the source rather than imported, so checking whether the
+    # stage is up to date does not pull in shap/lightgbm/matplotlib.
+    with open(os.path.join(SRC_DIR, 'visualize_analysis.py'), 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    target_features = next(
+        ast.literal_eval(node.value) for node in tree.body
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'TARGET_FEATURES' for t in node.targets)
+    )
+    outputs = []
+    for feature in target_features:
+        outputs.append(os.path.join(VIZ_DIR, f"shap_dependence_{feature}.png"))
+        outputs.append(os.path.join(VIZ_DIR, f"binning_{feature}.png"))
+    return outputs
+
+STAGES = [
+    {'name': 'pre_clean', 'module': 'pre_clean_data', 'func': 'main',
+     'inputs': [RAW_JSON], 'outputs': [PRE_CLEANED], 'code': ['pre_clean_data.py']},
+    {'name': 'ingest', 'module': 'ingest_data', 'func': 'ingest',
+     'inputs': [PRE_CLEANED], 'outputs': [RAW_TABLE], 'code': ['ingest_data.py'] + STORAGE_CODE},
+    {'name': 'clean', 'module': 'data_cleaning', 'func': 'clean_data',
+     'inputs': [RAW_TABLE], 'outputs': [CLEAN_TABLE], 'code': ['data_cleaning.py', 'emoji_data.py'] + STORAGE_CODE},
+    {'name': 'score', 'module': 'scoring_functions', 'func': 'calculate_scores',
+     'inputs': [CLEAN_TABLE], 'outputs': [MODEL_READY], 'code': ['scoring_functions.py'] + STORAGE_CODE},
+    {'name': 'features', 'module': 'feature_store', 'func': 'rebuild_store',
+     'inputs': [MODEL_READY], 'outputs': [FEATURE_STORE], 'code': ['feature_store.py'] + STORAGE_CODE},
+    # keeps_outputs: the stage may leave its outputs as they were (an update with too few new posts
+    # keeps the model, and updates leave the SHAP outputs of the last full retrain).
+    # force_func: what --force runs instead of func
+    {'name': 'train', 'module': 'models', 'func': 'update_model', 'force_func': 'train_model',
+     'keeps_outputs': True,
+     'inputs': [FEATURE_STORE],
+     'outputs': [MODEL_FILE, RUNTIME_MODEL_FILE, MODEL_SNAPSHOT_FILE, os.path.join('data', 'models', 'feature_importance.csv'),
+                 os.path.join(VIZ_DIR, 'shap_summary.png')],
+     'code': ['models.py', 'feature_store.py', 'shap_cache.py', 'tree_export.py', 'tree_runtime.py',
+              'model_refresh.py'] + STORAGE_CODE},
+    {'name': 'nlp', 'module': 'feature_engineering', 'func': 'analyze_nlp',
+     'inputs': [MODEL_READY, FEATURE_STORE],
+     'outputs': [os.path.join('data', 'features', 'nlp_correlations.csv'),
+                 os.path.join('data', 'features', 'top_keywords.csv')],
+     'code': ['feature_engineering.py', 'feature_store.py'] + STORAGE_CODE},
+    {'name': 'viz', 'module': 'visualize_analysis', 'func': 'visualize_analysis',
+     'inputs': [FEATURE_STORE, MODEL_FILE], 'outputs': _viz_outputs,
+     'code': ['visualize_analysis.py', 'feature_store.py', 'shap_cache.py'] + STORAGE_CODE},
+]
+
+# --- Fingerprinting ---
+
+def _load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'stages': {}, 'file_hashes': {}}
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, STATE_FILE)
+
+def _hash_file(path, memo):
+    # Content hash, memoised on (size, mtime) so unchanged multi-GB inputs are not re-read every run
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    cached = memo.get(key)
+    if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+        return cached['sha256']
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    digest = h.hexdigest()
+    memo[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+    return digest
+
+def _hash_path(path, memo):
+    if path in TABLES:
+        path = storage.resolve_table(path)
+    if os.path.isdir(path):
+        h = hashlib.sha256()
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode('utf-8'))
+                h.update(_hash_file(full, memo).encode('ascii'))
+        return h.hexdigest()
+    return _hash_file(path, memo)
+
+def _exists(path):
+    return storage.table_exists(path) if path in TABLES else os.path.exists(path)
+
+def _outputs(stage):
+    outputs = stage['outputs']
+    return outputs() if callable(outputs) else outputs
+
+def fingerprint(stage, memo):
+    h = hashlib.sha256()
+    h.update(storage.FORMAT.encode('utf-8'))
+    for name in stage['code']:
+        h.update(name.encode('utf-8'))
+        h.update(_hash_file(os.path.join(SRC_DIR, name), memo).encode('ascii'))
+    for path in stage['inputs']:
+        h.update(path.encode('utf-8'))
+        h.update(_hash_path(path, memo).encode('ascii'))
+    return h.hexdigest()
+
+def is_up_to_date(stage, fp, state):
+    record = state['stages'].get(stage['name'])
+    return bool(record) and record['fingerprint'] == fp and all(_exists(p) for p in _outputs(stage))
+
+# --- Execution ---
+
+def _run_stage(module_name, func_name):
+    # Runs in a worker process
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    getattr(module, func_name)()
+    return time.perf_counter() - start
+
+def build_dag(stages):
+    producers = {}
+    for stage in stages:
+        for path in _outputs(stage):
+            producers[path] = stage['name']
+    return {
+        stage['name']: sorted({producers[p] for p in stage['inputs'] if p in producers and producers[p] != stage['name']})
+        for stage in stages
+    }
+
+def write_run_summary(rid, outcomes, elapsed):
+    # data/metrics/<run_id>/run.json: every stage's outcome plus the metrics it recorded
+    metrics = instrumentation.load_run(rid)
+    summary = {'run_id': rid, 'elapsed_sec': round(elapsed, 3),
+               'stages': {name: {'outcome': outcome, **metrics.get(name, {})} for name, outcome in outcomes.items()}}
+    out_dir = instrumentation.run_dir(rid)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, 'run.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=1)
+
+    ran = [(s['name'], metrics[s['name']]) for s in STAGES if outcomes.get(s['name']) == 'ran' and s['name'] in metrics]
+    if ran:
+        print(f"\n{'stage':<10} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'rows in':>10} {'rows/sec':>12}")
+        for name, m in ran:
+            rate = f"{m['rows_per_sec']:,.0f}" if m.get('rows_per_sec') else '-'
+            print(f"{name:<10} {m['wall_sec']:>9.2f} {m['cpu_sec']:>9.2f} {m['peak_rss_mb']:>9.0f} "
+                  f"{m['rows_in'] if m.get('rows_in') is not None else '-':>10} {rate:>12}")
+    print(f"Run metrics saved to {path}")
+
+def run_pipeline(only=None, force=False, workers=None, dry_run=False, profile=None):
+    # profile: stage names to run under cProfile (see instrumentation.py)
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    if profile:
+        os.environ[instrumentation.PROFILE_ENV] = ','.join(profile)
+    # One run id for every stage; set before the pool starts so workers inherit it
+    rid = instrumentation.new_run_id()
+    stages = {s['name']: s for s in STAGES}
+    deps = build_dag(STAGES)
+    selected = [s['name'] for s in STAGES if not only or s['name'] in only]
+    unknown = set(only or []) - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}. Choose from {list(stages)}")
+
+    state = _load_state()
+    memo = state['file_hashes']
+    done, failed, rerun = set(), set(), set()
+    outcomes = {}
+    pending = list(selected)
+    running = {}
+    total_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        while pending or running:
+            for name in list(pending):
+                stage_deps = [d for d in deps[name] if d in selected]
+                if any(d in failed for d in stage_deps):
+                    print(f"[{name}] skipped: upstream stage failed")
+                    pending.remove(name)
+                    failed.add(name)
+                    outcomes[name] = 'skipped'
+                    continue
+                if not all(d in done for d in stage_deps):
+                    continue
+                pending.remove(name)
+                stage = stages[name]
+
+                missing = [p for p in stage['inputs'] if not _exists(p)]
+                if dry_run:
+                    stale = force or missing or any(d in rerun for d in stage_deps) \
+                        or not is_up_to_date(stage, fingerprint(stage, memo), state)
+                    print(f"[{name}] {'would run' if stale else 'up to date'}")
+                    if stale:
+                        rerun.add(name)
+                    done.add(name)
+                    continue
+                if missing:
+                    print(f"[{name}] FAILED: missing inputs {missing}")
+                    failed.add(name)
+                    outcomes[name] = 'failed'
+                    continue
+
+                fp = fingerprint(stage, memo)
+                if not force and is_up_to_date(stage, fp, state):
+                    print(f"[{name}] up to date, skipping")
+                    done.add(name)
+                    outcomes[name] = 'up_to_date'
+                    continue
+
+                func = stage.get('force_func', stage['func']) if force else stage['func']
+                print(f"[{name}] running {stage['module']}.{func}()")
+                future = pool.submit(_run_stage, stage['module'], func)
+                running[future] = (name, fp, time.time())
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fp, started = running.pop(future)
+                stage = stages[name]
+                try:
+                    elapsed = future.result()
+                except Exception as e:
+                    print(f"[{name}] FAILED: {e}")
+                    failed.add(name)
+                    outcomes[name] = 'failed'
+                    continue
+
+                # Stages report most errors by printing, so confirm every output was actually (re)written
+                stale = [p for p in _outputs(stage)
+                         if not _exists(p) or (not stage.get('keeps_outputs')
+                                               and os.path.getmtime(storage.resolve_table(p) if p in TABLES else p) < started - 1)]
+                if stale:
+                    print(f"[{name}] FAILED: outputs not written {stale}")
+                    failed.add(name)
+                    outcomes[name] = 'failed'
+                    continue
+
+                state['stages'][name] = {'fingerprint': fp, 'elapsed_sec': round(elapsed, 3), 'finished_at': time.time()}
+                _save_state(state)
+                print(f"[{name}] done in {elapsed:.2f}s")
+                done.add(name)
+                outcomes[name] = 'ran'
+
+    if not dry_run:
+        _save_state(state)
+        write_run_summary(rid, outcomes, time.perf_counter() - total_start)
+    print(f"\nPipeline finished in {time.perf_counter() - total_start:.2f}s "
+          f"({len(done)} ok, {len(failed)} failed)")
+    return not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the analysis pipeline, skipping stages that are up to date.")
+    parser.add_argument("--only", nargs='+', help="Run only these stages: " + ", ".join(s['name'] for s in STAGES))
+    parser.add_argument("--force", action='store_true', help="Re-run stages even if their outputs are valid")
+    parser.add_argument("--workers", type=int, default=None, help="Max stages running at once (default: all cores)")
+    parser.add_argument("--dry-run", action='store_true', help="Only report which stages would run")
+    parser.add_argument("--profile", nargs='+', metavar='STAGE', help="Run these stages under cProfile")
+    args = parser.parse_args()
+    ok = run_pipeline(args.only, args.force, args.workers, args.dry_run, args.profile)
+    sys.exit(0 if ok else 1)
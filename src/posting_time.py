@@ -0,0 +1,143 @@
+# Posting-time optimizer: scores a draft at every weekday x hour slot (7 x 24 = 168) and ranks them.
+# A draft's feature row is built once (scoring_service.prepare / feature_matrix); the 168 variants
+# only differ in the weekday and hour columns, so a whole batch of drafts is expanded to
+# drafts x 168 rows and scored with one predict call per chunk of CHUNK_DRAFTS drafts.
+# Uplift is measured against the draft's own slot: its postedAtISO (scheduled time), or now if it has none.
+# Slots are UTC weekday/hour, like the model's training features.
+#
+# One draft:  python src/posting_time.py --draft draft.json [--top 10]
+# Bulk:       python src/posting_time.py --posts scheduled.json --output data/features/best_slots.csv
+
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import pre_clean_data
+import scoring_service
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+N_SLOTS = 7 * 24
+CHUNK_DRAFTS = 2000  # 336k rows per predict call
+
+# Slot s is weekday s // 24, hour s % 24
+SLOT_WEEKDAY = np.repeat(np.arange(7), 24)
+SLOT_HOUR = np.tile(np.arange(24), 7)
+
+def slot_probabilities(rows, booster, feature_names):
+    # (n_drafts, 168) probabilities for prepared rows
+    if 'weekday' not in feature_names or 'hour' not in feature_names:
+        raise ValueError("Model does not use weekday/hour, so every slot scores the same")
+    wd, hr = feature_names.index('weekday'), feature_names.index('hour')
+    out = np.empty((len(rows), N_SLOTS))
+    for start in range(0, len(rows), CHUNK_DRAFTS):
+        base = scoring_service.feature_matrix(rows[start:start + CHUNK_DRAFTS], feature_names)
+        X = np.repeat(base, N_SLOTS, axis=0)
+        X[:, wd] = np.tile(SLOT_WEEKDAY, len(base))
+        X[:, hr] = np.tile(SLOT_HOUR, len(base))
+        probs = booster.predict(X)
+        out[start:start + len(base)] = probs.reshape(len(base), N_SLOTS)
+    return out
+
+def _current_slots(rows):
+    return np.array([r['weekday'] * 24 + r['hour'] for r in rows])
+
+def rank_slots(post, model_path=scoring_service.MODEL_PATH, model=None):
+    # All 168 slots for one draft, best first
+    booster, feature_names = model or scoring_service.load_model(model_path)
+    row = scoring_service.prepare(post)
+    probs = slot_probabilities([row], booster, feature_names)[0]
+    current_slot = _current_slots([row])[0]
+    current = probs[current_slot]
+
+    slots = pd.DataFrame({
+        'weekday': SLOT_WEEKDAY,
+        'day': [WEEKDAYS[d] for d in SLOT_WEEKDAY],
+        'hour': SLOT_HOUR,
+        'probability': probs,
+        'uplift': probs - current,
+        'uplift_pct': (probs / current - 1) * 100 if current > 0 else np.nan,
+        'is_current': np.arange(N_SLOTS) == current_slot,
+    })
+    slots = slots.sort_values('probability', ascending=False, kind='stable').reset_index(drop=True)
+    slots.insert(0, 'rank', np.arange(1, N_SLOTS + 1))
+    return slots
+
+def best_slots(posts, model_path=scoring_service.MODEL_PATH, model=None, top=1):
+    # Bulk mode: the top `top` slots per draft (one row each), with the draft's current slot for comparison
+    booster, feature_names = model or scoring_service.load_model(model_path)
+    rows = [scoring_service.prepare(post) for post in posts]
+    if not rows:
+        return pd.DataFrame()
+    probs = slot_probabilities(rows, booster, feature_names)
+    current_slot = _current_slots(rows)
+    current = probs[np.arange(len(rows)), current_slot]
+
+    top = min(top, N_SLOTS)
+    # argsort of -probs is stable, so ties keep the earlier slot, as in rank_slots
+    order = np.argsort(-probs, axis=1, kind='stable')[:, :top]
+    best = np.take_along_axis(probs, order, axis=1)
+    draft = np.repeat(np.arange(len(rows)), top)
+    slot = order.ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uplift_pct = np.where(current[draft] > 0, (best.ravel() / current[draft] - 1) * 100, np.nan)
+    return pd.DataFrame({
+        'draft': draft,
+        'rank': np.tile(np.arange(1, top + 1), len(rows)),
+        'weekday': SLOT_WEEKDAY[slot],
+        'day': np.array(WEEKDAYS)[SLOT_WEEKDAY[slot]],
+        'hour': SLOT_HOUR[slot],
+        'probability': best.ravel(),
+        'current_weekday': SLOT_WEEKDAY[current_slot][draft],
+        'current_hour': SLOT_HOUR[current_slot][draft],
+        'current_probability': current[draft],
+        'uplift': best.ravel() - current[draft],
+        'uplift_pct': uplift_pct,
+    })
+
+def load_drafts(path):
+    # A single draft object (pretty-printed or not), a JSON array or JSONL
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('{'):
+        try:
+            return [json.loads(text)]
+        except json.JSONDecodeError:
+            pass  # several objects: JSONL
+    return list(pre_clean_data.iter_posts(path))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank the weekday x hour (UTC) posting slots for draft posts.")
+    parser.add_argument("--model", default=scoring_service.MODEL_PATH)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--draft", help="JSON file with one draft post: print its ranked slots")
+    source.add_argument("--posts", help="JSON/JSONL file of drafts: best slots for each")
+    parser.add_argument("--top", type=int, default=None, help="Slots to show per draft (default 10 for --draft, 1 for --posts)")
+    parser.add_argument("--output", default=None, help="Write the bulk results to this CSV")
+    args = parser.parse_args()
+
+    try:
+        posts = load_drafts(args.draft or args.posts)
+    except json.JSONDecodeError as e:
+        parser.error(f"{args.draft or args.posts} is not a JSON draft, JSON array or JSONL file: {e}")
+
+    if args.draft:
+        if len(posts) != 1:
+            parser.error(f"--draft expects one post, {args.draft} has {len(posts)}; use --posts")
+        slots = rank_slots(posts[0], args.model)
+        current = slots[slots['is_current']].iloc[0]
+        print(f"Current slot: {current['day']} {current['hour']:02d}:00 UTC, "
+              f"p={current['probability']:.3f} (rank {current['rank']} of {N_SLOTS})")
+        print(slots.head(args.top or 10).drop(columns='is_current').to_string(index=False, float_format='%.3f'))
+    else:
+        result = best_slots(posts, args.model, top=args.top or 1)
+        if args.output:
+            os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+            result.to_csv(args.output, index=False)
+            print(f"Best slots for {len(posts)} drafts saved to {args.output}")
+        else:
+            print(result.to_string(index=False, float_format='%.3f'))
+        if len(result):
+            first = result[result['rank'] == 1]
+            print(f"Median uplift of the best slot: {first['uplift'].median():+.3f} "
+                  f"({first['uplift_pct'].median():+.1f}%)")
@@ -4,12 +4,22 @@
 import json
 import csv
 import os
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # --- CONFIGURATION ---
 # Assumes you put the json in data/raw/
 # Script is now in src/, but we assume execution from project root
 INPUT_FILE = os.path.join('data', 'raw', 'blazel_dataset_linkedin.json')
 OUTPUT_FILE = os.path.join('data', 'intermediate', 'linkedin_data_cleaned.csv')
+SHARD_DIR = os.path.join('data', 'intermediate', 'shards')
+INPUT_EXTENSIONS = ('.json', '.jsonl', '.ndjson')
+
+# Streaming reader settings (exports are several GB, so never load the whole file)
+READ_CHUNK_SIZE = 1 << 20  # characters per read
+PROGRESS_EVERY = 100000    # rows between progress lines
 
 # Define the specific fields to keep
 FIELDS_TO_KEEP = {
@@ -38,49 +48,250 @@ def get_nested_value(data, path_list):
             return None
     return current
 
-def main():
-    print(f"Looking for: {INPUT_FILE}")
-    if not os.path.exists(INPUT_FILE):
-        print(f"ERROR: File not found at {INPUT_FILE}")
+def clean_value(val):
+    if isinstance(val, str):
+        # Replace standard newlines/tabs
+        val = val.replace('\n', ' ').replace('\r', '').replace('\t', ' ')
+        # Replace the "Unusual Line Terminators" (Unicode 2028/2029)
+        val = val.replace('\u2028', ' ').replace('\u2029', ' ')
+    return val
+
+def extract_row(entry):
+    return {col_name: clean_value(get_nested_value(entry, path))
+            for col_name, path in FIELDS_TO_KEEP.items()}
+
+def _iter_json_array(f, decoder):
+    # Walks a top-level JSON array one element at a time.
+    # Only the current read window is held in memory, so usage stays flat whatever the file size.
+    buf = f.read(READ_CHUNK_SIZE)
+    pos = 0
+    eof = not buf
+
+    def refill():
+        nonlocal buf, pos, eof
+        # Grow the window geometrically so a single huge post does not cause quadratic re-parsing
+        more = f.read(max(READ_CHUNK_SIZE, len(buf) - pos))
+        if not more:
+            eof = True
+        buf = buf[pos:] + more
+        pos = 0
+
+    # Skip up to (and including) the opening bracket
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos < len(buf):
+            break
+        if eof:
+            return
+        refill()
+    if buf[pos] != '[':
+        raise ValueError(f"Expected a JSON array, found {buf[pos]!r}")
+    pos += 1
+
+    while True:
+        # Skip separators between elements
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Unexpected end of file inside JSON array")
+            refill()
+            continue
+        if buf[pos] == ']':
+            return
+
+        try:
+            entry, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            refill()
+            continue
+        # A value touching the end of the window may be truncated (e.g. a number), so read on
+        if end == len(buf) and not eof:
+            refill()
+            continue
+        pos = end
+        yield entry
+
+def iter_posts(path):
+    # Yields one post dict at a time from either a JSON array export or newline-delimited JSON.
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        first = ''
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                first = ch
+                break
+        f.seek(0)
+
+        if first == '[':
+            yield from _iter_json_array(f, decoder)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def convert_file(input_file, output_file):
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+    start = time.perf_counter()
+    count = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDS_TO_KEEP.keys())
+        writer.writeheader()
+
+        for entry in iter_posts(input_file):
+            writer.writerow(extract_row(entry))
+            count += 1
+            if count % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {count} rows ({count / elapsed:,.0f} rows/sec)")
+
+    elapsed = time.perf_counter() - start
+    return count, elapsed
+
+def find_input_files(pattern):
+    # Accepts a directory (all exports inside it) or a glob pattern
+    if os.path.isdir(pattern):
+        files = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                 if name.lower().endswith(INPUT_EXTENSIONS)]
+    else:
+        files = glob.glob(pattern)
+    return sorted(f for f in files if os.path.isfile(f))
+
+def dedupe_shard(shard_file):
+    # Keeps only the last row of each post_url within one shard (later in the export wins), so
+    # merge_shards can keep the first occurrence it sees. Returns the number of rows dropped.
+    url_idx = list(FIELDS_TO_KEEP.keys()).index('post_url')
+    last = {}
+    with open(shard_file, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for i, row in enumerate(reader):
+            if row[url_idx]:
+                last[row[url_idx]] = i
+    dropped = 0
+    tmp = shard_file + '.tmp'
+    with open(shard_file, 'r', newline='', encoding='utf-8') as f, open(tmp, 'w', newline='', encoding='utf-8') as out:
+        reader = csv.reader(f)
+        writer = csv.writer(out)
+        writer.writerow(next(reader))
+        for i, row in enumerate(reader):
+            if row[url_idx] and last[row[url_idx]] != i:
+                dropped += 1
+                continue
+            writer.writerow(row)
+    os.replace(tmp, shard_file)
+    return dropped
+
+def _convert_shard(args):
+    input_file, shard_file = args
+    count, elapsed = convert_file(input_file, shard_file)
+    dropped = dedupe_shard(shard_file)
+    return input_file, shard_file, count, dropped, elapsed
+
+def merge_shards(shard_files, output_file):
+    # Later exports (by sorted file name) win, so walk shards newest-first and keep the first post_url seen.
+    # Each shard was already deduplicated keeping its last occurrence (dedupe_shard), so within
+    # one export the later duplicate wins as well.
+    # Only the set of URLs is held in memory; rows are copied straight through.
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    url_idx = list(FIELDS_TO_KEEP.keys()).index('post_url')
+    seen = set()
+    written = 0
+    duplicates = 0
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(FIELDS_TO_KEEP.keys())
+        for shard_file in reversed(shard_files):
+            with open(shard_file, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                for row in reader:
+                    url = row[url_idx]
+                    if url:
+                        if url in seen:
+                            duplicates += 1
+                            continue
+                        seen.add(url)
+                    writer.writerow(row)
+                    written += 1
+    return written, duplicates
+
+def main_sharded(inputs, output_file=OUTPUT_FILE, workers=None, shard_dir=SHARD_DIR):
+    input_files = find_input_files(inputs)
+    if not input_files:
+        print(f"ERROR: No export files matched {inputs}")
+        return
+
+    os.makedirs(shard_dir, exist_ok=True)
+    jobs = []
+    for idx, input_file in enumerate(input_files):
+        stem = os.path.splitext(os.path.basename(input_file))[0]
+        jobs.append((input_file, os.path.join(shard_dir, f"{idx:05d}_{stem}.csv")))
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Processing {len(jobs)} export files on {min(workers, len(jobs))} workers...")
+
+    start = time.perf_counter()
+    total_rows = 0
+    in_shard_duplicates = 0
+    shard_files = []
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            # map keeps the shard order aligned with the sorted inputs, which the merge relies on
+            for input_file, shard_file, count, dropped, elapsed in pool.map(_convert_shard, jobs):
+                print(f"  {input_file}: {count} rows in {elapsed:.2f}s")
+                shard_files.append(shard_file)
+                total_rows += count
+                in_shard_duplicates += dropped
+
+        written, duplicates = merge_shards(shard_files, output_file)
+        duplicates += in_shard_duplicates
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return
+
+    elapsed = time.perf_counter() - start
+    rate = total_rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Success! Created {output_file}")
+    print(f"Rows processed: {total_rows}, written: {written}, duplicate post_url dropped: {duplicates}")
+    print(f"Elapsed: {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
+    print(f"Looking for: {input_file}")
+    if not os.path.exists(input_file):
+        print(f"ERROR: File not found at {input_file}")
         print("Please move your 'blazel_dataset_linkedin.json' into the 'data/raw/' folder.")
         return
 
-    print(f"Processing...")
+    print(f"Processing (streaming)...")
 
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
-
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-
-        with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=FIELDS_TO_KEEP.keys())
-            writer.writeheader()
-
-            count = 0
-            for entry in raw_data:
-                row = {}
-                for col_name, path in FIELDS_TO_KEEP.items():
-                    val = get_nested_value(entry, path)
-                    
-                    # --- CLEANING ---
-                    if isinstance(val, str):
-                        # Replace standard newlines/tabs
-                        val = val.replace('\n', ' ').replace('\r', '').replace('\t', ' ')
-                        # Replace the "Unusual Line Terminators" (Unicode 2028/2029)
-                        val = val.replace('\u2028', ' ').replace('\u2029', ' ')
-                    
-                    row[col_name] = val
-                
-                writer.writerow(row)
-                count += 1
-
-        print(f"Success! Created {OUTPUT_FILE}")
+        count, elapsed = convert_file(input_file, output_file)
+
+        print(f"Success! Created {output_file}")
         print(f"Rows processed: {count}")
+        rate = count / elapsed if elapsed > 0 else float('inf')
+        print(f"Elapsed: {elapsed:.2f}s ({rate:,.0f} rows/sec)")
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Convert scraper JSON exports to CSV.")
+    parser.add_argument("--inputs", help="Glob or directory of exports to process in parallel (default: single INPUT_FILE)")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    args = parser.parse_args()
+
+    if args.inputs:
+        main_sharded(args.inputs, args.output, args.workers)
+    else:
+        main(output_file=args.output)
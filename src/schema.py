@@ -0,0 +1,141 @@
+# Compact in-memory dtypes for the pipeline tables (raw_linkedin_data, clean_data, model_ready).
+# storage.read_table and storage.iter_table apply this schema to every column they load, so each
+# stage sees the same small types whichever format the table was saved in:
+# counts as int32, calendar fields and 0/1 flags as int8, one-hot media columns as bool,
+# repeated strings as categories, and float32 for integer-valued measurements (durations, page
+# counts, poll votes) that float32 stores exactly. Followers, ratios and scores keep float64,
+# since the high-performer target is a quantile of them. Columns the schema does not list keep the dtype
+# pandas infers. Every cast is validated: a value the compact type cannot hold exactly (overflow,
+# a fraction or a missing value in an int column, an unparseable date) raises SchemaError.
+# The exception is the scraped counts in FILL_MISSING: the export leaves a count out on some
+# posts, so a missing count is read as 0 rather than rejecting the whole table. Columns the
+# pipeline derives itself stay strict.
+
+import pandas as pd
+import numpy as np
+
+COLUMN_TYPES = {
+    # Engagement counts
+    'likes': 'int32',
+    'comments': 'int32',
+    'shares': 'int32',
+    'likes_total': 'int32',
+    'engagements': 'int32',
+    'Scheme_A': 'int32',  # integer-weighted sums of the counts above
+    'Scheme_B': 'int32',
+    'poll_votes': 'float32',
+    'followers': 'float64',  # ER_followers denominator: full precision
+    # Media
+    'video_duration': 'float32',  # milliseconds
+    'doc_pages': 'float32',
+    'poll_question': 'category',
+    'media_type': 'category',
+    # Post
+    'author': 'category',
+    'post_date': 'datetime',
+    'is_activity': 'boolean',
+    # Content features
+    'weekday': 'int8',
+    'hour': 'int8',
+    'word_count': 'int16',
+    'has_emoji': 'int8',
+    'has_hashtag': 'int8',
+    'emoji_count': 'int16',
+    'hashtag_count': 'int16',
+    'mention_count': 'int16',
+}
+
+# Raw counts from the scraper export that may be absent on a post: value used in their place
+FILL_MISSING = {
+    'likes': 0,
+    'comments': 0,
+    'shares': 0,
+}
+
+# Column families matched by name prefix
+PREFIX_TYPES = {
+    'media_type_': 'bool',
+}
+
+class SchemaError(ValueError):
+    pass
+
+def column_type(name):
+    if name in COLUMN_TYPES:
+        return COLUMN_TYPES[name]
+    for prefix, dtype in PREFIX_TYPES.items():
+        if str(name).startswith(prefix):
+            return dtype
+    return None
+
+def _fail(s, target, reason):
+    raise SchemaError(f"Column {s.name!r} ({s.dtype}) does not fit schema type {target}: {reason}")
+
+def _numeric(s, target):
+    if isinstance(s.dtype, pd.CategoricalDtype) or not (pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype)):
+        converted = pd.to_numeric(s, errors='coerce')
+        if (converted.isna() & s.notna()).any():
+            _fail(s, target, "non-numeric values")
+        s = converted
+    return s
+
+def cast_column(s, target):
+    if str(s.dtype) == target:
+        return s
+
+    if target == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            return s
+        try:
+            return pd.to_datetime(s, format='mixed')
+        except (ValueError, TypeError) as e:
+            _fail(s, target, e)
+
+    if target == 'category':
+        return s.astype('category')
+
+    if target == 'boolean':
+        values = s.dropna()
+        if not values.isin([True, False]).all():
+            _fail(s, target, "values other than True/False")
+        return s.astype('boolean')
+
+    s = _numeric(s, target)
+    if target == 'bool':
+        if s.isna().any() or not s.isin([0, 1]).all():
+            _fail(s, target, "values other than 0/1")
+        return s.astype(bool)
+
+    dtype = np.dtype(target)
+    if dtype.kind in 'iu':
+        if s.isna().any():
+            _fail(s, target, "missing values")
+        if len(s):
+            info = np.iinfo(dtype)
+            if s.min() < info.min or s.max() > info.max:
+                _fail(s, target, f"values outside [{info.min}, {info.max}]")
+            if pd.api.types.is_float_dtype(s.dtype) and (s != np.floor(s)).any():
+                _fail(s, target, "fractional values")
+        return s.astype(dtype)
+
+    # float32: only where every value survives the round trip
+    out = s.astype(dtype)
+    if dtype.itemsize < np.dtype(getattr(s.dtype, 'numpy_dtype', s.dtype)).itemsize:
+        changed = out.astype(s.dtype) != s
+        if (changed & s.notna()).any():
+            _fail(s, target, "values not exactly representable")
+    return out
+
+def enforce(df):
+    # Casts (in place) every column the schema knows; returns df
+    for col in df.columns:
+        target = column_type(col)
+        if target is not None:
+            s = df[col]
+            if col in FILL_MISSING and s.isna().any():
+                s = s.fillna(FILL_MISSING[col])
+            df[col] = cast_column(s, target)
+    return df
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
@@ -1,13 +1,32 @@
 import pandas as pd
 import os
 import numpy as np
+import argparse
+import storage
+import instrumentation
 
-def calculate_scores():
-    input_path = os.path.join("data", "intermediate", "clean_data.csv")
-    output_path = os.path.join("data", "features", "model_ready.csv")
+def apply_time_decay(df, max_date):
+    # Only these columns depend on the dataset-wide max_date, so an incremental run can
+    # refresh them for existing rows without recomputing anything else.
     
-    print(f"Loading data from {input_path}...")
-    df = pd.read_csv(input_path)
+    # Calculate hours_since_publish
+    df['hours_since_publish'] = (max_date - df['post_date']).dt.total_seconds() / 3600
+    
+    # Formula: score * (1 / (1 + 0.1 * hours_since_publish))
+    # Applying to Scheme A as the primary example, but let's create a generic decay factor
+    # and maybe apply it to all schemes or just create a 'decayed_score' based on a default?
+    # I will create 'decay_factor' and 'decayed_Scheme_A', 'decayed_Scheme_B', 'decayed_Scheme_C'
+    
+    df['decay_factor'] = 1 / (1 + 0.1 * df['hours_since_publish'])
+    
+    df['decayed_Scheme_A'] = df['Scheme_A'] * df['decay_factor']
+    df['decayed_Scheme_B'] = df['Scheme_B'] * df['decay_factor']
+    df['decayed_Scheme_C'] = df['Scheme_C'] * df['decay_factor']
+    return df
+
+def score_frame(df, max_date=None):
+    # max_date: reference time for hours_since_publish. Defaults to this frame's latest post;
+    # chunked runs pass the dataset-wide value.
     
     # 1. Standard Rates
     # ER_followers = engagements / followers
@@ -37,32 +56,63 @@ def calculate_scores():
     df['Scheme_C'] = weighted_sum_c / df['followers']
     
     # 3. Time Decay Score
-    # Calculate hours_since_publish
     # Reference time: Max post date in dataset
-    df['post_date'] = pd.to_datetime(df['post_date'], format='mixed')
-    max_date = df['post_date'].max()
+    if max_date is None:
+        max_date = df['post_date'].max()
+    apply_time_decay(df, max_date)
     
-    df['hours_since_publish'] = (max_date - df['post_date']).dt.total_seconds() / 3600
+    return df
+
+def calculate_scores_chunked(input_path, output_path, chunksize):
+    # Pass 1: global max post date. On a CSV the same read collects the column dtypes for pass 2
+    max_date = None
+    with instrumentation.step('max_date'):
+        scan = storage.TableScan(input_path, chunksize, columns=['post_date'], parse_dates=['post_date'])
+        for chunk in scan:
+            chunk_max = chunk['post_date'].max()
+            if pd.notna(chunk_max) and (max_date is None or chunk_max > max_date):
+                max_date = chunk_max
+    print(f"Reference time (max post_date): {max_date}")
     
-    # Formula: score * (1 / (1 + 0.1 * hours_since_publish))
-    # Applying to Scheme A as the primary example, but let's create a generic decay factor
-    # and maybe apply it to all schemes or just create a 'decayed_score' based on a default?
-    # I will create 'decay_factor' and 'decayed_Scheme_A', 'decayed_Scheme_B', 'decayed_Scheme_C'
+    # Pass 2: score each batch against the global reference time
+    with instrumentation.step('score_chunks'), storage.TableWriter(output_path) as writer:
+        for i, chunk in enumerate(storage.iter_table(input_path, chunksize, parse_dates=['post_date'], dtypes=scan.dtypes)):
+            writer.append(score_frame(chunk, max_date))
+            print(f"  chunk {i + 1}: {writer.rows} rows scored")
+        instrumentation.rows(rows_in=writer.rows, rows_out=writer.rows)
+    instrumentation.rows(rows_in=writer.rows, rows_out=writer.rows)
+    return writer.saved_path
+
+@instrumentation.instrumented('score')
+def calculate_scores(chunksize=None):
+    input_path = os.path.join("data", "intermediate", "clean_data.csv")
+    output_path = os.path.join("data", "features", "model_ready.csv")
     
-    df['decay_factor'] = 1 / (1 + 0.1 * df['hours_since_publish'])
+    if chunksize:
+        print(f"Scoring {input_path} in chunks of {chunksize} rows...")
+        saved_path = calculate_scores_chunked(input_path, output_path, chunksize)
+        print(f"Model ready data saved to {saved_path}")
+        return
     
-    df['decayed_Scheme_A'] = df['Scheme_A'] * df['decay_factor']
-    df['decayed_Scheme_B'] = df['Scheme_B'] * df['decay_factor']
-    df['decayed_Scheme_C'] = df['Scheme_C'] * df['decay_factor']
+    print(f"Loading data from {input_path}...")
+    with instrumentation.step('read'):
+        df = storage.read_table(input_path, parse_dates=['post_date'])
+        instrumentation.rows(rows_out=len(df))
+    with instrumentation.step('score'):
+        df = score_frame(df)
+        instrumentation.rows(rows_in=len(df), rows_out=len(df))
     
     # 4. Save
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    df.to_csv(output_path, index=False)
-    print(f"Model ready data saved to {output_path}")
+    with instrumentation.step('write'):
+        saved_path = storage.write_table(df, output_path)
+        instrumentation.rows(rows_in=len(df))
+    instrumentation.rows(rows_in=len(df), rows_out=len(df))
+    print(f"Model ready data saved to {saved_path}")
     print("Columns:", df.columns.tolist())
     print(df[['Scheme_A', 'Scheme_B', 'Scheme_C', 'decay_factor']].head())
 
 if __name__ == "__main__":
-    calculate_scores()
+    parser = argparse.ArgumentParser(description="Calculate engagement scores.")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream fixed-size row batches instead of loading the whole table")
+    args = parser.parse_args()
+    calculate_scores(args.chunksize)
@@ -0,0 +1,287 @@
+# Local scoring service for draft posts.
+# Loads data/models/lgbm_model.pkl once and returns the probability that a post lands in the
+# high-performing top 20%. --model data/models/lgbm_model.npz uses the NumPy-only export
+# (tree_runtime.py) instead, which starts without joblib/lightgbm. Drafts are raw post JSON in the scraper export shape (text,
+# linkedinVideo, document, poll, postedAtISO, ...); they go through pre_clean_data.extract_row
+# and the data_cleaning feature functions, so they get exactly the features the model was trained on.
+# Concurrent requests are micro-batched: a single worker thread takes everything queued while
+# it was busy (up to --max-batch posts) and scores it with one predict call, so batches grow
+# with load and a lone request never waits. --max-wait-ms holds each batch open a little longer
+# for more requests; on a single CPU that only adds latency, so it defaults to 0.
+#
+# In-process:  scorer = MicroBatcher(); scorer.score([post, ...]) -> [probability, ...]
+# HTTP:        python src/scoring_service.py [--port 8765 | --unix-socket /tmp/scoring.sock]
+#              POST /score with one post (JSON object) or a list of posts -> {"probabilities": [...]}
+#              GET /health, GET /stats
+# One-off:     python src/scoring_service.py --posts drafts.json
+
+import numpy as np
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import data_cleaning
+import pre_clean_data
+import tree_runtime
+
+MODEL_PATH = os.path.join("data", "models", "lgbm_model.pkl")
+DEFAULT_PORT = 8765
+MAX_BATCH = 256
+MAX_WAIT_MS = 0.0
+MAX_BODY_BYTES = 1 << 20
+
+# Features this service can compute from a draft; anything else in the model is an error at load time
+TEXT_FEATURES = ['word_count', 'has_emoji', 'has_hashtag', 'emoji_count', 'hashtag_count', 'mention_count']
+NUMERIC_FEATURES = ['video_duration', 'doc_pages']
+
+def _number(value):
+    # Missing or non-numeric media fields count as 0, like the feature store's fill_zero
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(value) else value
+
+def prepare(post, now=None):
+    # Per-post part of featurization (runs on the caller's thread, so a bad post only fails its own request)
+    if not isinstance(post, dict):
+        raise ValueError(f"Expected a post object, got {type(post).__name__}")
+    row = pre_clean_data.extract_row(post)
+
+    # Drafts may not have a publish time yet: score them as if posted now
+    if row['post_date']:
+        try:
+            posted = datetime.fromisoformat(str(row['post_date']).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Unparseable postedAtISO: {row['post_date']!r}")
+    else:
+        posted = now or datetime.now(timezone.utc)
+    if posted.tzinfo is not None:
+        posted = posted.astimezone(timezone.utc)
+
+    features = {
+        'post_text': data_cleaning.clean_text(row['post_text']),
+        'weekday': posted.weekday(),
+        'hour': posted.hour,
+        'video_duration': _number(row['video_duration']),
+        'doc_pages': _number(row['doc_pages']),
+        'poll_question': row['poll_question'],
+    }
+    features['media_type'] = data_cleaning.infer_media_type(features)
+    return features
+
+def feature_matrix(rows, feature_names):
+    # Batch part: text features for all posts at once, then columns in the model's order
+    text = data_cleaning.text_feature_arrays([r['post_text'] for r in rows])
+    X = np.zeros((len(rows), len(feature_names)))
+    for j, name in enumerate(feature_names):
+        if name in TEXT_FEATURES:
+            X[:, j] = text[name]
+        elif name.startswith('media_type_'):
+            X[:, j] = [r['media_type'] == name[len('media_type_'):] for r in rows]
+        else:
+            X[:, j] = [r[name] for r in rows]
+    return X
+
+def load_model(model_path=MODEL_PATH):
+    # An exported .npz (tree_export.py) loads with NumPy alone; the pickle needs joblib and lightgbm
+    if model_path.endswith('.npz'):
+        model = tree_runtime.load(model_path)
+    else:
+        import joblib
+        model = joblib.load(model_path)
+    feature_names = list(model.feature_name_)
+    supported = set(TEXT_FEATURES + NUMERIC_FEATURES + ['weekday', 'hour'])
+    unknown = [f for f in feature_names if f not in supported and not f.startswith('media_type_')]
+    if unknown:
+        raise ValueError(f"Model {model_path} uses features the scoring service cannot compute: {unknown}")
+    # The raw booster skips the sklearn wrapper's input validation, which dominates small batches
+    return getattr(model, 'booster_', model), feature_names
+
+class MicroBatcher:
+    def __init__(self, model_path=MODEL_PATH, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.model_path = model_path
+        self.booster, self.feature_names = load_model(model_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = {'requests': 0, 'posts': 0, 'batches': 0, 'largest_batch': 0}
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='scoring-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, posts):
+        # Returns a Future with one probability per post
+        rows = [prepare(post) for post in posts]
+        future = Future()
+        if rows:
+            self._queue.put((rows, future))
+        else:
+            future.set_result([])
+        return future
+
+    def score(self, posts, timeout=None):
+        return self.submit(posts).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        # Blocks for the first request, then takes whatever else is queued (up to max_batch posts)
+        # or arrives within max_wait
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # finish this batch, stop on the next call
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            rows = [row for item_rows, _ in batch for row in item_rows]
+            try:
+                probs = self.booster.predict(feature_matrix(rows, self.feature_names), num_threads=1).tolist()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.stats['requests'] += len(batch)
+            self.stats['posts'] += len(rows)
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(rows))
+            start = 0
+            for item_rows, future in batch:
+                future.set_result(probs[start:start + len(item_rows)])
+                start += len(item_rows)
+
+# --- HTTP ---
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients don't reconnect per request
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        scorer = self.server.scorer
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'model': scorer.model_path, 'features': scorer.feature_names})
+        elif self.path == '/stats':
+            self._send(200, scorer.stats)
+        else:
+            self._send(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send(404, {'error': f"Unknown path {self.path}"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send(413, {'error': f"Body larger than {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            posts = payload if isinstance(payload, list) else [payload]
+            probs = self.server.scorer.score(posts)
+        except ValueError as e:  # includes malformed JSON and bad posts
+            self._send(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, {'probabilities': probs})
+
+    def log_message(self, format, *args):
+        # One line per request would dominate the latency budget
+        pass
+
+class UnixScoringServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+def make_server(scorer, host='127.0.0.1', port=DEFAULT_PORT, unix_socket=None):
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixScoringServer(unix_socket, ScoringHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ScoringHandler)
+        server.daemon_threads = True
+    server.scorer = scorer
+    return server
+
+def serve(model_path=MODEL_PATH, host='127.0.0.1', port=DEFAULT_PORT, unix_socket=None,
+          max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    scorer = MicroBatcher(model_path, max_batch, max_wait_ms)
+    server = make_server(scorer, host, port, unix_socket)
+    where = unix_socket or f"http://{server.server_address[0]}:{server.server_address[1]}"
+    print(f"Scoring service for {model_path} ({len(scorer.feature_names)} features) listening on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        scorer.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+def score_file(path, model_path=MODEL_PATH):
+    # Scores every post in a JSON array / JSONL file and prints one line per post
+    posts = list(pre_clean_data.iter_posts(path))
+    scorer = MicroBatcher(model_path)
+    try:
+        probs = scorer.score(posts)
+    finally:
+        scorer.close()
+    for post, prob in zip(posts, probs):
+        text = (post.get('text') or '').replace('\n', ' ')
+        print(f"{prob:.3f}  {text[:80]}")
+    return probs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score draft posts with the trained engagement classifier.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--posts", default=None, help="Score the posts in this JSON/JSONL file and exit")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--unix-socket", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Most posts scored in one predict call")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="How long a batch waits for more requests once the first has arrived")
+    args = parser.parse_args()
+
+    if args.posts:
+        score_file(args.posts, args.model)
+    else:
+        serve(args.model, args.host, args.port, args.unix_socket, args.max_batch, args.max_wait_ms)
@@ -0,0 +1,100 @@
+# SHAP value cache shared by training, plotting and the experiments.
+# Values are saved next to the model ("lgbm_model.pkl" -> "lgbm_model.shap.npz") together with
+# the content hash of the model file and a hash of every feature row they were computed for.
+# A retrained model invalidates the cache; for the same model, rows already explained are
+# served from disk and only new rows are computed, in parallel chunks across cores.
+
+import pandas as pd
+import numpy as np
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+SHAP_CHUNK_SIZE = 2000
+
+def cache_path(model_path):
+    return os.path.splitext(model_path)[0] + ".shap.npz"
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def row_hashes(X):
+    # SHAP values depend only on the model and a row's feature values
+    return pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+def _positive_class(values):
+    # Handle SHAP output format (lightgbm binary returns list or array depending on version)
+    if isinstance(values, list):
+        values = values[1] # Positive class
+    return values
+
+# --- Computing ---
+
+_worker_explainer = None
+
+def _init_worker(clf):
+    global _worker_explainer
+    import shap
+    _worker_explainer = shap.TreeExplainer(clf)
+
+def _explain_chunk(X):
+    return _positive_class(_worker_explainer.shap_values(X))
+
+def compute_shap_values(clf, X, n_jobs=None, chunk_size=SHAP_CHUNK_SIZE):
+    n_jobs = n_jobs or os.cpu_count() or 1
+    chunks = [X.iloc[i:i + chunk_size] for i in range(0, len(X), chunk_size)]
+    if n_jobs == 1 or len(chunks) < 2:
+        import shap
+        return np.asarray(_positive_class(shap.TreeExplainer(clf).shap_values(X)))
+
+    # spawn, not fork: forking after LightGBM has started its OpenMP threads can deadlock
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks)), mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(clf,)) as pool:
+        return np.vstack(list(pool.map(_explain_chunk, chunks)))
+
+# --- Cache ---
+
+def _load_cache(path, model_hash, columns):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as cache:
+        if str(cache['model_hash']) != model_hash or cache['columns'].tolist() != columns:
+            return None
+        return {'row_hash': cache['row_hash'], 'values': cache['values']}
+
+def _save_cache(path, model_hash, columns, hashes, values):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, model_hash=np.array(model_hash), columns=np.array(columns), row_hash=hashes, values=values)
+    os.replace(tmp, path)
+
+def shap_values(clf, X, model_path, n_jobs=None):
+    # SHAP values (positive class) for every row of X, in X's order
+    model_hash = file_hash(model_path)
+    columns = [str(c) for c in X.columns]
+    hashes = row_hashes(X)
+    path = cache_path(model_path)
+
+    cache = _load_cache(path, model_hash, columns)
+    if cache is None:
+        cache = {'row_hash': np.empty(0, dtype=np.uint64), 'values': np.empty((0, len(columns)))}
+    pos = pd.Index(cache['row_hash']).get_indexer(hashes)
+
+    missing = pos < 0
+    n_cached = int((~missing).sum())
+    if missing.any():
+        # Each distinct new row is explained once
+        new_hashes, first = np.unique(hashes[missing], return_index=True)
+        new_values = compute_shap_values(clf, X.iloc[np.flatnonzero(missing)[first]], n_jobs)
+        cache = {'row_hash': np.concatenate([cache['row_hash'], new_hashes]),
+                 'values': np.vstack([cache['values'], new_values])}
+        _save_cache(path, model_hash, columns, cache['row_hash'], cache['values'])
+        pos = pd.Index(cache['row_hash']).get_indexer(hashes)
+
+    print(f"SHAP values: {n_cached} rows from cache, {len(X) - n_cached} computed ({path})")
+    return cache['values'][pos]
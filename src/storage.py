@@ -0,0 +1,440 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import shutil
+import schema
+
+# Shared table I/O for every stage.
+# Stages keep their existing ".csv" paths; in columnar mode the table is written next to it
+# as a directory of memory-mapped NumPy columns ("clean_data.csv" -> "clean_data.cols/"),
+# which keeps dtypes (including parsed post_date) and lets readers load only the columns they use.
+FORMAT = os.environ.get("LINKEDIN_STORAGE_FORMAT", "csv")  # "csv" or "columnar"
+
+COLUMNAR_SUFFIX = ".cols"
+SCHEMA_FILE = "_schema.json"
+SCHEMA_VERSION = 1
+
+def columnar_path(path):
+    return os.path.splitext(path)[0] + COLUMNAR_SUFFIX
+
+def _use_columnar(path):
+    # Prefer whichever copy was written last, so switching formats never serves stale data
+    col_dir = columnar_path(path)
+    col_schema = os.path.join(col_dir, SCHEMA_FILE)
+    if not os.path.exists(col_schema):
+        return False
+    if not os.path.exists(path):
+        return True
+    return os.path.getmtime(col_schema) >= os.path.getmtime(path)
+
+def resolve_table(path):
+    # The file or directory a read of this table would actually use
+    return columnar_path(path) if _use_columnar(path) else path
+
+def table_exists(path):
+    return os.path.exists(path) or os.path.exists(os.path.join(columnar_path(path), SCHEMA_FILE))
+
+def _load_schema(col_dir):
+    with open(os.path.join(col_dir, SCHEMA_FILE), 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+    if schema.get('version') != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported columnar schema version in {col_dir}: {schema.get('version')}")
+    return schema
+
+def table_columns(path):
+    # Column names without loading any data (used to project e.g. all media_type_* columns)
+    if _use_columnar(path):
+        return [c['name'] for c in _load_schema(columnar_path(path))['columns']]
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+# --- Writing ---
+
+def _is_string_column(s):
+    if pd.api.types.is_string_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.dropna().map(type).eq(str).all()
+    return False
+
+def _write_strings(values, col_dir, stem):
+    mask = pd.isna(values)
+    encoded = [b'' if m else v.encode('utf-8') for v, m in zip(values, mask)]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    with open(os.path.join(col_dir, f"{stem}.bin"), 'wb') as f:
+        f.write(b''.join(encoded))
+    np.save(os.path.join(col_dir, f"{stem}.offsets.npy"), offsets)
+    np.save(os.path.join(col_dir, f"{stem}.mask.npy"), np.asarray(mask, dtype=bool))
+
+def _write_column(s, col_dir, stem):
+    meta = {'name': s.name, 'file': stem, 'dtype': str(s.dtype)}
+    dtype = s.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        meta['kind'] = 'category'
+        meta['categories'] = dtype.categories.tolist()
+        meta['ordered'] = bool(dtype.ordered)
+        np.save(os.path.join(col_dir, f"{stem}.npy"), s.cat.codes.to_numpy())
+    elif isinstance(dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(dtype):
+        meta['kind'] = 'datetime'
+        meta['tz'] = str(dtype.tz) if isinstance(dtype, pd.DatetimeTZDtype) else None
+        naive = s.dt.tz_convert(None) if meta['tz'] else s
+        np.save(os.path.join(col_dir, f"{stem}.npy"), naive.to_numpy())
+    elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and not _is_string_column(s):
+        # Nullable Int/Float/boolean: values plus a null mask
+        if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            meta['kind'] = 'masked'
+            np.save(os.path.join(col_dir, f"{stem}.npy"), s.to_numpy(dtype=dtype.numpy_dtype, na_value=0))
+            np.save(os.path.join(col_dir, f"{stem}.mask.npy"), s.isna().to_numpy())
+        else:
+            meta['kind'] = 'pickle'
+            np.save(os.path.join(col_dir, f"{stem}.npy"), s.to_numpy(dtype=object), allow_pickle=True)
+    elif pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        meta['kind'] = 'numeric'
+        np.save(os.path.join(col_dir, f"{stem}.npy"), s.to_numpy())
+    elif _is_string_column(s):
+        meta['kind'] = 'string'
+        _write_strings(s.to_numpy(dtype=object), col_dir, stem)
+    else:
+        # Mixed object columns (e.g. True/False/NaN flags) keep their Python values
+        meta['kind'] = 'pickle'
+        np.save(os.path.join(col_dir, f"{stem}.npy"), s.to_numpy(dtype=object), allow_pickle=True)
+    return meta
+
+def write_columnar(df, col_dir):
+    tmp_dir = col_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    columns = [_write_column(df[col], tmp_dir, f"c{i:04d}") for i, col in enumerate(df.columns)]
+    with open(os.path.join(tmp_dir, SCHEMA_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'version': SCHEMA_VERSION, 'n_rows': len(df), 'columns': columns}, f, indent=1)
+
+    # Swap in the finished directory so readers never see a half-written table
+    if os.path.exists(col_dir):
+        shutil.rmtree(col_dir)
+    os.replace(tmp_dir, col_dir)
+
+def update_columnar(df, col_dir, drop=()):
+    # Adds or replaces columns of an existing columnar table in place; every other column's
+    # files are left untouched. Replaced columns keep their position, new ones are appended.
+    schema = _load_schema(col_dir)
+    df = df.reset_index(drop=True)
+    if len(df) != schema['n_rows']:
+        raise ValueError(f"{col_dir} has {schema['n_rows']} rows, got {len(df)}")
+
+    next_id = max((int(c['file'][1:]) for c in schema['columns']), default=-1) + 1
+    new_meta = {col: _write_column(df[col], col_dir, f"c{next_id + i:04d}") for i, col in enumerate(df.columns)}
+
+    columns, removed = [], []
+    for meta in schema['columns']:
+        if meta['name'] in new_meta:
+            columns.append(new_meta.pop(meta['name']))
+            removed.append(meta['file'])
+        elif meta['name'] in drop:
+            removed.append(meta['file'])
+        else:
+            columns.append(meta)
+    columns.extend(new_meta.values())
+
+    tmp = os.path.join(col_dir, SCHEMA_FILE + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': SCHEMA_VERSION, 'n_rows': schema['n_rows'], 'columns': columns}, f, indent=1)
+    os.replace(tmp, os.path.join(col_dir, SCHEMA_FILE))
+
+    for name in os.listdir(col_dir):
+        if name.split('.')[0] in removed:
+            os.remove(os.path.join(col_dir, name))
+
+def write_table(df, path, fmt=None):
+    fmt = fmt or FORMAT
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df = df.reset_index(drop=True)
+    if fmt == 'columnar':
+        write_columnar(df, columnar_path(path))
+        return columnar_path(path)
+    if fmt != 'csv':
+        raise ValueError(f"Unknown storage format: {fmt}")
+    df.to_csv(path, index=False)
+    return path
+
+# --- Reading ---
+
+def _read_strings(col_dir, stem, start, stop):
+    offsets = np.load(os.path.join(col_dir, f"{stem}.offsets.npy"), mmap_mode='r')[start:stop + 1]
+    mask = np.load(os.path.join(col_dir, f"{stem}.mask.npy"), mmap_mode='r')[start:stop]
+    with open(os.path.join(col_dir, f"{stem}.bin"), 'rb') as f:
+        f.seek(int(offsets[0]))
+        blob = f.read(int(offsets[-1] - offsets[0]))
+    offsets = offsets - offsets[0]
+    out = np.empty(stop - start, dtype=object)
+    for i in range(stop - start):
+        out[i] = np.nan if mask[i] else blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+    return out
+
+def _read_column(meta, col_dir, start, stop, mmap):
+    stem = meta['file']
+    kind = meta['kind']
+    npy = os.path.join(col_dir, f"{stem}.npy")
+    mmap_mode = 'r' if mmap else None
+
+    if kind == 'numeric':
+        return np.load(npy, mmap_mode=mmap_mode)[start:stop]
+    if kind == 'datetime':
+        s = pd.Series(np.array(np.load(npy, mmap_mode='r')[start:stop]))
+        return s.dt.tz_localize('UTC').dt.tz_convert(meta['tz']) if meta['tz'] else s
+    if kind == 'category':
+        dtype = pd.CategoricalDtype(meta['categories'], ordered=meta['ordered'])
+        return pd.Categorical.from_codes(np.load(npy, mmap_mode='r')[start:stop], dtype=dtype)
+    if kind == 'masked':
+        values = pd.array(np.array(np.load(npy, mmap_mode='r')[start:stop]), dtype=meta['dtype'])
+        values[np.load(os.path.join(col_dir, f"{stem}.mask.npy"), mmap_mode='r')[start:stop]] = pd.NA
+        return values
+    if kind == 'string':
+        values = _read_strings(col_dir, stem, start, stop)
+        return values if meta['dtype'] == 'object' else pd.array(values, dtype=meta['dtype'])
+    if kind == 'pickle':
+        return np.load(npy, allow_pickle=True)[start:stop]
+    raise ValueError(f"Unknown column kind {kind!r} for {meta['name']}")
+
+def read_columnar(col_dir, columns=None, mmap=True, start=0, stop=None):
+    schema = _load_schema(col_dir)
+    by_name = {c['name']: c for c in schema['columns']}
+    names = list(by_name) if columns is None else list(columns)
+    missing = [c for c in names if c not in by_name]
+    if missing:
+        raise KeyError(f"Columns not found in {col_dir}: {missing}")
+
+    stop = schema['n_rows'] if stop is None else min(stop, schema['n_rows'])
+    data = {}
+    for name in names:
+        data[name] = _read_column(by_name[name], col_dir, start, stop, mmap)
+    # copy=False keeps numeric columns backed by the memory map until a stage modifies them
+    df = pd.DataFrame(data, columns=names, copy=False)
+    if start:
+        df.index = pd.RangeIndex(start, stop)
+    return df
+
+def read_table(path, columns=None, parse_dates=None):
+    # columns: optional projection; parse_dates: columns CSV callers would otherwise re-parse with format='mixed'.
+    # Known columns are cast to (and validated against) the compact dtypes in schema.py.
+    if _use_columnar(path):
+        return schema.enforce(read_columnar(columnar_path(path), columns))
+
+    df = pd.read_csv(path, usecols=columns)
+    if columns is not None:
+        df = df[list(columns)]
+    for col in parse_dates or []:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format='mixed')
+    return schema.enforce(df)
+
+# --- Chunked (out-of-core) access ---
+
+def _observe_dtypes(chunk, seen, null_only):
+    for col in chunk.columns:
+        if chunk[col].isna().all():
+            null_only.add(col)
+        else:
+            seen.setdefault(col, set()).add(chunk[col].dtype)
+
+def _resolve_dtypes(seen, null_only):
+    dtypes = {}
+    for col, kinds in seen.items():
+        if len(kinds) == 1:
+            dtype = next(iter(kinds))
+            if col in null_only and pd.api.types.is_integer_dtype(dtype):
+                dtype = np.dtype('float64')
+            elif col in null_only and pd.api.types.is_bool_dtype(dtype):
+                dtype = object
+        elif all(pd.api.types.is_integer_dtype(k) or pd.api.types.is_float_dtype(k) for k in kinds):
+            dtype = np.dtype('float64')
+        elif all(pd.api.types.is_string_dtype(k) for k in kinds):
+            dtype = next(iter(kinds))
+        else:
+            dtype = object
+        dtypes[col] = dtype
+    return dtypes
+
+def scan_csv_dtypes(path, chunksize, columns=None):
+    # Reading a CSV in chunks infers dtypes per chunk (an int column becomes float only in chunks
+    # that contain NaN). This pass finds the dtype a full read would give each column,
+    # so chunked stages format their output exactly like the in-memory path.
+    seen, null_only = {}, set()
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+        _observe_dtypes(chunk, seen, null_only)
+    return _resolve_dtypes(seen, null_only)
+
+class TableScan:
+    # First pass of a chunked stage (media types, max date, ...): iterating yields batches of
+    # `columns` like iter_table. On a CSV the same read also collects every column's dtype, so
+    # the stage's main pass can call iter_table(..., dtypes=scan.dtypes) instead of paying for
+    # a separate scan_csv_dtypes pass. dtypes stays None for columnar tables, which need none.
+    def __init__(self, path, chunksize, columns=None, parse_dates=None):
+        self.path = path
+        self.chunksize = chunksize
+        self.columns = columns
+        self.parse_dates = parse_dates
+        self.dtypes = None
+
+    def __iter__(self):
+        if _use_columnar(self.path):
+            yield from iter_table(self.path, self.chunksize, self.columns, self.parse_dates)
+            return
+        seen, null_only = {}, set()
+        for chunk in pd.read_csv(self.path, chunksize=self.chunksize):
+            _observe_dtypes(chunk, seen, null_only)
+            if self.columns is not None:
+                chunk = chunk[list(self.columns)]
+            for col in self.parse_dates or []:
+                if col in chunk.columns:
+                    chunk[col] = pd.to_datetime(chunk[col], format='mixed')
+            yield schema.enforce(chunk)
+        self.dtypes = _resolve_dtypes(seen, null_only)
+
+def iter_table(path, chunksize, columns=None, parse_dates=None, dtypes=None):
+    # Yields fixed-size row batches with a continuous index, from either storage format
+    if _use_columnar(path):
+        col_dir = columnar_path(path)
+        n_rows = _load_schema(col_dir)['n_rows']
+        for start in range(0, n_rows, chunksize):
+            yield schema.enforce(read_columnar(col_dir, columns, start=start, stop=start + chunksize))
+        return
+
+    if dtypes is None:
+        dtypes = scan_csv_dtypes(path, chunksize, columns)
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns, dtype=dtypes):
+        if columns is not None:
+            chunk = chunk[list(columns)]
+        for col in parse_dates or []:
+            if col in chunk.columns:
+                chunk[col] = pd.to_datetime(chunk[col], format='mixed')
+        yield schema.enforce(chunk)
+
+def _merge_column_parts(metas, part_dirs, out_dir, total_rows):
+    meta = dict(metas[0])
+    stem = meta['file']
+    kind = meta['kind']
+    if any(m['kind'] != kind for m in metas):
+        raise ValueError(f"Column {meta['name']} changed storage kind between chunks")
+
+    def concat_npy(suffix, dtype=None):
+        arrays = [np.load(os.path.join(d, f"{stem}{suffix}"), mmap_mode='r') for d in part_dirs]
+        dtype = dtype or np.result_type(*arrays)
+        out = np.lib.format.open_memmap(os.path.join(out_dir, f"{stem}{suffix}"), mode='w+', dtype=dtype, shape=(total_rows,))
+        pos = 0
+        for arr in arrays:
+            out[pos:pos + len(arr)] = arr
+            pos += len(arr)
+        out.flush()
+        return dtype
+
+    if kind == 'category':
+        if any(m['ordered'] != meta['ordered'] for m in metas):
+            raise ValueError(f"Column {meta['name']} mixes ordered and unordered categories between chunks")
+        if all(m['categories'] == meta['categories'] for m in metas):
+            concat_npy('.npy')
+        else:
+            # Each chunk has its own categories: recode every part against their union
+            union = list(dict.fromkeys(c for m in metas for c in m['categories']))
+            position = {c: i for i, c in enumerate(union)}
+            dtype = np.int8 if len(union) < 127 else np.int16 if len(union) < 32767 else np.int32
+            out = np.lib.format.open_memmap(os.path.join(out_dir, f"{stem}.npy"), mode='w+', dtype=dtype, shape=(total_rows,))
+            pos = 0
+            for m, d in zip(metas, part_dirs):
+                codes = np.load(os.path.join(d, f"{stem}.npy"))
+                lookup = np.array([position[c] for c in m['categories']] + [-1], dtype=dtype)
+                out[pos:pos + len(codes)] = lookup[codes]  # code -1 (missing) maps to the trailing -1
+                pos += len(codes)
+            out.flush()
+            meta['categories'] = union
+    elif kind in ('numeric', 'datetime'):
+        dtype = concat_npy('.npy')
+        if kind == 'numeric':
+            meta['dtype'] = str(dtype)
+    elif kind == 'masked':
+        concat_npy('.npy')
+        concat_npy('.mask.npy', dtype=bool)
+    elif kind == 'string':
+        concat_npy('.mask.npy', dtype=bool)
+        offsets = np.lib.format.open_memmap(os.path.join(out_dir, f"{stem}.offsets.npy"), mode='w+', dtype=np.int64, shape=(total_rows + 1,))
+        offsets[0] = 0
+        row = 0
+        byte_total = 0
+        with open(os.path.join(out_dir, f"{stem}.bin"), 'wb') as out:
+            for d in part_dirs:
+                part_offsets = np.load(os.path.join(d, f"{stem}.offsets.npy"))
+                offsets[row + 1:row + len(part_offsets)] = part_offsets[1:] + byte_total
+                row += len(part_offsets) - 1
+                byte_total += int(part_offsets[-1])
+                with open(os.path.join(d, f"{stem}.bin"), 'rb') as f:
+                    shutil.copyfileobj(f, out)
+        offsets.flush()
+    else:
+        arrays = [np.load(os.path.join(d, f"{stem}.npy"), allow_pickle=True) for d in part_dirs]
+        np.save(os.path.join(out_dir, f"{stem}.npy"), np.concatenate(arrays), allow_pickle=True)
+    return meta
+
+class TableWriter:
+    # Appends row batches to a table; memory use is bounded by one batch (plus one column while
+    # the columnar parts are merged on close).
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or FORMAT
+        if self.fmt not in ('csv', 'columnar'):
+            raise ValueError(f"Unknown storage format: {self.fmt}")
+        self.rows = 0
+        self._parts = []
+        self._parts_dir = columnar_path(path) + ".parts"
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if self.fmt == 'columnar' and os.path.exists(self._parts_dir):
+            shutil.rmtree(self._parts_dir)
+
+    def append(self, df):
+        df = df.reset_index(drop=True)
+        if self.fmt == 'csv':
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        else:
+            part_dir = os.path.join(self._parts_dir, f"part{len(self._parts):05d}")
+            os.makedirs(self._parts_dir, exist_ok=True)
+            write_columnar(df, part_dir)
+            self._parts.append(part_dir)
+        self.rows += len(df)
+
+    def close(self):
+        if self.fmt == 'csv':
+            return self.path
+        if not self._parts:
+            return None
+
+        col_dir = columnar_path(self.path)
+        schemas = [_load_schema(d) for d in self._parts]
+        names = [c['name'] for c in schemas[0]['columns']]
+        if any([c['name'] for c in sch['columns']] != names for sch in schemas):
+            raise ValueError("Chunks written to the same table must have identical columns")
+
+        tmp_dir = col_dir + ".tmp"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        columns = [
+            _merge_column_parts([sch['columns'][i] for sch in schemas], self._parts, tmp_dir, self.rows)
+            for i in range(len(names))
+        ]
+        with open(os.path.join(tmp_dir, SCHEMA_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'version': SCHEMA_VERSION, 'n_rows': self.rows, 'columns': columns}, f, indent=1)
+
+        if os.path.exists(col_dir):
+            shutil.rmtree(col_dir)
+        os.replace(tmp_dir, col_dir)
+        shutil.rmtree(self._parts_dir)
+        return col_dir
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.saved_path = self.close()
+        return False
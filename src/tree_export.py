@@ -0,0 +1,103 @@
+# Exports a trained LGBMClassifier to the array format tree_runtime.py evaluates with NumPy only.
+# models.py calls export_model after training, writing data/models/lgbm_model.npz next to the pickle.
+# Only binary models with numerical splits are supported (everything this repo trains);
+# anything else raises ValueError rather than exporting a model that would predict differently.
+# Run from project root: python src/tree_export.py [--model data/models/lgbm_model.pkl] [--check]
+
+import numpy as np
+import argparse
+import os
+import tree_runtime
+
+MODEL_PATH = os.path.join("data", "models", "lgbm_model.pkl")
+MISSING_TYPES = {'None': tree_runtime.MISSING_NONE, 'Zero': tree_runtime.MISSING_ZERO, 'NaN': tree_runtime.MISSING_NAN}
+
+def _objective(dump):
+    # "binary sigmoid:1" -> 1.0
+    parts = dump['objective'].split()
+    if parts[0] != 'binary' or dump['num_tree_per_iteration'] != 1 or dump.get('average_output'):
+        raise ValueError(f"Only binary (non-rf) models can be exported, got objective {dump['objective']!r}")
+    params = dict(p.split(':', 1) for p in parts[1:] if ':' in p)
+    return float(params.get('sigmoid', 1.0))
+
+def flatten(dump):
+    # Booster.dump_model() -> dict of flat arrays; nodes of all trees share one index space
+    nodes = {'split_feature': [], 'threshold': [], 'default_left': [], 'missing_type': [],
+             'left': [], 'right': [], 'value': []}
+    roots, max_depth = [], 0
+
+    def add(tree_node, depth):
+        nonlocal max_depth
+        idx = len(nodes['value'])
+        for values in nodes.values():
+            values.append(0)
+        if 'leaf_value' in tree_node or 'leaf_index' in tree_node:
+            # A leaf loops onto itself, so walking past its depth is harmless
+            nodes['threshold'][idx] = np.inf
+            nodes['left'][idx] = nodes['right'][idx] = idx
+            nodes['value'][idx] = tree_node.get('leaf_value', 0.0)
+            max_depth = max(max_depth, depth)
+            return idx
+        if tree_node['decision_type'] != '<=':
+            raise ValueError(f"Unsupported split type {tree_node['decision_type']!r} (categorical features)")
+        nodes['split_feature'][idx] = tree_node['split_feature']
+        nodes['threshold'][idx] = tree_node['threshold']
+        nodes['default_left'][idx] = tree_node['default_left']
+        nodes['missing_type'][idx] = MISSING_TYPES[tree_node['missing_type']]
+        nodes['left'][idx] = add(tree_node['left_child'], depth + 1)
+        nodes['right'][idx] = add(tree_node['right_child'], depth + 1)
+        return idx
+
+    for tree in dump['tree_info']:
+        roots.append(add(tree['tree_structure'], 0))
+
+    return {
+        'format_version': np.int32(tree_runtime.FORMAT_VERSION),
+        'feature_names': np.array(dump['feature_names']),
+        'sigmoid': np.float64(_objective(dump)),
+        'split_feature': np.array(nodes['split_feature'], dtype=np.int32),
+        'threshold': np.array(nodes['threshold'], dtype=np.float64),
+        'default_left': np.array(nodes['default_left'], dtype=bool),
+        'missing_type': np.array(nodes['missing_type'], dtype=np.int8),
+        'left': np.array(nodes['left'], dtype=np.int32),
+        'right': np.array(nodes['right'], dtype=np.int32),
+        'value': np.array(nodes['value'], dtype=np.float64),
+        'roots': np.array(roots, dtype=np.int32),
+        'max_depth': np.int32(max_depth),
+    }
+
+def export_path(model_path):
+    return os.path.splitext(model_path)[0] + '.npz'
+
+def export_model(clf, output_path):
+    booster = getattr(clf, 'booster_', clf)
+    arrays = flatten(booster.dump_model())
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp = output_path + '.tmp.npz'
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, output_path)
+    return output_path
+
+def check_export(clf, output_path, X):
+    # Max absolute difference between LightGBM's and the exported model's probabilities on X
+    expected = clf.predict_proba(X)[:, 1]
+    actual = tree_runtime.load(output_path).predict(np.asarray(X, dtype=np.float64))
+    return float(np.abs(expected - actual).max()) if len(X) else 0.0
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export the trained LightGBM model for the NumPy-only runtime.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=None, help="Default: the model path with .npz")
+    parser.add_argument("--check", action="store_true", help="Compare predictions on the feature store rows")
+    args = parser.parse_args()
+
+    clf = joblib.load(args.model)
+    output = export_model(clf, args.output or export_path(args.model))
+    print(f"Exported {clf.booster_.num_trees()} trees from {args.model} to {output} "
+          f"({os.path.getsize(output) / 1024:.0f} KB)")
+    if args.check:
+        import feature_store
+        X = feature_store.load(list(clf.feature_name_)).astype(np.float64)
+        print(f"Max probability difference on {len(X):,} rows: {check_export(clf, output, X):.3g}")
@@ -0,0 +1,110 @@
+# NumPy-only evaluator for LightGBM models exported by tree_export.py (data/models/lgbm_model.npz).
+# Importing this module and loading a model takes milliseconds: no joblib, lightgbm, sklearn or shap.
+#
+# The .npz holds every tree flattened into shared node arrays. Leaves are nodes too: they point
+# back at themselves and carry the leaf value, so all trees are walked together for a block of
+# rows, one level per step, until every tree has reached a leaf. Splits follow LightGBM's
+# numerical decision exactly (missing values, zero-as-missing, default direction), the leaf
+# values are summed in tree order in float64 and the binary sigmoid is applied like LightGBM's,
+# so predictions are bit-identical to Booster.predict.
+#
+# model = tree_runtime.load('data/models/lgbm_model.npz'); model.predict_proba(X)[:, 1]
+
+import numpy as np
+import math
+
+FORMAT_VERSION = 1
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+ZERO_THRESHOLD = 1e-35      # LightGBM's kZeroThreshold
+BLOCK_CELLS = 1 << 15       # (tree, row) cells walked at once: small enough to stay in cache
+
+class TreeModel:
+    def __init__(self, arrays):
+        if int(arrays['format_version']) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tree model format {int(arrays['format_version'])}, expected {FORMAT_VERSION}")
+        self.feature_names = [str(name) for name in arrays['feature_names']]
+        self.feature_name_ = self.feature_names  # same attribute name as LGBMClassifier
+        self.sigmoid = float(arrays['sigmoid'])
+        self.split_feature = arrays['split_feature']
+        self.threshold = arrays['threshold']
+        self.default_left = arrays['default_left']
+        self.missing_type = arrays['missing_type']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self._has_missing_rules = bool((self.missing_type != MISSING_NONE).any())
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.column_stack([self.left, self.right]).ravel().astype(np.intp)
+        self.is_leaf = self.left == np.arange(len(self.left))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _go_right(self, fval, node):
+        if not self._has_missing_rules:
+            return fval > self.threshold[node]
+        nan = np.isnan(fval)
+        missing = self.missing_type[node]
+        fval = np.where(nan & (missing != MISSING_NAN), 0.0, fval)
+        use_default = (((missing == MISSING_ZERO) & (np.abs(fval) <= ZERO_THRESHOLD))
+                       | ((missing == MISSING_NAN) & nan))
+        return np.where(use_default, ~self.default_left[node], fval > self.threshold[node])
+
+    def _leaves(self, X):
+        # Final node of every tree for each row: (trees, rows)
+        if not self._has_missing_rules:
+            # Every split treats a missing value as 0, so substitute once instead of at each level
+            X = np.where(np.isnan(X), 0.0, X)
+        flat = X.ravel()
+        leaves = np.repeat(self.roots[:, None], len(X), axis=1).ravel()
+        # Only the (tree, row) cells still at an internal node are walked one level further. Cells
+        # that reach a leaf stay on it (leaves loop onto themselves) until enough have finished
+        # to be worth dropping from the working set.
+        cell = np.flatnonzero(~self.is_leaf[leaves])
+        node = leaves[cell]
+        offset = (cell % len(X)) * X.shape[1]
+        while len(cell):
+            node = self.children[2 * node + self._go_right(flat[offset + self.split_feature[node]], node)]
+            done = self.is_leaf[node]
+            n_done = np.count_nonzero(done)
+            if n_done == len(cell):
+                leaves[cell] = node
+                break
+            if n_done > len(cell) // 4:
+                leaves[cell[done]] = node[done]
+                walking = ~done
+                cell, node, offset = cell[walking], node[walking], offset[walking]
+        return leaves.reshape(self.n_trees, len(X))
+
+    def predict_raw(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected a (rows, {len(self.feature_names)}) matrix, got shape {X.shape}")
+        raw = np.zeros(len(X))
+        block = max(1, BLOCK_CELLS // max(1, self.n_trees))
+        for start in range(0, len(X), block):
+            leaves = self._leaves(X[start:start + block])
+            out = raw[start:start + block]
+            for t in range(self.n_trees):  # tree order, like LightGBM's accumulation
+                out += self.value[leaves[t]]
+        return raw
+
+    def predict(self, X, num_threads=None):
+        # Probability of the positive class, like Booster.predict for a binary model.
+        # num_threads is accepted so this can stand in for a Booster; evaluation is single-threaded.
+        # math.exp rather than np.exp: NumPy's vectorized exp can differ from the C library's
+        # (which LightGBM uses) in the last bit
+        raw = self.predict_raw(X)
+        exp = np.fromiter((math.exp(v) for v in (-self.sigmoid * raw).tolist()), dtype=np.float64, count=len(raw))
+        return 1.0 / (1.0 + exp)
+
+    def predict_proba(self, X):
+        p = self.predict(X)
+        return np.column_stack([1.0 - p, p])
+
+def load(path):
+    with np.load(path, allow_pickle=False) as arrays:
+        return TreeModel({key: arrays[key] for key in arrays.files})
@@ -0,0 +1,187 @@
+# Hyperparameter search for the engagement classifier.
+# Candidates are scored by mean ROC AUC over expanding-window time-series folds (posts sorted
+# by post_date; fold k trains on blocks 0..k and validates on block k+1), with early stopping
+# on each validation block. Each fold is binned once and saved as a LightGBM binary dataset
+# that every trial and worker process reuses. Trials run in a process pool; every finished
+# trial is appended to a JSONL log, so an interrupted search resumes where it stopped.
+# Run from project root: python src/tuning.py [--strategy halving|random] [--trials 32]
+
+import pandas as pd
+import numpy as np
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import feature_store
+
+TUNING_DIR = os.path.join("data", "models", "tuning")
+TRIALS_FILE = os.path.join(TUNING_DIR, "trials.jsonl")
+BEST_PARAMS_FILE = os.path.join("data", "models", "best_params.json")
+
+# Dataset-level parameters are fixed: they decide the binning that all trials share
+DATASET_PARAMS = {'max_bin': 255, 'feature_pre_filter': False, 'verbose': -1}
+BASE_PARAMS = {'objective': 'binary', 'metric': 'auc', 'verbose': -1, 'seed': 42, 'num_threads': 1}
+EARLY_STOPPING_ROUNDS = 50
+
+def sample_params(rng):
+    # Parameter names are the LGBMClassifier ones (all valid lgb.train aliases too)
+    return {
+        'learning_rate': float(np.exp(rng.uniform(np.log(0.01), np.log(0.3)))),
+        'num_leaves': int(np.exp(rng.uniform(np.log(4), np.log(128)))),
+        'min_child_samples': int(rng.integers(5, 101)),
+        'colsample_bytree': float(rng.uniform(0.5, 1.0)),
+        'subsample': float(rng.uniform(0.5, 1.0)),
+        'subsample_freq': 1,
+        'reg_alpha': float(np.exp(rng.uniform(np.log(1e-3), np.log(10)))),
+        'reg_lambda': float(np.exp(rng.uniform(np.log(1e-3), np.log(10)))),
+    }
+
+# --- Folds ---
+
+def time_series_folds(n_rows, n_folds):
+    # Expanding window over rows already sorted by time: (train_end, valid_end) per fold
+    bounds = np.linspace(0, n_rows, n_folds + 2).astype(int)
+    return [(int(bounds[k + 1]), int(bounds[k + 2])) for k in range(n_folds)]
+
+def build_fold_datasets(X, y, n_folds):
+    import lightgbm as lgb
+    # Bin each fold once; trials load the binary files instead of re-binning the raw matrix
+    os.makedirs(TUNING_DIR, exist_ok=True)
+    paths = []
+    for k, (train_end, valid_end) in enumerate(time_series_folds(len(X), n_folds)):
+        train = lgb.Dataset(X.iloc[:train_end], y.iloc[:train_end], params=DATASET_PARAMS, free_raw_data=False).construct()
+        valid = lgb.Dataset(X.iloc[train_end:valid_end], y.iloc[train_end:valid_end], reference=train,
+                            params=DATASET_PARAMS).construct()
+        train_path = os.path.join(TUNING_DIR, f"fold{k}_train.bin")
+        valid_path = os.path.join(TUNING_DIR, f"fold{k}_valid.bin")
+        for ds, path in ((train, train_path), (valid, valid_path)):
+            if os.path.exists(path):
+                os.remove(path)
+            ds.save_binary(path)
+        paths.append((train_path, valid_path))
+    return paths
+
+# --- Trials (run in worker processes) ---
+
+_worker_folds = []
+
+def _init_worker(fold_paths):
+    import lightgbm as lgb
+    _worker_folds.clear()
+    for train_path, valid_path in fold_paths:
+        _worker_folds.append((lgb.Dataset(train_path, params=DATASET_PARAMS), lgb.Dataset(valid_path, params=DATASET_PARAMS)))
+
+def run_trial(params, rounds):
+    import lightgbm as lgb
+    fold_auc, best_iterations = [], []
+    for train, valid in _worker_folds:
+        booster = lgb.train({**BASE_PARAMS, **params}, train, num_boost_round=rounds, valid_sets=[valid],
+                            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        fold_auc.append(float(booster.best_score['valid_0']['auc']))
+        best_iterations.append(int(booster.best_iteration or rounds))
+    return {'fold_auc': fold_auc, 'mean_auc': float(np.mean(fold_auc)), 'best_iterations': best_iterations}
+
+# --- Search ---
+
+def _trial_key(data_version, params, rounds):
+    return hashlib.sha256(json.dumps([data_version, params, rounds], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def load_trials():
+    trials = {}
+    if os.path.exists(TRIALS_FILE):
+        with open(TRIALS_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    trials[record['key']] = record
+    return trials
+
+def _evaluate(pool, candidates, rounds, data_version, trials):
+    # Runs the (params, rounds) trials not already in the log; returns a record per candidate
+    keys = [_trial_key(data_version, params, rounds) for params in candidates]
+    todo = {key: params for key, params in zip(keys, candidates) if key not in trials}
+    print(f"  {len(candidates)} candidates at {rounds} rounds: {len(candidates) - len(todo)} resumed, {len(todo)} to run")
+
+    futures = {pool.submit(run_trial, params, rounds): key for key, params in todo.items()}
+    with open(TRIALS_FILE, 'a', encoding='utf-8') as log:
+        for future in as_completed(futures):
+            key = futures[future]
+            record = {'key': key, 'data_version': data_version, 'rounds': rounds, 'params': todo[key], **future.result()}
+            log.write(json.dumps(record) + "\n")
+            log.flush()
+            trials[key] = record
+            print(f"    AUC {record['mean_auc']:.4f}  {todo[key]}")
+    return [trials[key] for key in keys]
+
+def tune_model(strategy='halving', n_trials=32, n_folds=4, max_rounds=1000, min_rounds=50, eta=3, workers=None, seed=42):
+    print(f"Loading features from {feature_store.STORE_DIR}...")
+    manifest = feature_store.build_store()
+    feature_cols = feature_store.feature_columns(manifest)
+    df = feature_store.load(feature_cols + ['is_high_performing', 'post_date'], manifest=manifest)
+    df = df.sort_values('post_date', kind='mergesort').reset_index(drop=True)
+    X, y = df[feature_cols], df['is_high_performing']
+
+    # Trials are only resumed for the same data and fold layout
+    data_version = hashlib.sha256(
+        pd.util.hash_pandas_object(df[feature_cols + ['is_high_performing']], index=False).to_numpy().tobytes()
+        + f"{n_folds}:{EARLY_STOPPING_ROUNDS}:{json.dumps(DATASET_PARAMS, sort_keys=True)}".encode('utf-8')
+    ).hexdigest()[:16]
+
+    print(f"Binning {n_folds} expanding-window folds ({len(df)} posts)...")
+    fold_paths = build_fold_datasets(X, y, n_folds)
+
+    rng = np.random.default_rng(seed)
+    candidates = [sample_params(rng) for _ in range(n_trials)]
+    trials = load_trials()
+    workers = workers or os.cpu_count() or 1
+
+    # spawn, not fork: binning has already started LightGBM's OpenMP threads in this process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(fold_paths,)) as pool:
+        if strategy == 'random':
+            print(f"Random search: {n_trials} candidates")
+            results = _evaluate(pool, candidates, max_rounds, data_version, trials)
+        elif strategy == 'halving':
+            # Successive halving: every candidate gets a small round budget, the best 1/eta
+            # move on with eta times more rounds, until max_rounds
+            rounds = min_rounds
+            rung = 0
+            while True:
+                print(f"Rung {rung}:")
+                results = _evaluate(pool, candidates, rounds, data_version, trials)
+                if rounds >= max_rounds or len(candidates) == 1:
+                    break
+                order = np.argsort([-r['mean_auc'] for r in results], kind='stable')
+                candidates = [candidates[i] for i in order[:max(1, math.ceil(len(candidates) / eta))]]
+                rounds = min(rounds * eta, max_rounds)
+                rung += 1
+        else:
+            raise ValueError(f"Unknown search strategy: {strategy}")
+
+    best = max(results, key=lambda r: r['mean_auc'])
+    best_params = {**best['params'], 'n_estimators': int(np.median(best['best_iterations']))}
+    with open(BEST_PARAMS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'params': best_params, 'mean_auc': best['mean_auc'], 'fold_auc': best['fold_auc'],
+                   'data_version': data_version}, f, indent=1)
+
+    print("\n--- Tuning Results ---")
+    print(f"Best mean fold AUC: {best['mean_auc']:.4f} (folds: {', '.join(f'{a:.4f}' for a in best['fold_auc'])})")
+    print(f"Best params: {best_params}")
+    print(f"Saved to {BEST_PARAMS_FILE}; train with: python src/models.py --tuned")
+    return best_params
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune LightGBM parameters with time-series cross-validation.")
+    parser.add_argument("--strategy", choices=['halving', 'random'], default='halving')
+    parser.add_argument("--trials", type=int, default=32, help="Number of sampled candidates")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--min-rounds", type=int, default=50, help="Round budget of the first halving rung")
+    parser.add_argument("--eta", type=int, default=3, help="Halving rate")
+    parser.add_argument("--workers", type=int, default=None, help="Trial processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    tune_model(args.strategy, args.trials, args.folds, args.max_rounds, args.min_rounds, args.eta, args.workers, args.seed)
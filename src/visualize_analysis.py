@@ -1,117 +1,225 @@
 import pandas as pd
 import numpy as np
-import lightgbm as lgb
-import shap
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-import joblib
+import argparse
+import hashlib
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+import feature_store
+import shap_cache
+import instrumentation
 
-def visualize_analysis():
+# Features to analyze (Importance > 0 based on previous analysis)
+TARGET_FEATURES = [
+    'word_count', 'hour', 'weekday', 'video_duration', 
+    'has_emoji', 'has_hashtag', 'media_type_Text'
+]
+
+# --- Plot jobs ---
+# Every PNG stores a fingerprint of what it was drawn from (model, data, plotting code) in its
+# metadata, so a re-run only renders plots whose inputs changed. Stale plots are rendered in a
+# process pool on the Agg backend.
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def _frame_digest(df):
+    return _digest(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(), list(df.columns), list(df.dtypes))
+
+def _png_fingerprint(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with Image.open(path) as img:
+            return img.text.get('Fingerprint')
+    except Exception:
+        return None
+
+def _mark_current(path):
+    # Up-to-date plots are touched, so the pipeline runner sees every output as verified by this run
+    os.utime(path)
+
+def plot_dependence(feature, shap_values, X_display, out_path, fingerprint):
+    import matplotlib.pyplot as plt
+    import shap
+    plt.figure(figsize=(10, 6))
+    
+    # Special handling for video_duration to remove outliers
+    if feature == 'video_duration':
+        # Filter for duration < 18 minutes
+        mask = X_display['video_duration'] < 18
+        shap.dependence_plot(feature, shap_values[mask], X_display[mask], show=False)
+    else:
+        shap.dependence_plot(feature, shap_values, X_display, show=False)
+        
+    plt.title(f"SHAP Dependence: {feature}")
+    plt.savefig(out_path, bbox_inches='tight', metadata={'Fingerprint': fingerprint})
+    plt.close()
+
+def plot_binning(feature, df, out_path, fingerprint):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.figure(figsize=(10, 6))
+    
+    if feature in ['word_count', 'video_duration']:
+        # Continuous: Bin into quantiles or fixed ranges
+        # Use qcut for equal frequency bins, or cut for equal width. 
+        # qcut is usually better for skewed data like word_count
+        try:
+            df[f'{feature}_bin'] = pd.qcut(df[feature], q=10, duplicates='drop')
+        except ValueError:
+            # Fallback if not enough unique values
+            df[f'{feature}_bin'] = pd.cut(df[feature], bins=5)
+            
+        sns.barplot(x=f'{feature}_bin', y='engagements', data=df, errorbar=None)
+        plt.xticks(rotation=45)
+        if feature == 'video_duration':
+            plt.xlabel(f"{feature} Range (minutes)")
+        else:
+            plt.xlabel(f"{feature} Range")
+    else:
+        # Discrete/Categorical
+        sns.barplot(x=feature, y='engagements', data=df, errorbar=None)
+        plt.xlabel(feature)
+        
+    plt.ylabel("Average Engagements")
+    plt.title(f"Average Engagements by {feature}")
+    plt.savefig(out_path, bbox_inches='tight', metadata={'Fingerprint': fingerprint})
+    plt.close()
+
+# Shared inputs, sent to each worker once rather than with every job
+_plot_data = {}
+
+def _init_plot_worker(data):
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    _plot_data.update(data)
+
+def _render(job):
+    kind, feature, out_path, fingerprint = job
+    if kind == 'dependence':
+        plot_dependence(feature, _plot_data['shap_values'], _plot_data['X_display'], out_path, fingerprint)
+    else:
+        # Each job bins its own copy, so jobs never see each other's *_bin columns
+        plot_binning(feature, _plot_data['binning'][[feature, 'engagements']].copy(), out_path, fingerprint)
+    return out_path
+
+def render_plots(jobs, data, workers=None):
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _init_plot_worker(data)
+        return [_render(job) for job in jobs]
+    # spawn, not fork: the parent has LightGBM/OpenMP state loaded
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_plot_worker, initargs=(data,)) as pool:
+        return list(pool.map(_render, jobs))
+
+@instrumentation.instrumented('viz')
+def visualize_analysis(features=None, workers=None, force=False):
+    # features: features to plot (default TARGET_FEATURES); force: re-render even up-to-date plots
     # Paths
-    data_path = os.path.join("data", "features", "model_ready.csv")
     model_path = os.path.join("data", "models", "lgbm_model.pkl")
     viz_dir = os.path.join("data", "visualizations")
     os.makedirs(viz_dir, exist_ok=True)
+    target_features = list(TARGET_FEATURES if features is None else features)
     
-    print(f"Loading data from {data_path}...")
-    df = pd.read_csv(data_path)
-    
-    print(f"Loading model from {model_path}...")
-    clf = joblib.load(model_path)
+    print(f"Loading features from {feature_store.STORE_DIR}...")
+    manifest = feature_store.build_store()
     
-    # Define features used in the model (must match training)
-    feature_cols = [
-        'weekday', 'hour', 'word_count', 'has_emoji', 'has_hashtag',
-        'video_duration', 'doc_pages'
-    ]
-    media_cols = [c for c in df.columns if c.startswith('media_type_')]
-    feature_cols.extend(media_cols)
+    # Features used in the model (must match training), NaNs already filled
+    feature_cols = feature_store.feature_columns(manifest)
+    raw_cols = feature_store.role_columns('raw', manifest)
+    with instrumentation.step('load'):
+        df = feature_store.load(['engagements'] + feature_cols + raw_cols, manifest=manifest)
+        instrumentation.rows(rows_out=len(df))
+    instrumentation.rows(rows_in=len(df))
+    unknown = [f for f in target_features if f not in df.columns]
+    if unknown:
+        print(f"WARNING: not model features, skipped: {unknown}")
     
     # Prepare X for SHAP
-    X = df[feature_cols].fillna(0)
-    
-    # 1. SHAP Dependence Plots
-    print("Computing SHAP values...")
-    explainer = shap.TreeExplainer(clf)
-    shap_values = explainer.shap_values(X)
-    
-    # Handle SHAP output format (lightgbm binary returns list or array depending on version)
-    if isinstance(shap_values, list):
-        shap_values = shap_values[1] # Positive class
-        
-    # Features to analyze (Importance > 0 based on previous analysis)
-    target_features = [
-        'word_count', 'hour', 'weekday', 'video_duration', 
-        'has_emoji', 'has_hashtag', 'media_type_Text'
-    ]
+    X = df[feature_cols]
     
     # Create display version of X for plotting (convert ms to min)
     X_display = X.copy()
     if 'video_duration' in X_display.columns:
         X_display['video_duration'] = X_display['video_duration'] / 60000
     
-    print("Generating SHAP dependence plots...")
+    # Binning uses the observed values: posts without a video/document stay out of those bins
+    binning_df = df.copy()
+    for col in raw_cols:
+        binning_df[col.removesuffix('_raw')] = binning_df[col]
+    # Convert video_duration to minutes for binning
+    if 'video_duration' in binning_df.columns:
+        binning_df['video_duration'] = binning_df['video_duration'] / 60000
+    
+    # 1. Decide which plots are stale
+    # Plotting libraries load here rather than at import, so `--help` and the pipeline's checks stay fast
+    import matplotlib
+    import seaborn as sns
+    import shap
+    code_version = _digest(inspect.getsource(plot_dependence), inspect.getsource(plot_binning),
+                           shap.__version__, sns.__version__, matplotlib.__version__)
+    model_version = shap_cache.file_hash(model_path)
+    x_version = _frame_digest(X_display)
+    
+    jobs, skipped = [], 0
     for feature in target_features:
         if feature in X.columns:
-            plt.figure(figsize=(10, 6))
-            
-            # Special handling for video_duration to remove outliers
-            if feature == 'video_duration':
-                # Filter for duration < 18 minutes
-                mask = X_display['video_duration'] < 18
-                shap.dependence_plot(feature, shap_values[mask], X_display[mask], show=False)
-            else:
-                shap.dependence_plot(feature, shap_values, X_display, show=False)
-                
-            plt.title(f"SHAP Dependence: {feature}")
             out_path = os.path.join(viz_dir, f"shap_dependence_{feature}.png")
-            plt.savefig(out_path, bbox_inches='tight')
-            plt.close()
-            print(f"Saved {out_path}")
-            
-    # 2. Binning Analysis
-    print("Performing Binning Analysis...")
-    # Ensure engagements is numeric
-    df['engagements'] = pd.to_numeric(df['engagements'], errors='coerce').fillna(0)
-    
-    # Convert video_duration to minutes for binning
-    if 'video_duration' in df.columns:
-        df['video_duration'] = df['video_duration'] / 60000
-    
+            fingerprint = _digest('dependence', feature, model_version, x_version, code_version)
+            if force or _png_fingerprint(out_path) != fingerprint:
+                jobs.append(('dependence', feature, out_path, fingerprint))
+            else:
+                _mark_current(out_path)
+                skipped += 1
     for feature in target_features:
-        if feature not in df.columns:
-            continue
-            
-        plt.figure(figsize=(10, 6))
-        
-        if feature in ['word_count', 'video_duration']:
-            # Continuous: Bin into quantiles or fixed ranges
-            # Use qcut for equal frequency bins, or cut for equal width. 
-            # qcut is usually better for skewed data like word_count
-            try:
-                df[f'{feature}_bin'] = pd.qcut(df[feature], q=10, duplicates='drop')
-            except ValueError:
-                # Fallback if not enough unique values
-                df[f'{feature}_bin'] = pd.cut(df[feature], bins=5)
-                
-            sns.barplot(x=f'{feature}_bin', y='engagements', data=df, errorbar=None)
-            plt.xticks(rotation=45)
-            if feature == 'video_duration':
-                plt.xlabel(f"{feature} Range (minutes)")
+        if feature in binning_df.columns:
+            out_path = os.path.join(viz_dir, f"binning_{feature}.png")
+            fingerprint = _digest('binning', feature, _frame_digest(binning_df[[feature, 'engagements']]), code_version)
+            if force or _png_fingerprint(out_path) != fingerprint:
+                jobs.append(('binning', feature, out_path, fingerprint))
             else:
-                plt.xlabel(f"{feature} Range")
-        else:
-            # Discrete/Categorical
-            sns.barplot(x=feature, y='engagements', data=df, errorbar=None)
-            plt.xlabel(feature)
-            
-        plt.ylabel("Average Engagements")
-        plt.title(f"Average Engagements by {feature}")
-        out_path = os.path.join(viz_dir, f"binning_{feature}.png")
-        plt.savefig(out_path, bbox_inches='tight')
-        plt.close()
-        print(f"Saved {out_path}")
+                _mark_current(out_path)
+                skipped += 1
+    print(f"{len(jobs)} plots to render, {skipped} up to date")
+    if not jobs:
+        return
+    
+    # 2. SHAP values, only when a dependence plot has to be drawn
+    data = {'binning': binning_df[[c for c in target_features if c in binning_df.columns] + ['engagements']]}
+    if any(job[0] == 'dependence' for job in jobs):
+        import joblib
+        print(f"Loading model from {model_path}...")
+        clf = joblib.load(model_path)
+        print("Computing SHAP values...")
+        # Reused from the cache next to the model when these rows were already explained
+        with instrumentation.step('shap'):
+            data['shap_values'] = shap_cache.shap_values(clf, X, model_path)
+            instrumentation.rows(rows_in=len(X))
+        data['X_display'] = X_display
+    
+    # 3. SHAP Dependence Plots and Binning Analysis
+    print("Generating SHAP dependence and binning plots...")
+    with instrumentation.step('render'):
+        for out_path in render_plots(jobs, data, workers):
+            print(f"Saved {out_path}")
 
 if __name__ == "__main__":
-    visualize_analysis()
+    parser = argparse.ArgumentParser(description="Render SHAP dependence and binning plots.")
+    parser.add_argument("--features", nargs='+', default=None, help="Features to plot (default: TARGET_FEATURES)")
+    parser.add_argument("--all-features", action='store_true', help="Plot every model feature")
+    parser.add_argument("--workers", type=int, default=None, help="Rendering processes (default: all cores)")
+    parser.add_argument("--force", action='store_true', help="Re-render plots that are up to date")
+    args = parser.parse_args()
+    
+    features = args.features
+    if args.all_features:
+        features = feature_store.feature_columns()
+    visualize_analysis(features, args.workers, args.force)